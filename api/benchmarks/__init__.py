@@ -0,0 +1,5 @@
+"""Benchmarks for the Questify API.
+
+Run them from the api/ directory with the usual environment variables set,
+e.g. `python -m benchmarks.recurrence`.
+"""
@@ -0,0 +1,105 @@
+"""Compare blocking Session queries inside async handlers with AsyncSession.
+
+Two probe endpoints run the same routines query for one user: one on the
+sync SessionLocal (as every router did before the async port) and one on
+AsyncSessionLocal. Each is hit with concurrent requests in-process and the
+latency percentiles are reported.
+
+    python -m benchmarks.async_db --requests 2000 --concurrency 50 --slow-ms 20
+
+--slow-ms adds pg_sleep to each query (PostgreSQL only) to make the cost
+of blocking the event loop visible on a fast local database.
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import func, select, text
+
+from src.database import AsyncSessionLocal, SessionLocal
+from src.models import Routine, User
+from .common import percentiles, write_results
+
+def build_app(user_id, slow_ms: int) -> FastAPI:
+    app = FastAPI()
+    query = select(Routine).where(Routine.user_id == user_id)
+    sleep = text("SELECT pg_sleep(:seconds)").bindparams(seconds=slow_ms / 1000)
+
+    @app.get("/sync")
+    async def sync_probe():
+        db = SessionLocal()
+        try:
+            if slow_ms:
+                db.execute(sleep)
+            return len(db.scalars(query).all())
+        finally:
+            db.close()
+
+    @app.get("/async")
+    async def async_probe():
+        async with AsyncSessionLocal() as db:
+            if slow_ms:
+                await db.execute(sleep)
+            return len((await db.scalars(query)).all())
+
+    return app
+
+async def drive(app: FastAPI, path: str, requests: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(None)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                queue.get_nowait()
+                started = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        'requests': requests,
+        'errors': errors,
+        'requests_per_second': round(requests / elapsed, 1),
+        **percentiles(latencies)
+    }
+
+async def run(requests: int, concurrency: int, slow_ms: int) -> dict:
+    # Benchmark against the user with the most routines
+    async with AsyncSessionLocal() as db:
+        user_id = await db.scalar(
+            select(User.id).join(Routine).group_by(User.id).order_by(func.count(Routine.id).desc()).limit(1)
+        )
+    if user_id is None:
+        raise SystemExit("No routines found; run python -m benchmarks.seed first")
+
+    app = build_app(user_id, slow_ms)
+    return {
+        'concurrency': concurrency,
+        'slow_ms': slow_ms,
+        'sync_session': await drive(app, "/sync", requests, concurrency),
+        'async_session': await drive(app, "/async", requests, concurrency)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--slow-ms', type=int, default=0)
+    parser.add_argument('--output', help="Write results to this JSON file")
+    args = parser.parse_args()
+    write_results('async_db', asyncio.run(run(args.requests, args.concurrency, args.slow_ms)), args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+def percentiles(samples: Iterable[float], points=(50, 95, 99)) -> Dict[str, float]:
+    """Nearest-rank percentiles of latency samples, in milliseconds"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {f"p{point}": 0.0 for point in points}
+    return {
+        f"p{point}": round(ordered[min(len(ordered) - 1, int(len(ordered) * point / 100))] * 1000, 2)
+        for point in points
+    }
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def write_results(name: str, results: dict, output: Optional[str] = None) -> dict:
+    """Print results and optionally write them as JSON with run metadata"""
+    payload = {
+        'benchmark': name,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'results': results
+    }
+    print(json.dumps(payload, indent=2, default=str))
+    if output:
+        Path(output).write_text(json.dumps(payload, indent=2, default=str))
+    return payload
+
+def summarize(samples: Iterable[float]) -> dict:
+    """Sample count, mean and percentiles of latency samples, in milliseconds"""
+    samples = list(samples)
+    mean = sum(samples) / len(samples) * 1000 if samples else 0.0
+    return {'samples': len(samples), 'mean_ms': round(mean, 2), **percentiles(samples)}
@@ -0,0 +1,119 @@
+"""Peak memory of the JSON range read versus the streaming NDJSON export.
+
+Each mode runs in a fresh subprocess against the seeded user with the most
+instances. The response body is counted and discarded as it is sent, so the
+reported peak RSS growth is the server side's alone.
+
+    python -m benchmarks.seed --users 20 --routines 10 --history-days 730
+    python -m benchmarks.export --output export.json
+"""
+import argparse
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+from .common import write_results
+
+PATHS = {
+    'json': "/routines/instances/range/{start}/{end}",
+    'ndjson': "/routines/instances/export/{start}/{end}"
+}
+
+def _max_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+async def _request(app, path: str, token: str) -> dict:
+    """Call the ASGI app directly, counting body bytes without keeping them"""
+    received = {'status': None, 'bytes': 0, 'lines': 0}
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '', 'query_string': b'',
+        'headers': [(b'host', b'bench'), (b'authorization', f"Bearer {token}".encode())],
+        'client': ('127.0.0.1', 0), 'server': ('bench', 80)
+    }
+
+    request_sent = False
+    disconnected = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # Streaming responses listen for a disconnect until they finish
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            received['status'] = message['status']
+        elif message['type'] == 'http.response.body':
+            body = message.get('body', b'')
+            received['bytes'] += len(body)
+            received['lines'] += body.count(b'\n')
+
+    await app(scope, receive, send)
+    disconnected.set()
+    return received
+
+def child(mode: str) -> dict:
+    from sqlalchemy import func, select
+
+    from src.auth.utils import create_access_token
+    from src.database import SessionLocal
+    from src.main import app
+    from src.models import Routine, RoutineInstance
+
+    db = SessionLocal()
+    try:
+        user_id, instances, first, last = db.execute(
+            select(Routine.user_id, func.count(RoutineInstance.id),
+                   func.min(RoutineInstance.due_date), func.max(RoutineInstance.due_date))
+            .join(RoutineInstance).group_by(Routine.user_id)
+            .order_by(func.count(RoutineInstance.id).desc()).limit(1)
+        ).one()
+    finally:
+        db.close()
+
+    if isinstance(first, str):
+        # SQLite returns aggregates over datetimes as strings
+        first, last = datetime.fromisoformat(first), datetime.fromisoformat(last)
+    path = PATHS[mode].format(start=first.date(), end=last.date() + timedelta(days=1))
+    token = create_access_token(data={'sub': str(user_id)})
+
+    baseline = _max_rss_mb()
+    started = time.perf_counter()
+    response = asyncio.run(_request(app, path, token))
+    return {
+        'mode': mode,
+        'instances': instances,
+        'status': response['status'],
+        'response_mb': round(response['bytes'] / 1024 / 1024, 2),
+        'seconds': round(time.perf_counter() - started, 3),
+        'baseline_rss_mb': round(baseline, 1),
+        'peak_rss_growth_mb': round(_max_rss_mb() - baseline, 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--child', choices=list(PATHS), help=argparse.SUPPRESS)
+    parser.add_argument('--output', help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.child)))
+        return
+
+    results = {}
+    for mode in PATHS:
+        output = subprocess.check_output([sys.executable, '-m', 'benchmarks.export', '--child', mode], text=True)
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+    write_results('export', results, args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""Time the hot paths against data from benchmarks.seed.
+
+- generate_for_user: RoutineInstanceGenerator.generate_instances_for_user for
+  each sampled user
+- generate_daily: generate_instances_for_users over every seeded user, in
+  shards of GENERATION_SHARD_SIZE as the nightly job runs them
+- instances_for_date, instances_range_7d, instances_range_30d: the
+  /routines/instances reads over seeded history
+- update_task: PUT /routines/instances/{id}/tasks/{task_id}
+
+Generation targets a date a year ahead (--days-ahead) and the instances it
+creates are deleted afterwards, so runs are repeatable. Only seeded users
+are generated for and cleaned up, so other users' data is left alone. Task
+updates change seeded history; re-seed for a pristine database.
+
+    python -m benchmarks.seed --users 200
+    python -m benchmarks.hot_paths --sample-users 20 --iterations 50 --output results.json
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+import httpx
+from sqlalchemy import delete, select
+
+from src.auth.utils import create_access_token
+from src.config import settings
+from src.database import SessionLocal
+from src.main import app
+from src.models import Routine, RoutineInstance, TaskInstance, User, XpEvent
+from src.routines.instance_generator import RoutineInstanceGenerator
+from src.routines.summary import refresh_daily_summaries
+from .common import summarize, write_results
+from .seed import USERNAME_PREFIX
+
+def _delete_generated(db, user_ids: list, target_date) -> None:
+    """Remove the seeded users' instances for the benchmark date and refresh their summaries"""
+    start = datetime.combine(target_date, datetime.min.time())
+    end = start + timedelta(days=1)
+    instance_ids = select(RoutineInstance.id).join(Routine).where(
+        Routine.user_id.in_(user_ids),
+        RoutineInstance.due_date >= start,
+        RoutineInstance.due_date < end
+    )
+    task_ids = select(TaskInstance.id).where(TaskInstance.routine_instance_id.in_(instance_ids))
+    # Explicit deletes, as XP events have no foreign key to cascade from
+    db.execute(delete(XpEvent).where(XpEvent.task_instance_id.in_(task_ids)))
+    db.execute(delete(TaskInstance).where(
+        TaskInstance.routine_instance_id.in_(instance_ids),
+        TaskInstance.due_date >= start,
+        TaskInstance.due_date < end
+    ))
+    db.execute(delete(RoutineInstance).where(RoutineInstance.id.in_(instance_ids)))
+    refresh_daily_summaries(db, [(user_id, target_date) for user_id in user_ids])
+    db.commit()
+
+def time_generation(seeded: list, user_ids: list, target_date) -> dict:
+    db = SessionLocal()
+    try:
+        _delete_generated(db, seeded, target_date)
+        latencies = []
+        created = 0
+        for user_id in user_ids:
+            started = time.perf_counter()
+            stats = RoutineInstanceGenerator(db).generate_instances_for_user(user_id, target_date)
+            latencies.append(time.perf_counter() - started)
+            created += stats['created']
+        _delete_generated(db, seeded, target_date)
+
+        shards = [
+            seeded[offset:offset + settings.GENERATION_SHARD_SIZE]
+            for offset in range(0, len(seeded), settings.GENERATION_SHARD_SIZE)
+        ]
+        daily_created = 0
+        started = time.perf_counter()
+        for shard in shards:
+            daily_created += RoutineInstanceGenerator(db).generate_instances_for_users(shard, target_date)['created']
+        daily_seconds = time.perf_counter() - started
+        _delete_generated(db, seeded, target_date)
+    finally:
+        db.close()
+
+    return {
+        'generate_for_user': {**summarize(latencies), 'instances_created': created},
+        'generate_daily': {
+            'seconds': round(daily_seconds, 3),
+            'users': len(seeded),
+            'shards': len(shards),
+            'instances_created': daily_created
+        }
+    }
+
+async def time_requests(samples: list, iterations: int, rng: random.Random) -> dict:
+    """Time the instance reads and task updates for sampled (user id, history) pairs"""
+    latencies = {name: [] for name in ('instances_for_date', 'instances_range_7d', 'instances_range_30d', 'update_task')}
+    errors = 0
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def timed(name: str, method: str, url: str, **kwargs):
+            nonlocal errors
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies[name].append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+        for _ in range(iterations):
+            user_id, days, tasks = rng.choice(samples)
+            headers = {"Authorization": f"Bearer {create_access_token(data={'sub': str(user_id)})}"}
+            day = rng.choice(days)
+            await timed('instances_for_date', 'GET', f"/routines/instances/{day}", headers=headers)
+            await timed('instances_range_7d', 'GET',
+                        f"/routines/instances/range/{day - timedelta(days=6)}/{day}", headers=headers)
+            await timed('instances_range_30d', 'GET',
+                        f"/routines/instances/range/{day - timedelta(days=29)}/{day}", headers=headers)
+
+            instance_id, task_id = rng.choice(tasks)
+            await timed('update_task', 'PUT', f"/routines/instances/{instance_id}/tasks/{task_id}",
+                        params={'progress': rng.choice([25, 50, 100])}, headers=headers)
+
+    return {'errors': errors, **{name: summarize(values) for name, values in latencies.items()}}
+
+def load_samples(db, user_ids: list) -> list:
+    """(user id, days with instances, [(instance id, task id)]) for each sampled user"""
+    samples = []
+    for user_id in user_ids:
+        rows = db.execute(
+            select(RoutineInstance.due_date, TaskInstance.routine_instance_id, TaskInstance.task_id)
+            .join(TaskInstance)
+            .join(Routine)
+            .where(Routine.user_id == user_id)
+        ).all()
+        if rows:
+            days = sorted({due_date.date() for due_date, _, _ in rows})
+            samples.append((user_id, days, [(instance_id, task_id) for _, instance_id, task_id in rows]))
+    return samples
+
+def run(sample_users: int, iterations: int, days_ahead: int, seed_value: int) -> dict:
+    rng = random.Random(seed_value)
+    db = SessionLocal()
+    try:
+        seeded = db.scalars(
+            select(User.id).where(User.username.like(f"{USERNAME_PREFIX}%")).order_by(User.username)
+        ).all()
+        if not seeded:
+            raise SystemExit("No seeded users found; run python -m benchmarks.seed first")
+        user_ids = rng.sample(list(seeded), min(sample_users, len(seeded)))
+        samples = load_samples(db, user_ids)
+    finally:
+        db.close()
+
+    target_date = datetime.now().date() + timedelta(days=days_ahead)
+    results = {
+        'seeded_users': len(seeded),
+        'sample_users': len(user_ids),
+        'iterations': iterations,
+        'target_date': target_date
+    }
+    results.update(time_generation(list(seeded), user_ids, target_date))
+    results.update(asyncio.run(time_requests(samples, iterations, rng)))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sample-users', type=int, default=20)
+    parser.add_argument('--iterations', type=int, default=50, help="Request rounds for the read/update paths")
+    parser.add_argument('--days-ahead', type=int, default=365, help="Generate instances this many days from today")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write results to this JSON file")
+    args = parser.parse_args()
+    write_results('hot_paths', run(args.sample_users, args.iterations, args.days_ahead, args.seed), args.output)
+
+if __name__ == '__main__':
+    main()
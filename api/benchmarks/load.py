@@ -0,0 +1,166 @@
+"""HTTP load test mixing the API's typical calls.
+
+Logs in seeded users (see benchmarks.seed) through /auth/login, then runs
+virtual users that each pick weighted operations: list areas, projects and
+routines, fetch today's instances, update task progress and generate the
+weekly horizon. Every concurrency level runs for --duration seconds and
+reports throughput, p50/p95/p99 per route and error rates.
+
+In-process by default. Pass --base-url to drive a running server instead,
+e.g. one started with several uvicorn workers:
+
+    python -m benchmarks.load --users 50 --concurrency 10,50,100 --duration 30
+    python -m benchmarks.load --base-url http://localhost:8000 --concurrency 50,200
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import httpx
+
+from .common import summarize, write_results
+from .seed import PASSWORD, username
+
+# Route template -> relative weight in the mix
+OPERATIONS = {
+    'GET /areas/': 10,
+    'GET /projects/': 10,
+    'GET /routines/': 15,
+    'GET /routines/instances/{date}': 40,
+    'PUT /routines/instances/{instance_id}/tasks/{task_id}': 20,
+    'POST /routines/generate-instances': 5
+}
+
+class VirtualUser:
+    """One logged-in user issuing requests and remembering today's tasks"""
+
+    def __init__(self, client: httpx.AsyncClient, token: str, rng: random.Random):
+        self.client = client
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.rng = rng
+        self.tasks: List[tuple] = []
+
+    async def request(self, operation: str) -> Optional[httpx.Response]:
+        today = datetime.now().date()
+        if operation == 'GET /routines/instances/{date}':
+            response = await self.client.get(f"/routines/instances/{today}", headers=self.headers)
+            if response.status_code == 200:
+                self.tasks = [
+                    (instance['id'], task['task_id'])
+                    for instance in response.json() for task in instance['task_instances']
+                ]
+            return response
+        if operation.startswith('PUT'):
+            if not self.tasks:
+                return None
+            instance_id, task_id = self.rng.choice(self.tasks)
+            return await self.client.put(
+                f"/routines/instances/{instance_id}/tasks/{task_id}",
+                params={'progress': self.rng.choice([25, 50, 100])},
+                headers=self.headers
+            )
+        if operation.startswith('POST'):
+            return await self.client.post("/routines/generate-instances", params={'days': 7}, headers=self.headers)
+
+        method, path = operation.split(' ', 1)
+        return await self.client.request(method, path, headers=self.headers)
+
+async def login(client: httpx.AsyncClient, users: int) -> List[str]:
+    """Log every seeded user in, a few at a time to stay under the hashing admission limit"""
+    semaphore = asyncio.Semaphore(8)
+
+    async def login_one(index: int) -> str:
+        async with semaphore:
+            response = await client.post("/auth/login", data={'username': username(index), 'password': PASSWORD})
+            if response.status_code != 200:
+                raise SystemExit(f"Login failed for {username(index)} ({response.status_code}); run benchmarks.seed first")
+            return response.json()['access_token']
+
+    return await asyncio.gather(*(login_one(index) for index in range(users)))
+
+async def run_level(client: httpx.AsyncClient, tokens: List[str], concurrency: int, duration: float, seed_value: int) -> dict:
+    latencies: Dict[str, List[float]] = {operation: [] for operation in OPERATIONS}
+    errors: Dict[str, int] = {operation: 0 for operation in OPERATIONS}
+    operations = list(OPERATIONS)
+    weights = list(OPERATIONS.values())
+    deadline = time.perf_counter() + duration
+
+    async def worker(index: int):
+        rng = random.Random(seed_value + index)
+        user = VirtualUser(client, tokens[index % len(tokens)], rng)
+        # Start with today's instances so task updates have something to hit
+        await user.request('GET /routines/instances/{date}')
+        while time.perf_counter() < deadline:
+            operation = rng.choices(operations, weights)[0]
+            started = time.perf_counter()
+            try:
+                response = await user.request(operation)
+            except httpx.HTTPError:
+                response = None
+                errors[operation] += 1
+            else:
+                if response is None:
+                    continue
+                if response.status_code >= 400:
+                    errors[operation] += 1
+            latencies[operation].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    total = sum(len(samples) for samples in latencies.values())
+    routes = {}
+    for operation, samples in latencies.items():
+        if samples:
+            routes[operation] = {
+                **summarize(samples),
+                'requests_per_second': round(len(samples) / elapsed, 1),
+                'error_rate': round(errors[operation] / len(samples), 4)
+            }
+    return {
+        'concurrency': concurrency,
+        'seconds': round(elapsed, 2),
+        'requests': total,
+        'requests_per_second': round(total / elapsed, 1) if elapsed else 0.0,
+        'error_rate': round(sum(errors.values()) / total, 4) if total else 0.0,
+        'all': summarize(sample for samples in latencies.values() for sample in samples),
+        'routes': routes
+    }
+
+async def run(users: int, levels: List[int], duration: float, base_url: Optional[str], seed_value: int) -> dict:
+    if base_url:
+        transport = None
+    else:
+        from src.main import app
+        transport = httpx.ASGITransport(app=app)
+
+    limits = httpx.Limits(max_connections=max(levels) + 10)
+    async with httpx.AsyncClient(
+        transport=transport, base_url=base_url or "http://bench", limits=limits, timeout=60
+    ) as client:
+        tokens = await login(client, users)
+        return {
+            'target': base_url or 'in-process',
+            'users': users,
+            'duration': duration,
+            'levels': [await run_level(client, tokens, level, duration, seed_value) for level in levels]
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=20, help="Seeded users to log in as")
+    parser.add_argument('--concurrency', default="10,50", help="Comma-separated concurrency levels")
+    parser.add_argument('--duration', type=float, default=10, help="Seconds per concurrency level")
+    parser.add_argument('--base-url', help="Drive a running server instead of the app in-process")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write results to this JSON file")
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(',')]
+    write_results('load', asyncio.run(run(args.users, levels, args.duration, args.base_url, args.seed)), args.output)
+
+if __name__ == '__main__':
+    main()
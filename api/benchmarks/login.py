@@ -0,0 +1,95 @@
+"""Login throughput and tail latency with and without the hashing executor.
+
+Registers a batch of users, then drives concurrent /auth/login requests
+in-process while a probe keeps calling GET / to show how much the event
+loop stalls. --inline runs bcrypt on the event loop, as the handlers did
+before the dedicated executor, for a before/after comparison.
+
+    python -m benchmarks.login --users 20 --logins 400 --concurrency 32
+    python -m benchmarks.login --users 20 --logins 400 --concurrency 32 --inline
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+from src.auth.hashing import password_hasher
+from src.main import app
+from .common import percentiles, write_results
+
+PASSWORD = "benchmark-password"
+
+async def _run_inline(func, *args):
+    return func(*args)
+
+async def run(users: int, logins: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        prefix = uuid.uuid4().hex[:8]
+        usernames = [f"login-bench-{prefix}-{index}" for index in range(users)]
+        for username in usernames:
+            response = await client.post("/auth/register", json={
+                "username": username,
+                "email": f"{username}@example.com",
+                "password": PASSWORD
+            })
+            response.raise_for_status()
+
+        latencies = []
+        probe_latencies = []
+        statuses = {}
+        remaining = iter(range(logins))
+        done = asyncio.Event()
+
+        async def login_worker():
+            for index in remaining:
+                started = time.perf_counter()
+                response = await client.post("/auth/login", data={
+                    "username": usernames[index % users],
+                    "password": PASSWORD
+                })
+                latencies.append(time.perf_counter() - started)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/")
+                probe_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(login_worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    return {
+        'logins': logins,
+        'concurrency': concurrency,
+        'statuses': statuses,
+        'logins_per_second': round(logins / elapsed, 1),
+        'login_latency_ms': percentiles(latencies),
+        'probe_latency_ms': percentiles(probe_latencies)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--logins', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--inline', action='store_true', help="Hash on the event loop (previous behaviour)")
+    parser.add_argument('--output', help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    if args.inline:
+        password_hasher._run = _run_inline
+    results = asyncio.run(run(args.users, args.logins, args.concurrency))
+    results['mode'] = 'inline' if args.inline else 'executor'
+    write_results('login', results, args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Instance read latency as monthly partitions fill up, on PostgreSQL.
+
+Grows routine_instances and task_instances one month at a time, going back
+from the oldest seeded month: every seeded routine gets an instance per day
+with --tasks-per-instance tasks, written server side with generate_series.
+After each month the tables are analyzed and the recent-day reads are timed:
+
+- instances_for_date: GET /routines/instances/{yesterday}
+- instances_range_7d: GET /routines/instances/range/{yesterday - 6}/{yesterday}
+
+With partition pruning both should stay flat however many months lie
+behind them. 2000 users with 5 routines each, 14 tasks per instance and 24
+months make about 100M task rows:
+
+    python -m benchmarks.seed --users 2000 --routines 5 --history-days 7
+    python -m benchmarks.partitions --months 24 --tasks-per-instance 14 --output partitions.json
+
+Needs a database created from postgres/init.sql; re-seed to drop the rows added.
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import date, datetime, timedelta
+
+import httpx
+from sqlalchemy import func, select, text
+
+from src.auth.utils import create_access_token
+from src.database import SessionLocal
+from src.main import app
+from src.models import RoutineInstance, TaskInstance, User
+from src.routines.partitions import ensure_partitions, is_partitioned, month_bounds, month_start
+from .common import summarize, write_results
+from .seed import USERNAME_PREFIX
+
+FILL_INSTANCES = text("""
+    INSERT INTO routine_instances (routine_id, iteration_position, due_date)
+    SELECT routines.id, 0, day
+    FROM routines
+    JOIN users ON users.id = routines.user_id
+    CROSS JOIN generate_series(CAST(:start AS timestamptz), CAST(:end AS timestamptz) - INTERVAL '1 day', INTERVAL '1 day') AS day
+    WHERE users.username LIKE :prefix
+""")
+
+FILL_TASKS = text("""
+    INSERT INTO task_instances (routine_instance_id, due_date, task_id, name, status, progress, evaluation_method, difficulty)
+    SELECT routine_instances.id, routine_instances.due_date, 'task-' || n, 'Task ' || n,
+           'completed', 100, 'YES_NO', 'MEDIUM'
+    FROM routine_instances
+    CROSS JOIN generate_series(1, :tasks) AS n
+    WHERE routine_instances.due_date >= :start AND routine_instances.due_date < :end
+""")
+
+def fill_month(db, month: date, tasks_per_instance: int) -> int:
+    """Add a month of instances and tasks for the seeded routines; returns the task rows added"""
+    ensure_partitions(db, month, month)
+    start, end = month_bounds(month)
+    db.execute(FILL_INSTANCES, {'start': start, 'end': end, 'prefix': f"{USERNAME_PREFIX}%"})
+    added = db.execute(FILL_TASKS, {'start': start, 'end': end, 'tasks': tasks_per_instance}).rowcount
+    db.commit()
+    for table in ('routine_instances', 'task_instances'):
+        db.execute(text(f"ANALYZE {table}"))
+    db.commit()
+    return added
+
+async def time_reads(user_ids: list, day: date, requests: int, rng: random.Random) -> dict:
+    latencies = {'instances_for_date': [], 'instances_range_7d': []}
+    errors = 0
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(requests):
+            headers = {"Authorization": f"Bearer {create_access_token(data={'sub': str(rng.choice(user_ids))})}"}
+            for name, url in (
+                ('instances_for_date', f"/routines/instances/{day}"),
+                ('instances_range_7d', f"/routines/instances/range/{day - timedelta(days=6)}/{day}")
+            ):
+                started = time.perf_counter()
+                response = await client.get(url, headers=headers)
+                latencies[name].append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors += 1
+    return {'errors': errors, **{name: summarize(samples) for name, samples in latencies.items()}}
+
+async def run(months: int, tasks_per_instance: int, requests: int, seed_value: int) -> dict:
+    rng = random.Random(seed_value)
+    db = SessionLocal()
+    try:
+        if not is_partitioned(db):
+            raise SystemExit("routine_instances is not partitioned; use a PostgreSQL database created from postgres/init.sql")
+        user_ids = db.scalars(select(User.id).where(User.username.like(f"{USERNAME_PREFIX}%"))).all()
+        if not user_ids:
+            raise SystemExit("No seeded users found; run python -m benchmarks.seed first")
+
+        day = datetime.now().date() - timedelta(days=1)
+        oldest = db.scalar(select(func.min(RoutineInstance.due_date)))
+        month = month_start(oldest.date() if oldest else day)
+        task_rows = db.scalar(select(func.count()).select_from(TaskInstance))
+
+        steps = [{'months_added': 0, 'task_rows': task_rows, **await time_reads(user_ids, day, requests, rng)}]
+        for step in range(1, months + 1):
+            month = month_start(month - timedelta(days=1))
+            started = time.perf_counter()
+            task_rows += fill_month(db, month, tasks_per_instance)
+            fill_seconds = time.perf_counter() - started
+            steps.append({
+                'months_added': step,
+                'month': f"{month:%Y-%m}",
+                'task_rows': task_rows,
+                'fill_seconds': round(fill_seconds, 1),
+                **await time_reads(user_ids, day, requests, rng)
+            })
+            print(f"{month:%Y-%m}: {task_rows} task rows, "
+                  f"p50 {steps[-1]['instances_for_date']['p50']} / {steps[-1]['instances_range_7d']['p50']} ms")
+    finally:
+        db.close()
+
+    return {
+        'users': len(user_ids),
+        'tasks_per_instance': tasks_per_instance,
+        'read_day': day,
+        'requests_per_step': requests,
+        'steps': steps
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--months', type=int, default=24, help="Months of history to add, one step each")
+    parser.add_argument('--tasks-per-instance', type=int, default=14)
+    parser.add_argument('--requests', type=int, default=50, help="Timed request rounds after each month")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write results to this JSON file")
+    args = parser.parse_args()
+    write_results('partitions', asyncio.run(run(args.months, args.tasks_per_instance, args.requests, args.seed)), args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Throughput of UPR scoring, end to end and for the engine alone.
+
+By default the users of the configured (seeded) database are scored shard
+by shard as the scoring jobs do, timing each step of score_users:
+load_columns (task history into arrays), compute_scores, and store_scores
+(user_scores upsert and leaderboard entries). users_per_second covers all
+three.
+
+--synthetic times compute_scores alone on synthetic columnar history, to
+check the engine at sizes the database does not hold.
+
+    python -m benchmarks.seed --users 20000 --routines 3 --history-days 180
+    python -m benchmarks.scoring --shard-size 5000
+    python -m benchmarks.scoring --synthetic --users 100000 --tasks-per-user 120
+"""
+import argparse
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from src.config import settings
+from src.database import SessionLocal
+from src.routines.jobs import iter_user_id_shards
+from src.scoring.engine import DIFFICULTIES, TaskColumns, compute_scores, day_number, load_columns
+from src.scoring.jobs import score_rows, store_scores
+from .common import write_results
+
+def synthetic_columns(users: int, tasks_per_user: int, seed_value: int, today: int) -> TaskColumns:
+    rng = np.random.default_rng(seed_value)
+    rows = users * tasks_per_user
+    areas_per_user = 3
+    tasks_per_routine_user = 12
+    user = np.repeat(np.arange(users), tasks_per_user)
+    return TaskColumns(
+        user_ids=[f"user-{index}" for index in range(users)],
+        user=user,
+        day=today - rng.integers(0, settings.SCORING_WINDOW_DAYS, rows),
+        completed=rng.random(rows) < 0.7,
+        difficulty=rng.integers(0, len(DIFFICULTIES), rows),
+        progress=rng.choice([0.0, 25.0, 50.0, 100.0], rows),
+        area=np.where(rng.random(rows) < 0.9, user * areas_per_user + rng.integers(0, areas_per_user, rows), -1),
+        task=user * tasks_per_routine_user + rng.integers(0, tasks_per_routine_user, rows),
+        first_day=today - rng.integers(0, 1000, users),
+        area_ids=[f"area-{index}" for index in range(users * areas_per_user)]
+    )
+
+def run_synthetic(users: int, tasks_per_user: int, repeat: int, seed_value: int) -> dict:
+    as_of = datetime.now().date()
+    columns = synthetic_columns(users, tasks_per_user, seed_value, day_number(as_of))
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        scores = compute_scores(columns, as_of)
+        timings.append(time.perf_counter() - started)
+
+    best = min(timings)
+    return {
+        'users': users,
+        'task_rows': len(columns.user),
+        'window_days': settings.SCORING_WINDOW_DAYS,
+        'compute_seconds': [round(seconds, 3) for seconds in timings],
+        'users_per_second': round(users / best, 1),
+        'rows_per_second': round(len(columns.user) / best, 1),
+        'upr_p50': round(float(np.percentile(scores.upr, 50)), 2),
+        'tiers': {tier: int(count) for tier, count in zip(*np.unique(scores.tier, return_counts=True))}
+    }
+
+def run_database(shard_size: int) -> dict:
+    as_of = datetime.now().date()
+    seconds = {'load': 0.0, 'compute': 0.0, 'store': 0.0}
+    users = rows = shards = 0
+    db = SessionLocal()
+    try:
+        for user_ids in iter_user_id_shards(db, shard_size):
+            started = time.perf_counter()
+            columns = load_columns(db, user_ids, as_of)
+            loaded = time.perf_counter()
+            scores = compute_scores(columns, as_of)
+            computed = time.perf_counter()
+            store_scores(db, score_rows(user_ids, scores, datetime.now(timezone.utc)))
+            seconds['load'] += loaded - started
+            seconds['compute'] += computed - loaded
+            seconds['store'] += time.perf_counter() - computed
+            users += len(user_ids)
+            rows += len(columns.user)
+            shards += 1
+    finally:
+        db.close()
+
+    total = sum(seconds.values())
+    return {
+        'users': users,
+        'task_rows': rows,
+        'shards': shards,
+        'shard_size': shard_size,
+        'window_days': settings.SCORING_WINDOW_DAYS,
+        'seconds': {step: round(value, 3) for step, value in seconds.items()},
+        'total_seconds': round(total, 3),
+        'users_per_second': round(users / total, 1) if total else 0.0,
+        'rows_per_second': round(rows / total, 1) if total else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--synthetic', action='store_true', help="Time compute_scores alone on synthetic data")
+    parser.add_argument('--shard-size', type=int, default=settings.SCORING_SHARD_SIZE)
+    parser.add_argument('--users', type=int, default=100000, help="Synthetic users")
+    parser.add_argument('--tasks-per-user', type=int, default=120, help="Synthetic task instances per user in the window")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write results to this JSON file")
+    args = parser.parse_args()
+    if args.synthetic:
+        results = run_synthetic(args.users, args.tasks_per_user, args.repeat, args.seed)
+    else:
+        results = run_database(args.shard_size)
+    write_results('scoring', results, args.output)
+
+if __name__ == '__main__':
+    main()
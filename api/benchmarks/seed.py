@@ -0,0 +1,243 @@
+"""Seed the configured database with synthetic Questify data.
+
+Creates users with areas, projects and recurring routines whose queues mix
+TASK and COOLDOWN items over several iterations. It also writes
+RoutineInstance/TaskInstance history for the days before today, following
+each routine's recurrence and rotation. All users share PASSWORD so the
+load tests can log in as them.
+
+    python -m benchmarks.seed --users 200 --routines 6 --history-days 120
+    python -m benchmarks.seed --reset-only
+
+Data is deterministic for a given --seed. Previously seeded users (those
+named with USERNAME_PREFIX) are removed first.
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert, select
+
+from src.auth.hashing import password_hasher
+from src.database import SessionLocal, create_dev_tables
+from src.leaderboards.entries import record_removals
+from src.models import (
+    Area, DailySummary, LeaderboardEntry, Project, Routine, RoutineInstance, Streak, TaskHistory, TaskInstance, User,
+    UserScore, XpEvent
+)
+from src.routines.partitions import ensure_partitions, is_partitioned
+from src.routines.recurrence import compile_rule
+from src.routines.summary import rebuild_daily_summaries
+from .common import write_results
+
+USERNAME_PREFIX = "bench-user-"
+PASSWORD = "benchmark-password"
+CHUNK_SIZE = 5000
+
+FREQUENCIES = [
+    'daily', 'daily', 'weekly', 'monthly',
+    'FREQ=WEEKLY;BYDAY=MO,WE,FR',
+    'FREQ=DAILY;INTERVAL=2',
+    'FREQ=WEEKLY;INTERVAL=2;BYDAY=TU,TH',
+    'FREQ=MONTHLY;BYMONTHDAY=1,15,-1'
+]
+TASK_NAMES = ['Push-ups', 'Read', 'Meditate', 'Run', 'Stretch', 'Journal', 'Study', 'Practice scales']
+
+def username(index: int) -> str:
+    return f"{USERNAME_PREFIX}{index}"
+
+def make_queue(rng: random.Random, area_ids: list, project_ids: list) -> dict:
+    """A queue of 2-4 iterations, each with 1-4 tasks and sometimes a cooldown"""
+    iterations = []
+    for position in range(rng.randint(2, 4)):
+        items = []
+        for index in range(rng.randint(1, 4)):
+            numeric = rng.random() < 0.4
+            timed = rng.random() < 0.3
+            items.append({
+                'id': f"task-{position}-{index}",
+                'type': 'TASK',
+                'name': rng.choice(TASK_NAMES),
+                'evaluation_method': 'NUMERIC' if numeric else 'YES_NO',
+                'target_value': float(rng.choice([10, 20, 30, 50])) if numeric else None,
+                'has_specific_time': timed,
+                'execution_time': f"{rng.randint(6, 21):02d}:00" if timed else None,
+                'duration': rng.choice([15, 30, 45, 60]) if timed else None,
+                'area_id': str(rng.choice(area_ids)),
+                'project_id': str(rng.choice(project_ids)) if project_ids and rng.random() < 0.5 else None,
+                'difficulty': rng.choice(['TRIVIAL', 'EASY', 'MEDIUM', 'HARD'])
+            })
+        if rng.random() < 0.3:
+            items.append({
+                'id': f"cooldown-{position}",
+                'type': 'COOLDOWN',
+                'name': 'Rest',
+                'duration': rng.choice(['1d', '12h']),
+                'description': 'Recovery period'
+            })
+        iterations.append({'id': f"iteration-{position}", 'position': position, 'items': items})
+    return {'iterations': iterations, 'rotation_type': 'sequential'}
+
+def history_rows(rng: random.Random, routine: Routine, start: date, end: date):
+    """Instance and task rows for a routine's past occurrences, rotating through its queue"""
+    instances, tasks = [], []
+    rule = compile_rule(routine)
+    iterations = routine.queue['iterations']
+    for position_counter, day in enumerate(rule.dates(start, end) if rule else []):
+        position = position_counter % len(iterations)
+        instance_id = uuid.uuid4()
+        due_date = datetime.combine(day, datetime.min.time())
+        instances.append({
+            'id': instance_id,
+            'routine_id': routine.id,
+            'iteration_position': position,
+            'due_date': due_date
+        })
+        for item in iterations[position]['items']:
+            if item['type'] != 'TASK':
+                continue
+            completed = rng.random() < 0.7
+            tasks.append({
+                'id': uuid.uuid4(),
+                'routine_instance_id': instance_id,
+                'due_date': due_date,
+                'task_id': item['id'],
+                'name': item['name'],
+                'evaluation_method': item['evaluation_method'],
+                'target_value': item['target_value'],
+                'execution_time': item['execution_time'],
+                'duration': item['duration'],
+                'difficulty': item['difficulty'],
+                'status': 'completed' if completed else 'pending',
+                'progress': 100 if completed else rng.choice([0, 0, 25, 50]),
+                'completion_date': due_date.replace(hour=20, tzinfo=timezone.utc) if completed else None
+            })
+    return instances, tasks
+
+def _insert(db, model, rows: list) -> None:
+    for offset in range(0, len(rows), CHUNK_SIZE):
+        db.execute(insert(model), rows[offset:offset + CHUNK_SIZE])
+
+def reset(db) -> int:
+    """Delete previously seeded users and everything they own"""
+    user_ids = select(User.id).where(User.username.like(f"{USERNAME_PREFIX}%"))
+    routine_ids = select(Routine.id).where(Routine.user_id.in_(user_ids))
+    instance_ids = select(RoutineInstance.id).where(RoutineInstance.routine_id.in_(routine_ids))
+    area_ids = select(Area.id).where(Area.user_id.in_(user_ids))
+
+    # Explicit deletes so this also works where ON DELETE CASCADE is not enforced
+    db.execute(delete(XpEvent).where(XpEvent.area_id.in_(area_ids)))
+    db.execute(delete(TaskInstance).where(TaskInstance.routine_instance_id.in_(instance_ids)))
+    db.execute(delete(RoutineInstance).where(RoutineInstance.routine_id.in_(routine_ids)))
+    db.execute(delete(TaskHistory).where(TaskHistory.user_id.in_(user_ids)))
+    db.execute(delete(Routine).where(Routine.id.in_(routine_ids)))
+    db.execute(delete(Project).where(Project.area_id.in_(area_ids)))
+    db.execute(delete(Area).where(Area.id.in_(area_ids)))
+    db.execute(delete(DailySummary).where(DailySummary.user_id.in_(user_ids)))
+    db.execute(delete(UserScore).where(UserScore.user_id.in_(user_ids)))
+    db.execute(delete(Streak).where(Streak.user_id.in_(user_ids)))
+    # So the API's leaderboard index drops the seeded users without waiting for a full reload
+    record_removals(db, db.scalars(
+        select(LeaderboardEntry.user_id).where(LeaderboardEntry.user_id.in_(user_ids)).distinct()
+    ).all())
+    db.execute(delete(LeaderboardEntry).where(LeaderboardEntry.user_id.in_(user_ids)))
+    removed = db.execute(delete(User).where(User.username.like(f"{USERNAME_PREFIX}%"))).rowcount
+    db.commit()
+    return removed
+
+def seed(users: int, areas: int, projects: int, routines: int, history_days: int, seed_value: int) -> dict:
+    rng = random.Random(seed_value)
+    today = datetime.now().date()
+    history_start = today - timedelta(days=history_days)
+    created_at = datetime.combine(history_start, datetime.min.time(), tzinfo=timezone.utc)
+    hashed_password = password_hasher.context.hash(PASSWORD)
+
+    create_dev_tables()
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        removed = reset(db)
+        if is_partitioned(db):
+            ensure_partitions(db, history_start, today)
+
+        rows = {model: [] for model in (User, Area, Project, Routine, RoutineInstance, TaskInstance)}
+        for user_index in range(users):
+            user_id = uuid.uuid4()
+            rows[User].append({
+                'id': user_id,
+                'username': username(user_index),
+                'email': f"{username(user_index)}@example.com",
+                'hashed_password': hashed_password
+            })
+
+            area_ids, project_ids = [], []
+            for area_index in range(areas):
+                area_id = uuid.uuid4()
+                area_ids.append(area_id)
+                rows[Area].append({'id': area_id, 'name': f"Area {area_index}", 'xp': 0, 'user_id': user_id})
+                for project_index in range(projects):
+                    project_id = uuid.uuid4()
+                    project_ids.append(project_id)
+                    rows[Project].append({'id': project_id, 'name': f"Project {project_index}", 'area_id': area_id})
+
+            for routine_index in range(routines):
+                routine = Routine(
+                    id=uuid.uuid4(),
+                    name=f"Routine {routine_index}",
+                    user_id=user_id,
+                    is_recurring=True,
+                    frequency=rng.choice(FREQUENCIES),
+                    start_date=created_at,
+                    queue=make_queue(rng, area_ids, project_ids),
+                    created_at=created_at
+                )
+                rows[Routine].append({
+                    column: getattr(routine, column)
+                    for column in ('id', 'name', 'user_id', 'is_recurring', 'frequency', 'start_date', 'queue', 'created_at')
+                })
+                instances, tasks = history_rows(rng, routine, history_start, today - timedelta(days=1))
+                rows[RoutineInstance].extend(instances)
+                rows[TaskInstance].extend(tasks)
+
+        for model, model_rows in rows.items():
+            _insert(db, model, model_rows)
+        db.commit()
+        rebuild_daily_summaries(db, [row['id'] for row in rows[User]])
+
+        return {
+            'seed': seed_value,
+            'removed_users': removed,
+            'history_start': history_start,
+            'rows': {model.__tablename__: len(model_rows) for model, model_rows in rows.items()},
+            'seconds': round(time.perf_counter() - started, 2)
+        }
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--areas', type=int, default=3, help="Areas per user")
+    parser.add_argument('--projects', type=int, default=2, help="Projects per area")
+    parser.add_argument('--routines', type=int, default=5, help="Routines per user")
+    parser.add_argument('--history-days', type=int, default=90)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reset-only', action='store_true', help="Only remove previously seeded data")
+    parser.add_argument('--output', help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    if args.reset_only:
+        db = SessionLocal()
+        try:
+            write_results('seed', {'removed_users': reset(db)}, args.output)
+        finally:
+            db.close()
+        return
+
+    results = seed(args.users, args.areas, args.projects, args.routines, args.history_days, args.seed)
+    write_results('seed', results, args.output)
+
+if __name__ == '__main__':
+    main()
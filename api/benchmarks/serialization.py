@@ -0,0 +1,188 @@
+"""Serialization cost of large routine queues, before and after src.serialization.
+
+- queue_write: RoutineCreate -> JSONB-ready queue. "legacy" is the former
+  json.loads(json.dumps(..., cls=CustomJSONEncoder)) round trip, "current"
+  is serialization.jsonb_ready.
+- routine_response: a Routine read -> response bytes. "legacy" is
+  jsonable_encoder + json.dumps (FastAPI's JSONResponse path), "current" is
+  the pydantic-core dump FastAPI uses for routes with a response model.
+- projection_response: ?fields= rows -> response bytes, JSONResponse with
+  jsonable_encoder against FastJSONResponse.
+
+--http also times POST /routines/ and GET /routines/{id} with the same queue
+for a seeded user, end to end against the configured database; compare runs
+across revisions for those.
+
+    python -m benchmarks.serialization --iterations 40 --items 25
+    python -m benchmarks.serialization --http --requests 50
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from datetime import date, datetime, timezone
+from json import JSONEncoder
+from types import SimpleNamespace
+from typing import Callable, List
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import delete, select
+
+from src.auth.utils import create_access_token
+from src.database import SessionLocal
+from src.main import app
+from src.models import Routine, User
+from src.schemas import Routine as RoutineSchema, RoutineCreate
+from src.serialization import FastJSONResponse, jsonb_ready
+from .common import summarize, write_results
+from .seed import USERNAME_PREFIX
+
+class _LegacyEncoder(JSONEncoder):
+    """The CustomJSONEncoder routines used before src.serialization"""
+
+    def default(self, obj):
+        if isinstance(obj, uuid.UUID):
+            return str(obj)
+        if isinstance(obj, (datetime, date)):
+            return obj.isoformat()
+        if hasattr(obj, '__dict__'):
+            return obj.__dict__
+        return super().default(obj)
+
+def large_queue(iterations: int, items: int) -> dict:
+    return {
+        'iterations': [
+            {
+                'id': f"iteration-{position}",
+                'position': position,
+                'items': [
+                    {
+                        'id': f"task-{position}-{index}",
+                        'type': 'TASK',
+                        'name': f"Task {index}",
+                        'description': "Synthetic task used to size the queue " * 2,
+                        'evaluation_method': 'NUMERIC',
+                        'target_value': 30.0,
+                        'has_specific_time': True,
+                        'execution_time': "07:30",
+                        'duration': 45,
+                        'area_id': str(uuid.uuid4()),
+                        'project_id': str(uuid.uuid4()),
+                        'difficulty': 'HARD'
+                    }
+                    for index in range(items)
+                ]
+            }
+            for position in range(iterations)
+        ],
+        'rotation_type': 'sequential'
+    }
+
+def _time(func: Callable, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+def time_in_process(payload: dict, repeat: int) -> dict:
+    routine_data = RoutineCreate.model_validate(payload)
+    now = datetime.now(timezone.utc)
+    stored = SimpleNamespace(
+        id=uuid.uuid4(), created_at=now, updated_at=now,
+        **{**routine_data.model_dump(exclude={'queue'}), 'queue': jsonb_ready(routine_data.queue)}
+    )
+    routine_adapter = TypeAdapter(RoutineSchema)
+    rows = [SimpleNamespace(id=uuid.uuid4(), name=f"Routine {index}", queue=stored.queue) for index in range(20)]
+    fields = ['id', 'name', 'queue']
+
+    return {
+        'queue_write': {
+            'legacy': _time(lambda: json.loads(json.dumps(routine_data.model_dump(), cls=_LegacyEncoder)), repeat),
+            'current': _time(lambda: jsonb_ready(routine_data.queue), repeat)
+        },
+        'routine_response': {
+            'legacy': _time(
+                lambda: JSONResponse(jsonable_encoder(RoutineSchema.model_validate(stored))).body, repeat
+            ),
+            'current': _time(
+                lambda: routine_adapter.dump_json(RoutineSchema.model_validate(stored)), repeat
+            )
+        },
+        'projection_response': {
+            'legacy': _time(
+                lambda: JSONResponse(jsonable_encoder([{field: getattr(row, field) for field in fields} for row in rows])).body,
+                repeat
+            ),
+            'current': _time(
+                lambda: FastJSONResponse([{field: getattr(row, field) for field in fields} for row in rows]).body,
+                repeat
+            )
+        }
+    }
+
+async def time_http(payload: dict, requests: int) -> dict:
+    db = SessionLocal()
+    try:
+        user_id = db.scalar(select(User.id).where(User.username.like(f"{USERNAME_PREFIX}%")).limit(1))
+    finally:
+        db.close()
+    if user_id is None:
+        raise SystemExit("No seeded users found; run python -m benchmarks.seed first")
+
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': str(user_id)})}"}
+    created: List[str] = []
+    latencies = {'create_routine': [], 'get_routine': []}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = await client.post("/routines/", json=payload, headers=headers)
+            latencies['create_routine'].append(time.perf_counter() - started)
+            response.raise_for_status()
+            created.append(response.json()['id'])
+        for routine_id in created:
+            started = time.perf_counter()
+            (await client.get(f"/routines/{routine_id}", headers=headers)).raise_for_status()
+            latencies['get_routine'].append(time.perf_counter() - started)
+
+    db = SessionLocal()
+    try:
+        db.execute(delete(Routine).where(Routine.id.in_([uuid.UUID(routine_id) for routine_id in created])))
+        db.commit()
+    finally:
+        db.close()
+    return {name: summarize(samples) for name, samples in latencies.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=40, help="Queue iterations")
+    parser.add_argument('--items', type=int, default=25, help="Tasks per iteration")
+    parser.add_argument('--repeat', type=int, default=50, help="Runs of each in-process conversion")
+    parser.add_argument('--http', action='store_true', help="Also time routine writes and reads through the API")
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--output', help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    payload = {
+        'name': "Large routine",
+        'is_recurring': True,
+        'frequency': 'daily',
+        'start_date': datetime.now(timezone.utc).isoformat(),
+        'queue': large_queue(args.iterations, args.items)
+    }
+    results = {
+        'queue_items': args.iterations * args.items,
+        'payload_bytes': len(json.dumps(payload)),
+        **time_in_process(payload, args.repeat)
+    }
+    if args.http:
+        results['http'] = asyncio.run(time_http(payload, args.requests))
+    write_results('serialization', results, args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Alembic environment for the PostgreSQL schema.
+
+Databases created from postgres/init.sql are already at its latest revision.
+Databases from before migrations are stamped with the baseline first, then
+upgraded, before the new code is started:
+
+    alembic stamp 0001
+    alembic upgrade head
+
+Earlier versions of the app created missing tables at startup, so the
+revisions that add tables and columns skip the ones that already exist.
+"""
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from src.config import settings
+from src.database import Base
+import src.models  # noqa: F401  registers the tables on Base.metadata
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+def run_migrations_offline() -> None:
+    """Emit the migration SQL without connecting"""
+    context.configure(url=settings.DATABASE_URL, target_metadata=target_metadata, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online() -> None:
+    connectable = create_engine(settings.DATABASE_URL, poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,28 @@
+"""Baseline: the schema from before migrations
+
+The users, areas, projects, routines, routine_instances and task_instances
+tables as the original postgres/init.sql and the app's create_all made
+them. This revision changes nothing; databases from before migrations are
+stamped with it, and the revisions after it bring them up to date.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Nothing to do; existing databases are stamped with this revision."""
+    pass
+
+
+def downgrade() -> None:
+    pass
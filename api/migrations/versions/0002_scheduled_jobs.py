@@ -0,0 +1,50 @@
+"""Scheduled jobs table
+
+Job definitions, last-run watermarks and worker leases of the in-process
+scheduler (src/scheduler.py).
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'scheduled_jobs',
+        sa.Column('name', sa.String(100), primary_key=True),
+        sa.Column('schedule', sa.String(50), nullable=False),
+        sa.Column('last_run_at', sa.DateTime(timezone=True)),
+        sa.Column('locked_by', sa.String(255)),
+        sa.Column('locked_until', sa.DateTime(timezone=True)),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        if_not_exists=True
+    )
+    op.execute("""
+        DO $$ BEGIN
+            IF to_regproc('update_updated_at_column') IS NOT NULL THEN
+                CREATE OR REPLACE TRIGGER update_scheduled_jobs_updated_at
+                    BEFORE UPDATE ON scheduled_jobs
+                    FOR EACH ROW
+                    EXECUTE FUNCTION update_updated_at_column();
+            END IF;
+        END $$
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('scheduled_jobs')
@@ -0,0 +1,30 @@
+"""Longer routine frequencies
+
+Frequencies may hold an RRULE-style recurrence rule as well as 'daily',
+'weekly' or 'monthly'.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column('routines', 'frequency', type_=sa.String(255), existing_type=sa.String(50))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('routines', 'frequency', type_=sa.String(50), existing_type=sa.String(255))
@@ -0,0 +1,36 @@
+"""Indexes for keyset pagination and date range reads
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = (
+    ('ix_areas_user_created', 'areas', ['user_id', 'created_at', 'id']),
+    ('ix_projects_area_created', 'projects', ['area_id', 'created_at', 'id']),
+    ('ix_routines_user_created', 'routines', ['user_id', 'created_at', 'id']),
+    ('ix_routine_instances_routine_due', 'routine_instances', ['routine_id', 'due_date', 'id']),
+    ('ix_task_instances_routine_instance', 'task_instances', ['routine_instance_id']),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,44 @@
+"""Difficulty on task instances
+
+Task instances keep the difficulty of their queue item, which sets the XP
+of a completion. Existing tasks take it from their routine's queue where
+the item still has one, and MEDIUM otherwise.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'task_instances',
+        sa.Column('difficulty', sa.String(20), nullable=False, server_default='MEDIUM')
+    )
+    op.execute("""
+        UPDATE task_instances SET difficulty = item->>'difficulty'
+        FROM routine_instances, routines,
+            jsonb_array_elements(routines.queue->'iterations') iteration,
+            jsonb_array_elements(iteration->'items') item
+        WHERE routine_instances.id = task_instances.routine_instance_id
+        AND routines.id = routine_instances.routine_id
+        AND item->>'id' = task_instances.task_id
+        AND item->>'difficulty' IN ('TRIVIAL', 'EASY', 'MEDIUM', 'HARD')
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('task_instances', 'difficulty')
@@ -0,0 +1,53 @@
+"""Daily summaries table
+
+Per-user rollup of task instances for calendar views, kept up to date as
+tasks change. Fill it for existing instances afterwards
+(python -m src.cli rebuild-summaries).
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'daily_summaries',
+        sa.Column('user_id', sa.UUID(), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('instances', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('tasks_total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('tasks_completed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('tasks_pending', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('progress_total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('xp_earned', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        if_not_exists=True
+    )
+    op.execute("""
+        DO $$ BEGIN
+            IF to_regproc('update_updated_at_column') IS NOT NULL THEN
+                CREATE OR REPLACE TRIGGER update_daily_summaries_updated_at
+                    BEFORE UPDATE ON daily_summaries
+                    FOR EACH ROW
+                    EXECUTE FUNCTION update_updated_at_column();
+            END IF;
+        END $$
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('daily_summaries')
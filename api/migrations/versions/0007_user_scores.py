@@ -0,0 +1,56 @@
+"""User scores table
+
+Latest User Performance Rating of each user and its components, written
+by the rescore jobs.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'user_scores',
+        sa.Column('user_id', sa.UUID(), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('upr', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('area_mastery', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('task_complexity', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('consistency', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('diversity', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('consistency_modifier', sa.Float(), nullable=False, server_default='1'),
+        sa.Column('tier', sa.String(20), nullable=False, server_default='BRONZE'),
+        sa.Column('area_scores', postgresql.JSONB(), nullable=False, server_default='{}'),
+        sa.Column('computed_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        if_not_exists=True
+    )
+    op.execute("""
+        DO $$ BEGIN
+            IF to_regproc('update_updated_at_column') IS NOT NULL THEN
+                CREATE OR REPLACE TRIGGER update_user_scores_updated_at
+                    BEFORE UPDATE ON user_scores
+                    FOR EACH ROW
+                    EXECUTE FUNCTION update_updated_at_column();
+            END IF;
+        END $$
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_scores')
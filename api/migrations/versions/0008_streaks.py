@@ -0,0 +1,55 @@
+"""Streaks table
+
+Consecutive active days per user, overall (no area) and per area. Existing
+history is not replayed; streaks start counting from the next completion.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'streaks',
+        sa.Column('id', sa.UUID(), primary_key=True, server_default=sa.text('gen_random_uuid()')),
+        sa.Column('user_id', sa.UUID(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('area_id', sa.UUID(), sa.ForeignKey('areas.id', ondelete='CASCADE')),
+        sa.Column('current_streak', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('longest_streak', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_active_date', sa.Date()),
+        sa.Column('last_counted_date', sa.Date()),
+        sa.Column('grace_tokens', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.UniqueConstraint('user_id', 'area_id', postgresql_nulls_not_distinct=True),
+        if_not_exists=True
+    )
+    op.create_index('ix_streaks_last_counted', 'streaks', ['last_counted_date'], if_not_exists=True)
+    op.execute("""
+        DO $$ BEGIN
+            IF to_regproc('update_updated_at_column') IS NOT NULL THEN
+                CREATE OR REPLACE TRIGGER update_streaks_updated_at
+                    BEFORE UPDATE ON streaks
+                    FOR EACH ROW
+                    EXECUTE FUNCTION update_updated_at_column();
+            END IF;
+        END $$
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('streaks')
@@ -0,0 +1,48 @@
+"""Leaderboard entries table
+
+Scores per board ("global", "tier:GOLD", "area:fitness"), ranked in
+process by the API. The rebuild-leaderboards job fills it.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, Sequence[str], None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'leaderboard_entries',
+        sa.Column('board', sa.String(120), primary_key=True),
+        sa.Column('user_id', sa.UUID(), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        if_not_exists=True
+    )
+    op.create_index('ix_leaderboard_entries_updated', 'leaderboard_entries', ['updated_at'], if_not_exists=True)
+    op.execute("""
+        DO $$ BEGIN
+            IF to_regproc('update_updated_at_column') IS NOT NULL THEN
+                CREATE OR REPLACE TRIGGER update_leaderboard_entries_updated_at
+                    BEFORE UPDATE ON leaderboard_entries
+                    FOR EACH ROW
+                    EXECUTE FUNCTION update_updated_at_column();
+            END IF;
+        END $$
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('leaderboard_entries')
@@ -0,0 +1,46 @@
+"""XP events table
+
+Ledger of the XP awarded per task completion, folded into areas.xp in
+batches by the aggregator job. XP already on areas stays there.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, Sequence[str], None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'xp_events',
+        sa.Column('id', sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column('area_id', sa.UUID(), sa.ForeignKey('areas.id', ondelete='CASCADE'), nullable=False),
+        sa.Column(
+            'task_instance_id', sa.UUID(), sa.ForeignKey('task_instances.id', ondelete='CASCADE'),
+            nullable=False, unique=True
+        ),
+        sa.Column('xp', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('applied_at', sa.DateTime(timezone=True)),
+        if_not_exists=True
+    )
+    op.create_index(
+        'ix_xp_events_pending', 'xp_events', ['area_id'],
+        postgresql_where=sa.text('applied_at IS NULL'), if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('xp_events')
@@ -0,0 +1,47 @@
+"""Task history table
+
+Compact archive of task instances past the retention window, plus the
+due date index the retention and purge jobs scan routine instances by.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0011'
+down_revision: Union[str, Sequence[str], None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'task_history',
+        sa.Column('task_instance_id', sa.UUID(), primary_key=True),
+        sa.Column('user_id', sa.UUID(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('routine_id', sa.UUID(), sa.ForeignKey('routines.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('due_date', sa.Date(), nullable=False),
+        sa.Column('task_id', sa.String(100), nullable=False),
+        sa.Column('name', sa.String(100), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('progress', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('difficulty', sa.String(20), nullable=False),
+        sa.Column('completion_date', sa.DateTime(timezone=True)),
+        sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        if_not_exists=True
+    )
+    op.create_index('ix_task_history_user_due', 'task_history', ['user_id', 'due_date'], if_not_exists=True)
+    op.create_index('ix_routine_instances_due', 'routine_instances', ['due_date', 'id'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_routine_instances_due', table_name='routine_instances')
+    op.drop_table('task_history')
@@ -0,0 +1,160 @@
+"""Partition routine_instances and task_instances by month of due_date
+
+Task instances get a due_date, copied from their routine instance, so both
+tables can be range partitioned on it and a date range read only touches
+the months it covers. Both tables are rebuilt: the rows are copied into
+new partitioned tables, task due dates filled in from their instance on
+the way, and the old tables dropped. This rewrites every instance row in
+one transaction; run it during a maintenance window.
+
+Monthly partitions with UTC bounds are created from the month of the
+oldest instance through the later of the newest instance's month and four
+months ahead, as postgres/init.sql does; the maintain-partitions job keeps
+creating the next ones, moving in any rows of theirs the default partitions
+caught. Primary keys become (id, due_date), and task
+instances reference (id, due_date) of their instance. xp_events loses its
+foreign key to task_instances, which a partitioned table's id alone cannot
+back.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0012'
+down_revision: Union[str, Sequence[str], None] = '0011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('routine_instances', 'task_instances')
+
+
+def _set_aside(table: str, suffix: str) -> None:
+    """Rename a table and its primary key out of the way of its replacement"""
+    op.execute(f"ALTER TABLE {table} RENAME TO {table}_{suffix}")
+    op.execute(f"ALTER INDEX IF EXISTS {table}_pkey RENAME TO {table}_{suffix}_pkey")
+
+
+def _create_updated_at_triggers() -> None:
+    """The updated_at triggers of init.sql, on databases that have its trigger function"""
+    for table in TABLES:
+        op.execute(f"""
+            DO $$ BEGIN
+                IF to_regproc('update_updated_at_column') IS NOT NULL THEN
+                    CREATE TRIGGER update_{table}_updated_at
+                        BEFORE UPDATE ON {table}
+                        FOR EACH ROW
+                        EXECUTE FUNCTION update_updated_at_column();
+                END IF;
+            END $$
+        """)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE xp_events DROP CONSTRAINT IF EXISTS xp_events_task_instance_id_fkey")
+    for table in TABLES:
+        _set_aside(table, 'unpartitioned')
+
+    # LIKE keeps the column types and defaults, whichever way the tables were created
+    op.execute("""
+        CREATE TABLE routine_instances (
+            LIKE routine_instances_unpartitioned INCLUDING DEFAULTS,
+            PRIMARY KEY (id, due_date),
+            FOREIGN KEY (routine_id) REFERENCES routines (id) ON DELETE CASCADE
+        ) PARTITION BY RANGE (due_date)
+    """)
+    op.execute("""
+        CREATE TABLE task_instances (
+            LIKE task_instances_unpartitioned INCLUDING DEFAULTS,
+            due_date TIMESTAMP WITH TIME ZONE NOT NULL, -- Copied from the routine instance
+            PRIMARY KEY (id, due_date),
+            FOREIGN KEY (routine_instance_id, due_date) REFERENCES routine_instances (id, due_date) ON DELETE CASCADE
+        ) PARTITION BY RANGE (due_date)
+    """)
+    op.execute("CREATE TABLE routine_instances_default PARTITION OF routine_instances DEFAULT")
+    op.execute("CREATE TABLE task_instances_default PARTITION OF task_instances DEFAULT")
+    op.execute("""
+        DO $$
+        DECLARE
+            month DATE;
+            last_month DATE;
+            tbl TEXT;
+        BEGIN
+            SELECT
+                least(date_trunc('month', min(due_date) AT TIME ZONE 'UTC'), date_trunc('month', now() AT TIME ZONE 'UTC')),
+                greatest(date_trunc('month', max(due_date) AT TIME ZONE 'UTC'), date_trunc('month', now() AT TIME ZONE 'UTC') + INTERVAL '4 months')
+            INTO month, last_month
+            FROM routine_instances_unpartitioned;
+            WHILE month <= last_month LOOP
+                FOREACH tbl IN ARRAY ARRAY['routine_instances', 'task_instances'] LOOP
+                    EXECUTE format(
+                        'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                        tbl || '_' || to_char(month, 'YYYY_MM'), tbl,
+                        month::text || ' 00:00:00+00', (month + INTERVAL '1 month')::date::text || ' 00:00:00+00'
+                    );
+                END LOOP;
+                month := month + INTERVAL '1 month';
+            END LOOP;
+        END $$
+    """)
+
+    op.execute("INSERT INTO routine_instances SELECT * FROM routine_instances_unpartitioned")
+    op.execute("""
+        INSERT INTO task_instances
+        SELECT task_instances_unpartitioned.*, routine_instances_unpartitioned.due_date
+        FROM task_instances_unpartitioned
+        JOIN routine_instances_unpartitioned
+            ON routine_instances_unpartitioned.id = task_instances_unpartitioned.routine_instance_id
+    """)
+    op.execute("DROP TABLE task_instances_unpartitioned")
+    op.execute("DROP TABLE routine_instances_unpartitioned")
+
+    # The indexes the tables had, now on every partition
+    op.create_index('ix_routine_instances_routine_due', 'routine_instances', ['routine_id', 'due_date', 'id'])
+    op.create_index('ix_routine_instances_due', 'routine_instances', ['due_date', 'id'])
+    op.create_index('ix_task_instances_routine_instance', 'task_instances', ['routine_instance_id'])
+    _create_updated_at_triggers()
+    for table in TABLES:
+        op.execute(f"ANALYZE {table}")
+
+
+def downgrade() -> None:
+    """Downgrade schema.
+
+    xp_events does not get its foreign key back: events of tasks archived
+    or purged since may no longer have a task instance.
+    """
+    for table in TABLES:
+        _set_aside(table, 'partitioned')
+
+    op.execute("""
+        CREATE TABLE routine_instances (
+            LIKE routine_instances_partitioned INCLUDING DEFAULTS,
+            PRIMARY KEY (id),
+            FOREIGN KEY (routine_id) REFERENCES routines (id) ON DELETE CASCADE
+        )
+    """)
+    op.execute("INSERT INTO routine_instances SELECT * FROM routine_instances_partitioned")
+    op.execute("""
+        CREATE TABLE task_instances (
+            LIKE task_instances_partitioned INCLUDING DEFAULTS,
+            PRIMARY KEY (id),
+            FOREIGN KEY (routine_instance_id) REFERENCES routine_instances (id) ON DELETE CASCADE
+        )
+    """)
+    op.execute("INSERT INTO task_instances SELECT * FROM task_instances_partitioned")
+    op.execute("ALTER TABLE task_instances DROP COLUMN due_date")
+    # Dropping a partitioned table drops its partitions
+    op.execute("DROP TABLE task_instances_partitioned")
+    op.execute("DROP TABLE routine_instances_partitioned")
+
+    op.create_index('ix_routine_instances_routine_due', 'routine_instances', ['routine_id', 'due_date', 'id'])
+    op.create_index('ix_routine_instances_due', 'routine_instances', ['due_date', 'id'])
+    op.create_index('ix_task_instances_routine_instance', 'task_instances', ['routine_instance_id'])
+    _create_updated_at_triggers()
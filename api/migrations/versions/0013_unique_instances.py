@@ -0,0 +1,88 @@
+"""Unique routine instances per day and task instances per queue item
+
+Generation inserts with ON CONFLICT DO NOTHING against these indexes, so
+concurrent runs cannot create duplicates. Duplicates made before are
+removed first, keeping the copy with the most progress. Rebuild the daily
+summaries afterwards (python -m src.cli rebuild-summaries).
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0013'
+down_revision: Union[str, Sequence[str], None] = '0012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("""
+        CREATE TEMPORARY TABLE duplicate_instances ON COMMIT DROP AS
+        SELECT id, due_date FROM (
+            SELECT routine_instances.id, routine_instances.due_date, row_number() OVER (
+                PARTITION BY routine_instances.routine_id, routine_instances.due_date
+                ORDER BY (
+                    SELECT coalesce(sum(task_instances.progress), 0) FROM task_instances
+                    WHERE task_instances.routine_instance_id = routine_instances.id
+                    AND task_instances.due_date = routine_instances.due_date
+                ) DESC, routine_instances.created_at, routine_instances.id
+            ) AS rank
+            FROM routine_instances
+        ) ranked
+        WHERE rank > 1
+    """)
+    # XP events have no foreign key to cascade from
+    op.execute("""
+        DELETE FROM xp_events USING task_instances, duplicate_instances
+        WHERE xp_events.task_instance_id = task_instances.id
+        AND task_instances.routine_instance_id = duplicate_instances.id
+        AND task_instances.due_date = duplicate_instances.due_date
+    """)
+    op.execute("""
+        DELETE FROM routine_instances USING duplicate_instances
+        WHERE routine_instances.id = duplicate_instances.id
+        AND routine_instances.due_date = duplicate_instances.due_date
+    """)
+
+    op.execute("""
+        CREATE TEMPORARY TABLE duplicate_tasks ON COMMIT DROP AS
+        SELECT id, due_date FROM (
+            SELECT id, due_date, row_number() OVER (
+                PARTITION BY routine_instance_id, due_date, task_id
+                ORDER BY progress DESC NULLS LAST, created_at, id
+            ) AS rank
+            FROM task_instances
+        ) ranked
+        WHERE rank > 1
+    """)
+    op.execute("DELETE FROM xp_events USING duplicate_tasks WHERE xp_events.task_instance_id = duplicate_tasks.id")
+    op.execute("""
+        DELETE FROM task_instances USING duplicate_tasks
+        WHERE task_instances.id = duplicate_tasks.id AND task_instances.due_date = duplicate_tasks.due_date
+    """)
+
+    op.drop_index('ix_routine_instances_routine_due', table_name='routine_instances', if_exists=True)
+    op.create_index(
+        'uq_routine_instances_routine_due', 'routine_instances', ['routine_id', 'due_date'],
+        unique=True, postgresql_include=['id'], if_not_exists=True
+    )
+    op.drop_index('ix_task_instances_routine_instance', table_name='task_instances', if_exists=True)
+    op.create_index(
+        'uq_task_instances_instance_task', 'task_instances', ['routine_instance_id', 'due_date', 'task_id'],
+        unique=True, if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_task_instances_instance_task', table_name='task_instances')
+    op.create_index('ix_task_instances_routine_instance', 'task_instances', ['routine_instance_id'])
+    op.drop_index('uq_routine_instances_routine_due', table_name='routine_instances')
+    op.create_index('ix_routine_instances_routine_due', 'routine_instances', ['routine_id', 'due_date', 'id'])
@@ -0,0 +1,37 @@
+"""Failure tracking on scheduled jobs
+
+The scheduler retries a failed job with exponential backoff, counting
+consecutive failures and keeping the last error on the job row.
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0014'
+down_revision: Union[str, Sequence[str], None] = '0013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The create_all the app used to run at startup made these along with scheduled_jobs
+    op.add_column(
+        'scheduled_jobs', sa.Column('failures', sa.Integer(), nullable=False, server_default='0'), if_not_exists=True
+    )
+    op.add_column('scheduled_jobs', sa.Column('last_error', sa.Text()), if_not_exists=True)
+    op.add_column('scheduled_jobs', sa.Column('retry_at', sa.DateTime(timezone=True)), if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('scheduled_jobs', 'retry_at')
+    op.drop_column('scheduled_jobs', 'last_error')
+    op.drop_column('scheduled_jobs', 'failures')
@@ -0,0 +1,36 @@
+"""Stale scores table
+
+Users marked by task completions since their score was stored; the
+incremental rescore reads these instead of probing every user. Completions
+from before the upgrade are picked up by the daily full rescore.
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0015'
+down_revision: Union[str, Sequence[str], None] = '0014'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'stale_scores',
+        sa.Column('user_id', sa.UUID(), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('marked_at', sa.DateTime(timezone=True), nullable=False),
+        if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('stale_scores')
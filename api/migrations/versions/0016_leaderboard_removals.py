@@ -0,0 +1,37 @@
+"""Leaderboard removals table
+
+Users who lost all their leaderboard entries. The in-process leaderboard
+index refreshes from entries updated since its last pass, which never
+shows a deleted entry, so it reads these to drop the users from its boards.
+
+Revision ID: 0016
+Revises: 0015
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0016'
+down_revision: Union[str, Sequence[str], None] = '0015'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'leaderboard_removals',
+        sa.Column('user_id', sa.UUID(), primary_key=True),
+        sa.Column('removed_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        if_not_exists=True
+    )
+    op.create_index('ix_leaderboard_removals_removed', 'leaderboard_removals', ['removed_at'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('leaderboard_removals')
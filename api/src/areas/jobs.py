@@ -0,0 +1,39 @@
+import logging
+from datetime import datetime, timedelta
+
+from ..config import settings
+from ..database import SessionLocal
+from ..db_metrics import db_caller
+from ..scheduler import JobScheduler
+from .xp import fold_xp_events
+
+logger = logging.getLogger(__name__)
+
+def aggregate_xp(scheduled_for: datetime) -> dict:
+    """Fold pending XP events into Area.xp, batch by batch, until none are left"""
+    db_caller.set("job:aggregate-xp")
+    batch_size = settings.XP_AGGREGATION_BATCH_SIZE
+    summary = {'events': 0, 'area_updates': 0, 'batches': 0}
+    db = SessionLocal()
+    try:
+        while True:
+            events, areas = fold_xp_events(db, batch_size)
+            if events:
+                summary['events'] += events
+                summary['area_updates'] += areas
+                summary['batches'] += 1
+            if events < batch_size:
+                break
+    finally:
+        db.close()
+
+    if summary['events']:
+        logger.info("Aggregated %d XP events into %d area updates", summary['events'], summary['area_updates'])
+    return summary
+
+def register_jobs(scheduler: JobScheduler) -> None:
+    scheduler.register(
+        "aggregate-xp",
+        aggregate_xp,
+        every=timedelta(seconds=settings.XP_AGGREGATION_SECONDS)
+    )
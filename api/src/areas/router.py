@@ -1,19 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from types import SimpleNamespace
+from typing import List, Optional, Sequence
 from uuid import UUID
 
 from ..database import get_db
 from ..models import Area
 from ..schemas import AreaCreate, Area as AreaSchema
 from ..auth.utils import get_current_user
+from ..pagination import PageParams, fetch_rows, keyset, page_response, parse_fields, select_columns
+from .xp import pending_xp
 
 router = APIRouter(prefix="/areas", tags=["Areas"])
 
+async def _with_pending_xp(db: AsyncSession, rows: Sequence, fields: Optional[List[str]] = None) -> list:
+    """Areas with the XP still waiting in the ledger added to their stored xp"""
+    if fields is not None and 'xp' not in fields:
+        return list(rows)
+    pending = await pending_xp(db, [row.id for row in rows])
+    if fields is None:
+        return [
+            AreaSchema.model_validate(row).model_copy(update={'xp': (row.xp or 0) + pending.get(row.id, 0)})
+            for row in rows
+        ]
+    return [SimpleNamespace(**{**row._asdict(), 'xp': (row.xp or 0) + pending.get(row.id, 0)}) for row in rows]
+
 @router.post("/", response_model=AreaSchema, status_code=status.HTTP_201_CREATED)
 async def create_area(
     area_data: AreaCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     area_dict = area_data.dict()
@@ -21,45 +37,50 @@ async def create_area(
     
     db_area = Area(**area_dict)
     db.add(db_area)
-    db.commit()
-    db.refresh(db_area)
+    await db.commit()
+    await db.refresh(db_area)
     return db_area
 
 @router.get("/", response_model=List[AreaSchema])
 async def get_areas(
-    db: Session = Depends(get_db),
+    response: Response,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    return db.query(Area).filter(Area.user_id == current_user.id).all()
+    fields = parse_fields(page.fields, AreaSchema)
+    query = select_columns(Area, fields, 'created_at').where(Area.user_id == current_user.id)
+    rows = await fetch_rows(db, keyset(query, Area.created_at, Area.id, page), fields)
+    return page_response(await _with_pending_xp(db, rows, fields), page, response, 'created_at', fields)
 
 @router.get("/{area_id}", response_model=AreaSchema)
 async def get_area(
     area_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    area = db.query(Area).filter(
+    area = await db.scalar(select(Area).where(
         Area.id == area_id,
         Area.user_id == current_user.id
-    ).first()
+    ))
     if not area:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Area not found"
         )
-    return area
+    return (await _with_pending_xp(db, [area]))[0]
 
 @router.put("/{area_id}", response_model=AreaSchema)
 async def update_area(
     area_id: UUID,
     area_data: AreaCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    area = db.query(Area).filter(
+    area = await db.scalar(select(Area).where(
         Area.id == area_id,
         Area.user_id == current_user.id
-    ).first()
+    ))
     if not area:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -69,26 +90,26 @@ async def update_area(
     for key, value in area_data.dict().items():
         setattr(area, key, value)
     
-    db.commit()
-    db.refresh(area)
-    return area
+    await db.commit()
+    await db.refresh(area)
+    return (await _with_pending_xp(db, [area]))[0]
 
 @router.delete("/{area_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_area(
     area_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    area = db.query(Area).filter(
+    area = await db.scalar(select(Area).where(
         Area.id == area_id,
         Area.user_id == current_user.id
-    ).first()
+    ))
     if not area:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Area not found"
         )
     
-    db.delete(area)
-    db.commit()
+    await db.delete(area)
+    await db.commit()
     return None 
\ No newline at end of file
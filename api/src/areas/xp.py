@@ -0,0 +1,93 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import bindparam, column, func, select, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..database import dialect_insert
+from ..models import Area, XpEvent
+
+# XP for completing a task, by difficulty (the spec's Task Complexity Matrix points)
+DIFFICULTY_XP = {'TRIVIAL': 1, 'EASY': 2, 'MEDIUM': 3, 'HARD': 5}
+
+def record_xp(db: Session, user_id: UUID, completions: Iterable[Tuple[Optional[UUID], UUID, str]]) -> None:
+    """Append the XP of completed tasks, given as (area id, task instance id, difficulty), to the ledger.
+
+    A single INSERT ... SELECT joining the completions, as a VALUES list, to
+    the user's areas, so ownership is checked in the same statement. It never
+    touches the area rows, so completions do not contend on them. Areas the
+    user no longer has are skipped, and task instances that were already
+    awarded are ignored.
+    """
+    rows = [
+        (area_id, task_instance_id, DIFFICULTY_XP.get(difficulty, DIFFICULTY_XP['MEDIUM']))
+        for area_id, task_instance_id, difficulty in completions if area_id is not None
+    ]
+    if not rows:
+        return
+    # A CTE rather than a subquery: SQLite has no column list on a VALUES subquery
+    completed = values(
+        column('area_id', XpEvent.area_id.type),
+        column('task_instance_id', XpEvent.task_instance_id.type),
+        column('xp', XpEvent.xp.type),
+        name='completions'
+    ).data(rows).cte()
+    owned = select(completed.c.area_id, completed.c.task_instance_id, completed.c.xp).join(
+        Area, Area.id == completed.c.area_id
+    ).where(Area.user_id == user_id)
+    db.execute(
+        dialect_insert(db, XpEvent)
+        .from_select(['area_id', 'task_instance_id', 'xp'], owned)
+        .on_conflict_do_nothing()
+    )
+
+async def pending_xp(db: AsyncSession, area_ids: List[UUID]) -> Dict[UUID, int]:
+    """XP recorded for some areas but not folded into Area.xp yet"""
+    if not area_ids:
+        return {}
+    rows = await db.execute(
+        select(XpEvent.area_id, func.sum(XpEvent.xp))
+        .where(XpEvent.applied_at.is_(None), XpEvent.area_id.in_(area_ids))
+        .group_by(XpEvent.area_id)
+    )
+    return {area_id: int(total) for area_id, total in rows}
+
+def fold_xp_events(db: Session, batch_size: int) -> Tuple[int, int]:
+    """Add one batch of pending events to Area.xp and mark them applied, in one transaction.
+
+    Returns the number of events and areas updated. Events are locked with
+    SKIP LOCKED and marked in the same transaction as the increments, so each
+    is applied exactly once even if aggregators overlap.
+    """
+    events = db.execute(
+        select(XpEvent.id, XpEvent.area_id, XpEvent.xp)
+        .where(XpEvent.applied_at.is_(None))
+        .order_by(XpEvent.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not events:
+        return 0, 0
+
+    totals: Dict[UUID, int] = defaultdict(int)
+    for _, area_id, xp in events:
+        totals[area_id] += xp
+
+    areas = Area.__table__
+    # One UPDATE per area in the batch, in a fixed order so concurrent writers cannot deadlock
+    db.execute(
+        update(areas)
+        .where(areas.c.id == bindparam('area_id'))
+        .values(xp=func.coalesce(areas.c.xp, 0) + bindparam('delta')),
+        [{'area_id': area_id, 'delta': totals[area_id]} for area_id in sorted(totals)]
+    )
+    db.execute(
+        update(XpEvent)
+        .where(XpEvent.id.in_([event_id for event_id, _, _ in events]))
+        .values(applied_at=func.now())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return len(events), len(totals)
@@ -1,37 +1,38 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 
 from ..database import get_db
 from ..models import User
 from ..schemas import UserCreate, User as UserSchema
+from .hashing import password_hasher
 from .utils import (
-    get_password_hash, 
-    verify_password, 
     create_access_token,
     get_current_user
 )
 from ..config import settings
+from .cache import Principal, principal_cache, token_cache
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 @router.post("/register", response_model=UserSchema, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     # Check if user exists
-    if db.query(User).filter(User.email == user_data.email).first():
+    if await db.scalar(select(User).where(User.email == user_data.email)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
-    if db.query(User).filter(User.username == user_data.username).first():
+    if await db.scalar(select(User).where(User.username == user_data.username)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already taken"
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
     db_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -39,24 +40,34 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return db_user
 
 @router.post("/login")
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Find user by username
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await db.scalar(select(User).where(User.username == form_data.username))
+    verified, new_hash = False, None
+    if user:
+        verified, new_hash = await password_hasher.verify_and_update(
+            form_data.password, user.hashed_password
+        )
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    # Transparently rehash when the configured bcrypt cost has changed
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
     
     # Create access token
     access_token_expires = timedelta(minutes=settings.JWT_EXPIRATION_MINUTES)
@@ -76,6 +87,14 @@ async def login(
     } 
 
 @router.get("/verify")
-async def verify_token(current_user: User = Depends(get_current_user)):
+async def verify_token(current_user: Principal = Depends(get_current_user)):
     """Verify token is valid"""
-    return {"status": "valid", "user": current_user} 
\ No newline at end of file
+    return {"status": "valid", "user": current_user}
+
+@router.get("/cache/stats")
+async def get_cache_stats(current_user: Principal = Depends(get_current_user)):
+    """Hit/miss counters of the token and principal caches"""
+    return {
+        "tokens": token_cache.stats(),
+        "principals": principal_cache.stats()
+    } 
\ No newline at end of file
@@ -1,24 +1,19 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
 
 from ..config import settings
 from ..database import get_db
 from ..models import User
+from .cache import Principal, principal_cache, token_cache
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -34,10 +29,29 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     )
     return encoded_jwt
 
+def _decode_token(token: str) -> Tuple[UUID, Optional[float]]:
+    """Verify a token and return its user id, caching the result until it expires"""
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
+
+    payload = jwt.decode(
+        token, 
+        settings.JWT_SECRET, 
+        algorithms=[settings.JWT_ALGORITHM]
+    )
+    user_id: str = payload.get("sub")
+    if user_id is None:
+        raise ValueError("Token has no subject")
+
+    verified = (UUID(user_id), payload.get("exp"))
+    token_cache.set(token, verified, expires_at=verified[1])
+    return verified
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
+    db: AsyncSession = Depends(get_db)
+) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -45,19 +59,18 @@ async def get_current_user(
     )
     
     try:
-        payload = jwt.decode(
-            token, 
-            settings.JWT_SECRET, 
-            algorithms=[settings.JWT_ALGORITHM]
-        )
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+        user_id, expires_at = _decode_token(token)
+    except (JWTError, ValueError):
         raise credentials_exception
+
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
         
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).where(User.id == user_id))
     if user is None:
         raise credentials_exception
-        
-    return user 
\ No newline at end of file
+
+    principal = Principal.from_user(user)
+    principal_cache.set(user_id, principal, expires_at=expires_at)
+    return principal
@@ -0,0 +1,95 @@
+"""Maintenance commands.
+
+    python -m src.cli rebuild-summaries
+    python -m src.cli rebuild-summaries --user alice
+    python -m src.cli score-users [--full]
+    python -m src.cli purge-instances --user alice
+    python -m src.cli archive-instances [--days 400]
+"""
+import argparse
+import logging
+from datetime import date, datetime, time
+
+from sqlalchemy import select
+
+from .config import settings
+from .database import SessionLocal
+from .models import User
+from .routines.jobs import archive_old_instances, iter_user_id_shards
+from .routines.purge import purge_future_instances, retention_horizon
+from .routines.summary import rebuild_daily_summaries
+from .scoring.jobs import rescore
+
+logger = logging.getLogger(__name__)
+
+def _user_id(db, username: str):
+    user_id = db.scalar(select(User.id).where(User.username == username))
+    if user_id is None:
+        raise SystemExit(f"Unknown user: {username}")
+    return user_id
+
+def rebuild_summaries(args: argparse.Namespace) -> None:
+    """Recompute daily summaries from task instances, shard by shard, back to the retention horizon"""
+    since = retention_horizon(date.today())
+    db = SessionLocal()
+    try:
+        if args.user:
+            shards = [[_user_id(db, args.user)]]
+        else:
+            shards = iter_user_id_shards(db, settings.GENERATION_SHARD_SIZE)
+
+        users = rows = 0
+        for shard in shards:
+            rows += rebuild_daily_summaries(db, shard, since)
+            users += len(shard)
+            logger.info("Rebuilt daily summaries for %d users (%d rows)", users, rows)
+    finally:
+        db.close()
+
+def score_users(args: argparse.Namespace) -> None:
+    logger.info("Scoring finished: %s", rescore(full=args.full))
+
+def purge_instances(args: argparse.Namespace) -> None:
+    """Delete a user's future instances and today's pending tasks, as DELETE /routines/instances/future does"""
+    db = SessionLocal()
+    try:
+        totals = purge_future_instances(
+            db, _user_id(db, args.user), date.today(), args.batch_size,
+            on_batch=lambda totals: logger.info("Purged %(future_instances)d instances in %(batches)d batches", totals)
+        )
+    finally:
+        db.close()
+    logger.info("Purge finished: %s", totals)
+
+def archive_instances(args: argparse.Namespace) -> None:
+    """Run the retention job now, optionally with another retention period"""
+    summary = archive_old_instances(datetime.combine(date.today(), time.min), args.days)
+    logger.info("Archiving finished: %s", summary)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    rebuild = commands.add_parser('rebuild-summaries', help="Recompute the daily summary rollup")
+    rebuild.add_argument('--user', help="Only rebuild this username")
+    rebuild.set_defaults(func=rebuild_summaries)
+
+    score = commands.add_parser('score-users', help="Compute UPR scores for users with new completions")
+    score.add_argument('--full', action='store_true', help="Rescore every user")
+    score.set_defaults(func=score_users)
+
+    purge = commands.add_parser('purge-instances', help="Delete a user's future routine instances in batches")
+    purge.add_argument('--user', required=True, help="Username whose instances are purged")
+    purge.add_argument('--batch-size', type=int, default=settings.PURGE_BATCH_SIZE)
+    purge.set_defaults(func=purge_instances)
+
+    archive = commands.add_parser('archive-instances', help="Move instances past the retention window to task_history")
+    archive.add_argument('--days', type=int, help="Retention in days instead of INSTANCE_RETENTION_DAYS")
+    archive.set_defaults(func=archive_instances)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
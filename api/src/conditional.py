@@ -0,0 +1,29 @@
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Request, Response, status
+
+def entity_tag(*parts: Any) -> str:
+    """Weak ETag derived from validator values, e.g. a row count and the latest updated_at"""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith('W/') else tag
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Set the ETag on the response and return a 304 if If-None-Match already holds it.
+
+    Call this before loading anything; when it returns a response, return
+    that from the route as is. Tags are compared weakly, as RFC 9110 asks
+    for If-None-Match.
+    """
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'private, no-cache'
+    if_none_match = request.headers.get('if-none-match')
+    if not if_none_match:
+        return None
+    if if_none_match.strip() == '*' or _opaque(etag) in {_opaque(tag) for tag in if_none_match.split(',')}:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=dict(response.headers))
+    return None
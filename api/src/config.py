@@ -1,14 +1,93 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
+    # Adds X-Query-Count and X-DB-Time-Ms headers to every response
+    DEBUG: bool = False
+
     # Database settings
     DATABASE_URL: str
+    ASYNC_DATABASE_URL: Optional[str] = None  # Derived from DATABASE_URL when unset
+
+    # Connection pool settings, applied to both the sync and the async engine
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800  # seconds, -1 disables recycling
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 0  # 0 disables the timeout
+
+    # Largest page size accepted by the list endpoints
+    PAGE_MAX_LIMIT: int = 500
+    # Most task updates accepted by one bulk progress request
+    TASK_PROGRESS_BATCH_MAX: int = 200
+    # Rows fetched per round trip by the streaming instance export
+    EXPORT_BATCH_SIZE: int = 500
 
     # JWT settings
     JWT_SECRET: str
     JWT_ALGORITHM: str
     JWT_EXPIRATION_MINUTES: int
 
+    # Authentication cache settings
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    TOKEN_CACHE_SIZE: int = 10000
+
+    # Password hashing settings
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    # Instance generation settings
+    GENERATION_DEFAULT_HORIZON_DAYS: int = 7
+    GENERATION_MAX_HORIZON_DAYS: int = 90
+    OCCURRENCE_MAX_RANGE_DAYS: int = 366  # Longest range a recurrence forecast expands
+
+    # Nightly generation job settings
+    GENERATION_SHARD_SIZE: int = 1000
+    GENERATION_WORKERS: int = 4
+    GENERATION_SHARD_RETRIES: int = 2
+    GENERATION_RETRY_BACKOFF_SECONDS: float = 5.0
+    GENERATION_RUN_AT: str = "18:00"  # Local time, HH:MM
+
+    # Scoring settings
+    SCORING_WINDOW_DAYS: int = 180  # Task history considered by the scores
+    SCORING_SHARD_SIZE: int = 5000
+    SCORING_INTERVAL_MINUTES: int = 15  # Users with new completions are rescored this often
+    SCORING_RUN_AT: str = "03:00"  # Local time of the daily full rescore
+
+    # XP aggregation settings
+    XP_AGGREGATION_SECONDS: int = 60  # Pending XP events are folded into Area.xp this often
+    XP_AGGREGATION_BATCH_SIZE: int = 5000  # Events per transaction
+
+    # Leaderboard settings
+    LEADERBOARD_REFRESH_SECONDS: int = 30  # Reads pick up changed entries at most this often
+    LEADERBOARD_RELOAD_MINUTES: int = 60  # Full reload of the in-process index
+    LEADERBOARD_MAX_LIMIT: int = 100
+
+    # Streak settings
+    STREAK_GRACE_EARN_DAYS: int = 7  # A grace token is earned every this many streak days
+    STREAK_MAX_GRACE_TOKENS: int = 2  # Each token covers one missed day
+    STREAK_RUN_AT: str = "00:15"  # Local time of the nightly roll-forward of yesterday
+
+    # Purge and retention settings
+    PURGE_BATCH_SIZE: int = 1000  # Routine instances deleted per transaction
+    INSTANCE_RETENTION_DAYS: int = 400  # Older instances move to task_history; 0 keeps everything
+    RETENTION_RUN_AT: str = "02:00"  # Local time of the nightly archive run
+    PARTITION_MONTHS_AHEAD: int = 4  # Monthly partitions kept ready; must cover GENERATION_MAX_HORIZON_DAYS
+    PARTITION_RUN_AT: str = "01:30"  # Local time of the nightly partition maintenance
+
+    # Scheduler settings
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_POLL_SECONDS: int = 30
+    SCHEDULER_LOCK_SECONDS: int = 300  # Lease length; renewed by a heartbeat while a job runs
+    SCHEDULER_HEARTBEAT_SECONDS: int = 60
+    SCHEDULER_RETRY_SECONDS: int = 60  # First retry delay after a failed run, doubled per failure
+    SCHEDULER_MAX_RETRY_SECONDS: int = 3600
+    SCHEDULER_MAX_CATCH_UP_RUNS: int = 7
+
     class Config:
         env_file = ".env"
 
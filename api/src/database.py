@@ -1,18 +1,136 @@
-from sqlalchemy import create_engine
+from typing import Iterable, List, Optional, Sequence
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from fastapi import Request
 
 from .config import settings
+from .instrumentation import instrument_engine
+from .db_metrics import PoolMetrics, async_pool_metrics, db_caller, sync_pool_metrics
+
+# Async drivers used by the API for each sync driver in DATABASE_URL
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'postgresql+psycopg2': 'postgresql+asyncpg',
+    'postgresql+psycopg': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+def get_async_database_url(database_url: str) -> str:
+    url = make_url(database_url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername)).render_as_string(
+        hide_password=False
+    )
+
+def engine_options(database_url: str, pool_class, metrics: PoolMetrics) -> dict:
+    """Pool and connection options from Settings for an engine URL"""
+    url = make_url(database_url)
+    if url.get_backend_name() == 'sqlite':
+        # SQLite picks its own pool class; only pool metrics apply
+        return {}
 
-engine = create_engine(settings.DATABASE_URL)
+    options = {
+        'poolclass': metrics.pool_class(pool_class),
+        'pool_size': settings.DB_POOL_SIZE,
+        'max_overflow': settings.DB_MAX_OVERFLOW,
+        'pool_timeout': settings.DB_POOL_TIMEOUT,
+        'pool_recycle': settings.DB_POOL_RECYCLE,
+        'pool_pre_ping': settings.DB_POOL_PRE_PING,
+    }
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        if url.get_driver_name() == 'asyncpg':
+            options['connect_args'] = {'server_settings': {'statement_timeout': timeout}}
+        else:
+            options['connect_args'] = {'options': f'-c statement_timeout={timeout}'}
+    return options
+
+# Sync engine, used by the generator jobs and the scheduler
+engine = create_engine(
+    settings.DATABASE_URL,
+    **engine_options(settings.DATABASE_URL, QueuePool, sync_pool_metrics)
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+sync_pool_metrics.attach(engine)
+instrument_engine(engine, "sync")
+
+# Async engine, used by the API routers
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or get_async_database_url(settings.DATABASE_URL)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **engine_options(ASYNC_DATABASE_URL, AsyncAdaptedQueuePool, async_pool_metrics)
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+async_pool_metrics.attach(async_engine.sync_engine)
+instrument_engine(async_engine.sync_engine, "async")
 
 Base = declarative_base()
 
+def create_dev_tables() -> None:
+    """Create missing tables on SQLite, for local development.
+
+    PostgreSQL schemas come from postgres/init.sql and the Alembic revisions
+    only: the instance tables are partitioned there, which the models do not
+    describe, so create_all would make plain tables in their place.
+    """
+    if engine.dialect.name == 'sqlite':
+        Base.metadata.create_all(bind=engine)
+
+def dialect_insert(db: Session, model):
+    """INSERT with the ON CONFLICT support of PostgreSQL or SQLite"""
+    return (postgresql.insert if db.get_bind().dialect.name == 'postgresql' else sqlite.insert)(model)
+
+def upsert(db: Session, model, rows: List[dict], key_columns: Iterable[str], update_columns: Iterable[str]) -> None:
+    """INSERT ... ON CONFLICT (key) DO UPDATE for PostgreSQL and SQLite"""
+    if not rows:
+        return
+    statement = dialect_insert(db, model)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=list(key_columns),
+        set_={
+            **{column: statement.excluded[column] for column in update_columns},
+            'updated_at': func.now()
+        }
+    ), rows)
+
+def insert_missing(
+    db: Session,
+    model,
+    rows: List[dict],
+    key_columns: Optional[Iterable[str]] = None,
+    returning: Sequence = ()
+) -> list:
+    """INSERT ... ON CONFLICT DO NOTHING, for rows another transaction may create first.
+
+    key_columns names the unique index to check; any conflict counts without
+    it. With returning, gives those columns of the rows actually inserted.
+    """
+    if not rows:
+        return []
+    statement = dialect_insert(db, model).on_conflict_do_nothing(
+        index_elements=list(key_columns) if key_columns else None
+    )
+    if returning:
+        return db.execute(statement.returning(*returning), rows).all()
+    db.execute(statement, rows)
+    return []
+
 # Dependency
-def get_db():
+async def get_db(request: Request):
+    # Attribute connection hold time to the route using this session
+    route = request.scope.get('route')
+    db_caller.set(f"{request.method} {route.path if route else request.url.path}")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
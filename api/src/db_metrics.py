@@ -0,0 +1,119 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Type
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import Pool
+
+# Who is using a connection: "<METHOD> <route>" for requests, "job:<name>" for jobs
+db_caller: ContextVar[str] = ContextVar("db_caller", default="unknown")
+
+class _Timer:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def snapshot(self) -> dict:
+        return {
+            'count': self.count,
+            'total_ms': round(self.total * 1000, 2),
+            'avg_ms': round(self.total * 1000 / self.count, 2) if self.count else 0.0,
+            'max_ms': round(self.max * 1000, 2)
+        }
+
+class PoolMetrics:
+    """Checkout counts, wait time, overflow usage and per-caller hold time of a pool"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.engine = None
+        self.checkouts = 0
+        self.timeouts = 0
+        self.peak_overflow = 0
+        self.wait = _Timer()
+        self.holds: Dict[str, _Timer] = {}
+        self.in_use: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def pool_class(self, base: Type[Pool]) -> Type[Pool]:
+        """A subclass of `base` that times how long checkouts wait for a connection"""
+        metrics = self
+
+        def _do_get(pool):
+            started = time.perf_counter()
+            try:
+                return base._do_get(pool)
+            except PoolTimeoutError:
+                with metrics._lock:
+                    metrics.timeouts += 1
+                raise
+            finally:
+                with metrics._lock:
+                    metrics.wait.observe(time.perf_counter() - started)
+
+        return type(f"Instrumented{base.__name__}", (base,), {"_do_get": _do_get})
+
+    def attach(self, engine: Engine) -> None:
+        """Listen to checkout/checkin on a sync engine (use AsyncEngine.sync_engine for async)"""
+        self.engine = engine
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        caller = db_caller.get()
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        connection_record.info["caller"] = caller
+        pool = self._queue_pool()
+        overflow = pool.checkedout() - pool.size() if pool is not None else 0
+        with self._lock:
+            self.checkouts += 1
+            self.peak_overflow = max(self.peak_overflow, overflow)
+            self.in_use[caller] = self.in_use.get(caller, 0) + 1
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        caller = connection_record.info.pop("caller", None)
+        if checked_out_at is None:
+            return
+        with self._lock:
+            self.holds.setdefault(caller, _Timer()).observe(time.perf_counter() - checked_out_at)
+            self.in_use[caller] = self.in_use.get(caller, 1) - 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            snapshot = {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'peak_overflow': self.peak_overflow,
+                'wait': self.wait.snapshot(),
+                'in_use_by_caller': {caller: count for caller, count in self.in_use.items() if count},
+                'hold_by_caller': {caller: timer.snapshot() for caller, timer in self.holds.items()}
+            }
+        pool = self._queue_pool()
+        if pool is not None:
+            snapshot['pool'] = {
+                'size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'checked_in': pool.checkedin(),
+                'overflow': max(0, pool.overflow())
+            }
+        return snapshot
+
+    def _queue_pool(self):
+        """The engine's current pool if it tracks checkouts (QueuePool and friends)"""
+        pool = self.engine.pool if self.engine is not None else None
+        return pool if hasattr(pool, "checkedout") else None
+
+sync_pool_metrics = PoolMetrics("sync")
+async_pool_metrics = PoolMetrics("async")
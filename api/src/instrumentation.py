@@ -0,0 +1,211 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500)
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, labels)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], buckets: Iterable[float]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (bucket_counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    bucket_labels = _format_labels(self.labels, labels, f'le="{le}"')
+                    lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {count}")
+        return lines
+
+def _samples(name: str, help: str, kind: str, samples: Iterable[Tuple[str, float]]) -> List[str]:
+    """Render values collected elsewhere (pool, caches, hasher) as one metric family"""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{labels} {value}" for labels, value in samples)
+    return lines
+
+REQUEST_LABELS = ("method", "route")
+
+request_duration = Histogram(
+    "questify_http_request_duration_seconds", "HTTP request latency",
+    REQUEST_LABELS + ("status",), LATENCY_BUCKETS
+)
+request_statements = Histogram(
+    "questify_http_request_db_statements", "SQL statements issued per HTTP request",
+    REQUEST_LABELS, STATEMENT_BUCKETS
+)
+request_db_time = Histogram(
+    "questify_http_request_db_seconds", "Time spent executing SQL per HTTP request",
+    REQUEST_LABELS, LATENCY_BUCKETS
+)
+statements_total = Counter(
+    "questify_db_statements_total", "SQL statements executed", ("engine",)
+)
+
+class RequestStats:
+    __slots__ = ("statements", "db_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Count and time every statement, attributing it to the current request if any"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.statement_started_at = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started_at = getattr(context, "statement_started_at", None)
+        elapsed = time.perf_counter() - started_at if started_at is not None else 0.0
+        statements_total.inc((name,))
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_seconds += elapsed
+
+class MetricsMiddleware:
+    """Record latency, statement count and DB time per route.
+
+    In DEBUG mode the statement count and DB time are also sent back as the
+    X-Query-Count and X-DB-Time-Ms response headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.DEBUG:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-query-count", str(stats.statements).encode()))
+                    headers.append((b"x-db-time-ms", f"{stats.db_seconds * 1000:.2f}".encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request_stats.reset(token)
+            # Label by route template so ids in paths do not create new series
+            route = scope.get("route")
+            labels = (scope["method"], route.path if route else "unmatched")
+            request_duration.observe(labels + (str(status_code),), time.perf_counter() - started)
+            request_statements.observe(labels, stats.statements)
+            request_db_time.observe(labels, stats.db_seconds)
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    # Imported here to avoid import cycles with the database and auth modules
+    from .auth.cache import principal_cache, token_cache
+    from .auth.hashing import password_hasher
+    from .db_metrics import async_pool_metrics, sync_pool_metrics
+
+    lines = []
+    for metric in (request_duration, request_statements, request_db_time, statements_total):
+        lines.extend(metric.render())
+
+    pools = {'async': async_pool_metrics.snapshot(), 'sync': sync_pool_metrics.snapshot()}
+    lines.extend(_samples(
+        "questify_db_pool_checked_out", "Connections currently checked out", "gauge",
+        [(f'{{engine="{name}"}}', pool['pool']['checked_out']) for name, pool in pools.items() if 'pool' in pool]
+    ))
+    lines.extend(_samples(
+        "questify_db_pool_checkouts_total", "Connection checkouts since start", "counter",
+        [(f'{{engine="{name}"}}', pool['checkouts']) for name, pool in pools.items()]
+    ))
+    lines.extend(_samples(
+        "questify_db_pool_wait_seconds_total", "Total time spent waiting for a pooled connection", "counter",
+        [(f'{{engine="{name}"}}', pool['wait']['total_ms'] / 1000) for name, pool in pools.items()]
+    ))
+    lines.extend(_samples(
+        "questify_db_pool_timeouts_total", "Connection checkouts that timed out", "counter",
+        [(f'{{engine="{name}"}}', pool['timeouts']) for name, pool in pools.items()]
+    ))
+
+    caches = {'token': token_cache.stats(), 'principal': principal_cache.stats()}
+    for field in ('hits', 'misses', 'size'):
+        lines.extend(_samples(
+            f"questify_auth_cache_{field}", f"Authentication cache {field}", "gauge",
+            [(f'{{cache="{name}"}}', stats[field]) for name, stats in caches.items()]
+        ))
+
+    lines.extend(_samples(
+        "questify_password_hash_pending", "Password hash operations running or queued", "gauge",
+        [("", password_hasher.pending)]
+    ))
+    lines.extend(_samples(
+        "questify_password_hash_rejected_total", "Password hash operations rejected by admission control", "counter",
+        [("", password_hasher.rejected)]
+    ))
+    return "\n".join(lines) + "\n"
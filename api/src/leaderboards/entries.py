@@ -0,0 +1,96 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+from uuid import UUID
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import dialect_insert
+from ..models import Area, LeaderboardEntry, LeaderboardRemoval
+
+GLOBAL_BOARD = "global"
+CHUNK_SIZE = 5000
+
+def tier_board(tier: str) -> str:
+    return f"tier:{tier}"
+
+def area_board(area_name: str) -> str:
+    """Areas are named freely, so boards group them by normalized name"""
+    return "area:" + " ".join(area_name.lower().split())
+
+def entries_for_scores(db: Session, score_rows: List[dict]) -> List[dict]:
+    """Board entries of scored users: global and tier by UPR, area boards by Area Mastery"""
+    user_ids = [row['user_id'] for row in score_rows]
+    area_names = {
+        str(area_id): name
+        for area_id, name in db.execute(select(Area.id, Area.name).where(Area.user_id.in_(user_ids)))
+    }
+
+    entries = []
+    for row in score_rows:
+        entries.append({'board': GLOBAL_BOARD, 'user_id': row['user_id'], 'score': row['upr']})
+        entries.append({'board': tier_board(row['tier']), 'user_id': row['user_id'], 'score': row['upr']})
+
+        # A user with several areas of the same name ranks by the best one
+        area_scores: Dict[str, float] = {}
+        for area_id, score in row['area_scores'].items():
+            if area_id in area_names:
+                board = area_board(area_names[area_id])
+                area_scores[board] = max(area_scores.get(board, 0), score)
+        entries.extend(
+            {'board': board, 'user_id': row['user_id'], 'score': score} for board, score in area_scores.items()
+        )
+    return entries
+
+def record_removals(db: Session, user_ids: List[UUID]) -> None:
+    """Note users whose entries were all deleted, for the leaderboard index to drop. Does not commit.
+
+    The index's incremental refresh only sees entries that still exist.
+    Removals older than a full reload of the index are no longer read, so
+    they are cleared on the way.
+    """
+    if not user_ids:
+        return
+    db.execute(delete(LeaderboardRemoval).where(
+        LeaderboardRemoval.removed_at
+        < datetime.now(timezone.utc) - timedelta(minutes=2 * settings.LEADERBOARD_RELOAD_MINUTES)
+    ))
+    statement = dialect_insert(db, LeaderboardRemoval)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=['user_id'],
+        set_={'removed_at': func.now()}
+    ), [{'user_id': user_id} for user_id in user_ids])
+
+def replace_entries(db: Session, user_ids: List[UUID], entries: List[dict]) -> int:
+    """Swap the entries of the users whose entries changed, so users leaving a board (e.g. a tier) drop off it.
+
+    A user's entries are rewritten together or not at all, as the
+    leaderboard index re-reads every entry of a user it sees updated. Users
+    whose boards and scores are unchanged are left alone, so their rows keep
+    their updated_at; users left without entries are recorded as removals.
+    Returns the number of users rewritten.
+    """
+    wanted: Dict[UUID, Dict[str, float]] = defaultdict(dict)
+    for entry in entries:
+        wanted[entry['user_id']][entry['board']] = entry['score']
+    stored: Dict[UUID, Dict[str, float]] = defaultdict(dict)
+    for board, user_id, score in db.execute(
+        select(LeaderboardEntry.board, LeaderboardEntry.user_id, LeaderboardEntry.score)
+        .where(LeaderboardEntry.user_id.in_(user_ids))
+    ):
+        stored[user_id][board] = score
+
+    changed = [user_id for user_id in user_ids if wanted.get(user_id, {}) != stored.get(user_id, {})]
+    if not changed:
+        return 0
+    db.execute(delete(LeaderboardEntry).where(LeaderboardEntry.user_id.in_(changed)))
+    rows = [
+        {'board': board, 'user_id': user_id, 'score': score}
+        for user_id in changed for board, score in wanted.get(user_id, {}).items()
+    ]
+    for offset in range(0, len(rows), CHUNK_SIZE):
+        db.execute(insert(LeaderboardEntry), rows[offset:offset + CHUNK_SIZE])
+    record_removals(db, [user_id for user_id in changed if not wanted.get(user_id)])
+    return len(changed)
@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models import LeaderboardEntry, LeaderboardRemoval
+
+logger = logging.getLogger(__name__)
+
+# Transactions commit after their updated_at timestamps, so re-read a little behind the watermark
+REFRESH_OVERLAP = timedelta(minutes=1)
+# Reload in full rather than apply changes touching more than this share of the entries
+RELOAD_FRACTION = 0.1
+
+class Board:
+    """Entries of one board as a list of (-score, user id) keys kept sorted.
+
+    Never changed once published: refreshes build new boards and swap them in.
+    """
+
+    def __init__(self, keys: List[Tuple[float, UUID]]):
+        keys.sort()
+        self.keys = keys
+        self.scores: Dict[UUID, float] = {user_id: -score for score, user_id in keys}
+
+    @classmethod
+    def _of_sorted(cls, keys: List[Tuple[float, UUID]], scores: Dict[UUID, float]) -> 'Board':
+        board = cls.__new__(cls)
+        board.keys, board.scores = keys, scores
+        return board
+
+    def changed(self, removed: Set[UUID], added: List[Tuple[float, UUID]]) -> 'Board':
+        """A copy without some users' entries and with new ones, placed by bisection instead of a sort"""
+        keys, scores = list(self.keys), dict(self.scores)
+        for user_id in removed:
+            score = scores.pop(user_id, None)
+            if score is not None:
+                del keys[bisect_left(keys, (-score, user_id))]
+        for key in added:
+            insort(keys, key)
+            scores[key[1]] = -key[0]
+        return Board._of_sorted(keys, scores)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _rank_at(self, position: int) -> int:
+        # Ties share the rank of the first entry with their score
+        return bisect_left(self.keys, (self.keys[position][0],)) + 1
+
+    def rank(self, user_id: UUID) -> Optional[int]:
+        score = self.scores.get(user_id)
+        if score is None:
+            return None
+        return bisect_left(self.keys, (-score,)) + 1
+
+    def slice(self, start: int, stop: int) -> List[Tuple[int, UUID, float]]:
+        """(rank, user id, score) of the entries at positions start to stop"""
+        start, stop = max(start, 0), min(stop, len(self.keys))
+        return [(self._rank_at(position), self.keys[position][1], -self.keys[position][0]) for position in range(start, stop)]
+
+    def around(self, user_id: UUID, radius: int) -> List[Tuple[int, UUID, float]]:
+        score = self.scores.get(user_id)
+        if score is None:
+            return []
+        position = bisect_left(self.keys, (-score, user_id))
+        return self.slice(position - radius, position + radius + 1)
+
+class LeaderboardIndex:
+    """In-process sorted index over leaderboard_entries.
+
+    Loaded in full every LEADERBOARD_RELOAD_MINUTES and otherwise refreshed
+    from entries updated since the last refresh, at most every
+    LEADERBOARD_REFRESH_SECONDS. Scoring rewrites all entries of a user at
+    once, so a changed user is dropped from every board and re-added; users
+    left without entries are read from leaderboard_removals and dropped.
+
+    Refreshes run on a worker thread with a session of their own and build
+    new boards next to the published ones, then swap them in with one
+    assignment; requests keep reading the previous boards meanwhile.
+    """
+
+    def __init__(self):
+        self._state: Tuple[Dict[str, Board], Dict[UUID, Set[str]]] = ({}, {})
+        self._watermark = None
+        self._loaded_at: Optional[float] = None
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing: Optional[asyncio.Task] = None
+
+    @property
+    def boards(self) -> Dict[str, Board]:
+        return self._state[0]
+
+    def user_boards(self, user_id: UUID) -> List[str]:
+        return sorted(self._state[1].get(user_id, ()))
+
+    def _due(self) -> bool:
+        return (self._loaded_at is None
+                or time.monotonic() - self._refreshed_at >= settings.LEADERBOARD_REFRESH_SECONDS)
+
+    async def ensure_fresh(self) -> None:
+        """Start a refresh in the background if one is due; only the first load is waited for"""
+        if not self._due():
+            return
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(asyncio.to_thread(self.refresh))
+            self._refreshing.add_done_callback(self._log_failure)
+        if self._loaded_at is None:
+            await asyncio.shield(self._refreshing)
+
+    @staticmethod
+    def _log_failure(refreshing: asyncio.Task) -> None:
+        if not refreshing.cancelled() and refreshing.exception() is not None:
+            logger.error("Leaderboard refresh failed", exc_info=refreshing.exception())
+
+    def refresh(self) -> None:
+        """Bring the index up to date if it is due; blocking, so call it off the event loop"""
+        with self._lock:
+            if not self._due():
+                return
+            now = time.monotonic()
+            db = SessionLocal()
+            try:
+                full = self._loaded_at is None or now - self._loaded_at >= settings.LEADERBOARD_RELOAD_MINUTES * 60
+                if full or not self._apply_changes(db):
+                    self._reload(db)
+                    self._loaded_at = now
+            finally:
+                db.close()
+            self._refreshed_at = now
+
+    def _entries(self, db: Session, since=None):
+        query = select(
+            LeaderboardEntry.board, LeaderboardEntry.user_id, LeaderboardEntry.score, LeaderboardEntry.updated_at
+        )
+        if since is not None:
+            query = query.where(LeaderboardEntry.updated_at >= since)
+        return db.execute(query).all()
+
+    def _reload(self, db: Session) -> None:
+        keys: Dict[str, List[Tuple[float, UUID]]] = defaultdict(list)
+        user_boards: Dict[UUID, Set[str]] = defaultdict(set)
+        watermark = None
+        for board_name, user_id, score, updated_at in self._entries(db):
+            keys[board_name].append((-score, user_id))
+            user_boards[user_id].add(board_name)
+            if watermark is None or updated_at > watermark:
+                watermark = updated_at
+
+        self._state = ({name: Board(board_keys) for name, board_keys in keys.items()}, dict(user_boards))
+        self._watermark = watermark
+
+    def _apply_changes(self, db: Session) -> bool:
+        """Update the boards the changed users are on; False when a full reload is cheaper"""
+        since = self._watermark - REFRESH_OVERLAP if self._watermark is not None else None
+        indexed = sum(len(board) for board in self.boards.values())
+        if since is None or db.scalar(
+            select(func.count()).select_from(LeaderboardEntry).where(LeaderboardEntry.updated_at >= since)
+        ) > indexed * RELOAD_FRACTION:
+            return False
+
+        rows = self._entries(db, since)
+        removals = db.execute(
+            select(LeaderboardRemoval.user_id, LeaderboardRemoval.removed_at)
+            .where(LeaderboardRemoval.removed_at >= since)
+        ).all()
+        if not rows and not removals:
+            return True
+        boards, user_boards = self._state
+        watermark = max(self._watermark, *(row.updated_at for row in rows), *(row.removed_at for row in removals))
+        changed = {row.user_id for row in rows} | {row.user_id for row in removals}
+        removed: Dict[str, Set[UUID]] = defaultdict(set)
+        added: Dict[str, List[Tuple[float, UUID]]] = defaultdict(list)
+        user_boards = dict(user_boards)
+        for user_id in changed:
+            for name in user_boards.pop(user_id, ()):
+                removed[name].add(user_id)
+        for board_name, user_id, score, _ in rows:
+            added[board_name].append((-score, user_id))
+            user_boards.setdefault(user_id, set()).add(board_name)
+
+        boards = dict(boards)
+        for name in removed.keys() | added.keys():
+            if name in boards:
+                board = boards[name].changed(removed.get(name, set()), added.get(name, []))
+            else:
+                board = Board(added[name])
+            if board.keys:
+                boards[name] = board
+            else:
+                boards.pop(name, None)
+        self._state, self._watermark = (boards, user_boards), watermark
+        return True
+
+# Per process: each worker keeps its own copy of the boards
+leaderboard_index = LeaderboardIndex()
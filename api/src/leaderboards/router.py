@@ -0,0 +1,100 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..database import get_db
+from ..models import User
+from ..schemas import LeaderboardEntryRead, LeaderboardPage, LeaderboardRank
+from ..auth.cache import Principal
+from ..auth.utils import get_current_user
+from .index import Board, leaderboard_index
+
+router = APIRouter(prefix="/leaderboards", tags=["Leaderboards"])
+
+async def _board(db: AsyncSession, name: str) -> Board:
+    await leaderboard_index.ensure_fresh()
+    board = leaderboard_index.boards.get(name)
+    if not board:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Leaderboard not found"
+        )
+    return board
+
+async def _page(db: AsyncSession, name: str, board: Board, ranked: list) -> LeaderboardPage:
+    usernames = dict((await db.execute(
+        select(User.id, User.username).where(User.id.in_([user_id for _, user_id, _ in ranked]))
+    )).all()) if ranked else {}
+    return LeaderboardPage(
+        board=name,
+        size=len(board),
+        entries=[
+            LeaderboardEntryRead(rank=rank, user_id=user_id, username=usernames.get(user_id, ""), score=score)
+            for rank, user_id, score in ranked
+        ]
+    )
+
+@router.get("/me", response_model=List[LeaderboardRank])
+async def get_my_ranks(
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """The current user's rank on every board they appear on"""
+    await leaderboard_index.ensure_fresh()
+    boards = leaderboard_index.boards
+    ranks = []
+    for name in leaderboard_index.user_boards(current_user.id):
+        # A refresh may swap the boards in between
+        board = boards.get(name)
+        if board is None or current_user.id not in board.scores:
+            continue
+        ranks.append(LeaderboardRank(
+            board=name, size=len(board), rank=board.rank(current_user.id), score=board.scores[current_user.id]
+        ))
+    return ranks
+
+@router.get("/{board}", response_model=LeaderboardPage)
+async def get_leaderboard(
+    board: str,
+    limit: int = Query(10, ge=1, le=settings.LEADERBOARD_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Top entries of a board: "global", "tier:GOLD" or "area:<area name>" """
+    entries = await _board(db, board)
+    return await _page(db, board, entries, entries.slice(offset, offset + limit))
+
+@router.get("/{board}/me", response_model=LeaderboardRank)
+async def get_my_rank(
+    board: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    entries = await _board(db, board)
+    rank = entries.rank(current_user.id)
+    if rank is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not ranked on this leaderboard"
+        )
+    return LeaderboardRank(board=board, size=len(entries), rank=rank, score=entries.scores[current_user.id])
+
+@router.get("/{board}/around-me", response_model=LeaderboardPage)
+async def get_entries_around_me(
+    board: str,
+    radius: int = Query(5, ge=1, le=settings.LEADERBOARD_MAX_LIMIT // 2),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """The current user's entry with up to radius entries above and below"""
+    entries = await _board(db, board)
+    if entries.rank(current_user.id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not ranked on this leaderboard"
+        )
+    return await _page(db, board, entries, entries.around(current_user.id, radius))
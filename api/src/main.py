@@ -1,20 +1,46 @@
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from .config import settings
-from .database import engine, Base
+from .database import create_dev_tables
+from .db_metrics import async_pool_metrics, sync_pool_metrics
+from .instrumentation import MetricsMiddleware, render_metrics
 from .auth.router import router as auth_router
 from .areas.router import router as areas_router
 from .projects.router import router as projects_router
 from .routines.router import router as routines_router
+from .areas import jobs as area_jobs
+from .routines import jobs as routine_jobs
+from .scoring.router import router as scoring_router
+from .leaderboards.router import router as leaderboards_router
+from .scoring import jobs as scoring_jobs
+from .scheduler import scheduler
+from .serialization import FastJSONResponse
+
+logging.basicConfig(level=logging.INFO)
+
+create_dev_tables()
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.SCHEDULER_ENABLED:
+        routine_jobs.register_jobs(scheduler)
+        area_jobs.register_jobs(scheduler)
+        scoring_jobs.register_jobs(scheduler)
+        await scheduler.start()
+    yield
+    await scheduler.stop()
 
 app = FastAPI(
     title="Questify API",
     description="API for Questify - A Gamified Self-Improvement App",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Configure CORS
@@ -24,13 +50,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Query-Count", "X-DB-Time-Ms"],
 )
+app.add_middleware(MetricsMiddleware)
 
 # Include routers
 app.include_router(auth_router)
 app.include_router(areas_router)
 app.include_router(projects_router)
 app.include_router(routines_router)
+app.include_router(scoring_router)
+app.include_router(leaderboards_router)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Request, SQL, pool and cache metrics in the Prometheus text format"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/pool")
+async def pool_metrics():
+    """Connection pool usage of the async (API) and sync (jobs) engines"""
+    return {
+        "async": async_pool_metrics.snapshot(),
+        "sync": sync_pool_metrics.snapshot()
+    }
 
 @app.get("/")
 async def root():
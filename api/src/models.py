@@ -1,8 +1,8 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, Boolean, ForeignKey, DateTime, Text, Float, JSON, Enum as SQLEnum
+from sqlalchemy import Column, String, Integer, BigInteger, Boolean, ForeignKey, ForeignKeyConstraint, Date, DateTime, Text, Float, JSON, Index, UniqueConstraint, Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import UUID, JSONB
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from sqlalchemy.orm import relationship
 import enum
 
@@ -33,6 +33,9 @@ class Area(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    # Keyset pagination of a user's areas
+    __table_args__ = (Index('ix_areas_user_created', 'user_id', 'created_at', 'id'),)
+
     # Relationships
     user = relationship("User", back_populates="areas")
     projects = relationship("Project", back_populates="area", cascade="all, delete-orphan")
@@ -47,6 +50,8 @@ class Project(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    __table_args__ = (Index('ix_projects_area_created', 'area_id', 'created_at', 'id'),)
+
     # Relationships
     area = relationship("Area", back_populates="projects")
 
@@ -64,7 +69,7 @@ class Routine(Base):
     
     # Scheduling
     is_recurring = Column(Boolean, default=False)
-    frequency = Column(String(50))
+    frequency = Column(String(255))  # 'daily', 'weekly', 'monthly' or an RRULE-style string
     start_date = Column(DateTime(timezone=True))
     end_date = Column(DateTime(timezone=True))
     
@@ -78,6 +83,8 @@ class Routine(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    __table_args__ = (Index('ix_routines_user_created', 'user_id', 'created_at', 'id'),)
+
     # Relationships
     instances = relationship("RoutineInstance", back_populates="routine", cascade="all, delete-orphan")
     user = relationship("User", back_populates="routines")
@@ -88,10 +95,20 @@ class RoutineInstance(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     routine_id = Column(UUID(as_uuid=True), ForeignKey('routines.id', ondelete='CASCADE'), nullable=False)
     iteration_position = Column(Integer, default=0)
-    due_date = Column(DateTime(timezone=True), nullable=False)
+    # Partition key, so part of the table's primary key; rows are still identified by id alone
+    due_date = Column(DateTime(timezone=True), primary_key=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    __mapper_args__ = {'primary_key': [id]}
+    __table_args__ = (
+        # One instance per routine and day; also serves date range reads, keyset
+        # pagination and generation lookups, and is the ON CONFLICT target of generation
+        Index('uq_routine_instances_routine_due', 'routine_id', 'due_date', unique=True, postgresql_include=['id']),
+        # Oldest-first scans of the retention job
+        Index('ix_routine_instances_due', 'due_date', 'id'),
+    )
+
     # Relationships
     routine = relationship("Routine", back_populates="instances")
     task_instances = relationship("TaskInstance", back_populates="routine_instance", cascade="all, delete-orphan")
@@ -105,7 +122,9 @@ class TaskInstance(Base):
     __tablename__ = "task_instances"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    routine_instance_id = Column(UUID(as_uuid=True), ForeignKey('routine_instances.id', ondelete='CASCADE'), nullable=False)
+    routine_instance_id = Column(UUID(as_uuid=True), nullable=False)
+    # Copied from the routine instance: the partition key, and part of the key to it
+    due_date = Column(DateTime(timezone=True), primary_key=True)
     task_id = Column(String(100), nullable=False)  # References the task ID in the routine's queue
     name = Column(String(100), nullable=False)
     status = Column(String(20), default='pending')
@@ -114,9 +133,156 @@ class TaskInstance(Base):
     target_value = Column(Float)
     execution_time = Column(String(5))  # HH:MM format
     duration = Column(Integer)  # in minutes
+    difficulty = Column(String(20), nullable=False, default='MEDIUM')  # From the queue item
     completion_date = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    __mapper_args__ = {'primary_key': [id]}
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ['routine_instance_id', 'due_date'], ['routine_instances.id', 'routine_instances.due_date'],
+            ondelete='CASCADE'
+        ),
+        # One task per queue item and instance. due_date follows from the instance,
+        # but a partitioned table's unique index has to include it
+        Index('uq_task_instances_instance_task', 'routine_instance_id', 'due_date', 'task_id', unique=True),
+    )
+
     # Relationships
-    routine_instance = relationship("RoutineInstance", back_populates="task_instances")
\ No newline at end of file
+    routine_instance = relationship("RoutineInstance", back_populates="task_instances")
+
+class TaskHistory(Base):
+    """Compact record of a task instance archived by the retention job"""
+    __tablename__ = "task_history"
+
+    task_instance_id = Column(UUID(as_uuid=True), primary_key=True)  # The archived row's id
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    routine_id = Column(UUID(as_uuid=True), ForeignKey('routines.id', ondelete='CASCADE'), nullable=False)
+    due_date = Column(Date, nullable=False)
+    task_id = Column(String(100), nullable=False)
+    name = Column(String(100), nullable=False)
+    status = Column(String(20), nullable=False)
+    progress = Column(Integer, nullable=False, default=0)
+    difficulty = Column(String(20), nullable=False)
+    completion_date = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (Index('ix_task_history_user_due', 'user_id', 'due_date'),)
+
+class XpEvent(Base):
+    """XP awarded by a task completion, folded into Area.xp by the aggregator job"""
+    __tablename__ = "xp_events"
+
+    id = Column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    area_id = Column(UUID(as_uuid=True), ForeignKey('areas.id', ondelete='CASCADE'), nullable=False)
+    # One award per task instance, so completing a task again does not count twice. No foreign
+    # key, as task_instances is partitioned; purge and retention delete the events themselves
+    task_instance_id = Column(UUID(as_uuid=True), nullable=False, unique=True)
+    xp = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    applied_at = Column(DateTime(timezone=True))  # NULL until folded into Area.xp
+
+    __table_args__ = (
+        Index(
+            'ix_xp_events_pending', 'area_id',
+            postgresql_where=text('applied_at IS NULL'),
+            sqlite_where=text('applied_at IS NULL')
+        ),
+    )
+
+class DailySummary(Base):
+    """Per-user daily rollup of task instances, maintained as tasks change"""
+    __tablename__ = "daily_summaries"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    day = Column(Date, primary_key=True)
+    instances = Column(Integer, nullable=False, default=0)
+    tasks_total = Column(Integer, nullable=False, default=0)
+    tasks_completed = Column(Integer, nullable=False, default=0)
+    tasks_pending = Column(Integer, nullable=False, default=0)
+    progress_total = Column(Integer, nullable=False, default=0)
+    xp_earned = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class UserScore(Base):
+    """Latest User Performance Rating of a user and its components"""
+    __tablename__ = "user_scores"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    upr = Column(Float, nullable=False, default=0)
+    area_mastery = Column(Float, nullable=False, default=0)
+    task_complexity = Column(Float, nullable=False, default=0)
+    consistency = Column(Float, nullable=False, default=0)
+    diversity = Column(Float, nullable=False, default=0)
+    consistency_modifier = Column(Float, nullable=False, default=1)
+    tier = Column(String(20), nullable=False, default='BRONZE')
+    area_scores = Column(JSONB, nullable=False, default={})  # Area id -> Area Mastery Score
+    computed_at = Column(DateTime(timezone=True), nullable=False)  # Completions up to here are included
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class StaleScore(Base):
+    """A user whose stored score predates their latest completion, for the incremental rescore"""
+    __tablename__ = "stale_scores"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    marked_at = Column(DateTime(timezone=True), nullable=False)  # Latest completion; compared on clearing
+
+class LeaderboardEntry(Base):
+    """A user's score on one board ("global", "tier:GOLD", "area:fitness")"""
+    __tablename__ = "leaderboard_entries"
+
+    board = Column(String(120), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    score = Column(Float, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # Incremental refresh of the in-process leaderboard index
+        Index('ix_leaderboard_entries_updated', 'updated_at'),
+    )
+
+class LeaderboardRemoval(Base):
+    """A user who lost all their leaderboard entries, for the index to drop them from its boards"""
+    __tablename__ = "leaderboard_removals"
+
+    user_id = Column(UUID(as_uuid=True), primary_key=True)  # No foreign key: outlives a deleted user
+    removed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (Index('ix_leaderboard_removals_removed', 'removed_at'),)
+
+class Streak(Base):
+    """Consecutive active days of a user, overall (no area) or in one of their areas"""
+    __tablename__ = "streaks"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    area_id = Column(UUID(as_uuid=True), ForeignKey('areas.id', ondelete='CASCADE'))
+    current_streak = Column(Integer, nullable=False, default=0)
+    longest_streak = Column(Integer, nullable=False, default=0)
+    last_active_date = Column(Date)  # Last day with a completed task
+    last_counted_date = Column(Date)  # Last day kept by activity or a grace token
+    grace_tokens = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'area_id', postgresql_nulls_not_distinct=True),
+        # The nightly roll-forward looks for streaks not counted yesterday
+        Index('ix_streaks_last_counted', 'last_counted_date'),
+    )
+
+class ScheduledJob(Base):
+    __tablename__ = "scheduled_jobs"
+
+    name = Column(String(100), primary_key=True)
+    schedule = Column(String(50), nullable=False)
+    last_run_at = Column(DateTime(timezone=True))  # Scheduled time of the last completed run
+    locked_by = Column(String(255))
+    locked_until = Column(DateTime(timezone=True))
+    failures = Column(Integer, nullable=False, default=0, server_default='0')  # Consecutive failed runs
+    last_error = Column(Text)
+    retry_at = Column(DateTime(timezone=True))  # No new attempt before this after a failure
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,7 +1,6 @@
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.types import TypeDecorator
-import json
-from ..utils.json_encoder import CustomJSONEncoder
+from ..serialization import jsonb_ready
 
 class JSONBType(TypeDecorator):
     impl = JSONB
@@ -9,12 +8,10 @@ class JSONBType(TypeDecorator):
 
     def process_bind_param(self, value, dialect):
         if value is not None:
-            return json.loads(
-                json.dumps(value, cls=CustomJSONEncoder)
-            )
+            return jsonb_ready(value)
         return value
 
     def process_result_value(self, value, dialect):
         if value is not None:
             return value
-        return value 
\ No newline at end of file
+        return value
@@ -0,0 +1,128 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple, Type
+from uuid import UUID
+
+from fastapi import HTTPException, Query, Response, status
+from pydantic import BaseModel
+from sqlalchemy import Select, literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .serialization import FastJSONResponse
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+class PageParams:
+    """Optional keyset pagination (`limit`, `after`) and field projection (`fields`).
+
+    Without `limit` every row is returned, as before. With it, at most `limit`
+    rows come back and, if there are more, the X-Next-Cursor response header
+    holds the value to pass as `after` for the next page.
+    """
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=settings.PAGE_MAX_LIMIT),
+        after: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+        fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,name")
+    ):
+        self.limit = limit
+        self.after = after
+        self.fields = fields
+
+def encode_cursor(sort_value: datetime, row_id: UUID) -> str:
+    raw = json.dumps([sort_value.isoformat(), str(row_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(sort_value), UUID(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+def parse_fields(fields: Optional[str], schema: Type[BaseModel]) -> Optional[List[str]]:
+    """Validate a `fields` parameter against a response schema; `id` is always included"""
+    if not fields:
+        return None
+
+    # Accept both field names and the aliases they are serialized under
+    known = {}
+    for name, field in schema.model_fields.items():
+        known[name] = name
+        if field.alias:
+            known[field.alias] = name
+
+    requested = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in requested if field not in known]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+    return list(dict.fromkeys(['id'] + [known[field] for field in requested]))
+
+def select_columns(model, fields: Optional[List[str]], sort_attribute: str) -> Select:
+    """Select whole entities, or only the requested columns plus the sort column"""
+    if fields is None:
+        return select(model)
+    names = dict.fromkeys(fields + [sort_attribute])
+    return select(*(getattr(model, name) for name in names))
+
+async def fetch_rows(db: AsyncSession, query: Select, fields: Optional[List[str]]) -> Sequence[Any]:
+    """Entities for a `select_columns` query without fields, plain rows with them"""
+    if fields is None:
+        return (await db.scalars(query)).all()
+    return (await db.execute(query)).all()
+
+def keyset(query: Select, sort_column, id_column, page: PageParams) -> Select:
+    """Order by (sort column, id) and apply the `after` cursor and `limit`.
+
+    One extra row is fetched so `page_response` can tell whether another page follows.
+    """
+    query = query.order_by(sort_column, id_column)
+    if page.after:
+        sort_value, row_id = decode_cursor(page.after)
+        query = query.where(tuple_(sort_column, id_column) > tuple_(
+            literal(sort_value, sort_column.type), literal(row_id, id_column.type)
+        ))
+    if page.limit:
+        query = query.limit(page.limit + 1)
+    return query
+
+def page_response(
+    rows: Sequence[Any],
+    page: PageParams,
+    response: Response,
+    sort_attribute: str,
+    fields: Optional[List[str]] = None,
+    schema: Optional[Type[BaseModel]] = None
+):
+    """Trim the extra row fetched by `keyset`, set the next-page cursor and apply `fields`.
+
+    Without `fields` the rows are returned for the route's response model.
+    With them, only those fields are serialized: through `schema` when given,
+    so nested models and computed attributes work as usual, or straight from
+    the rows otherwise (e.g. rows that only selected those columns).
+    """
+    headers = {}
+    if page.limit and len(rows) > page.limit:
+        rows = rows[:page.limit]
+        last = rows[-1]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(last, sort_attribute), last.id)
+
+    response.headers.update(headers)
+    if fields is None:
+        return rows
+
+    if schema is not None:
+        content = [schema.model_validate(row).model_dump(include=set(fields), by_alias=True) for row in rows]
+    else:
+        content = [{field: getattr(row, field) for field in fields} for row in rows]
+    return FastJSONResponse(content, headers=dict(response.headers))
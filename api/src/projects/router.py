@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from uuid import UUID
 
@@ -7,46 +8,52 @@ from ..database import get_db
 from ..models import Project, Area
 from ..schemas import ProjectCreate, Project as ProjectSchema
 from ..auth.utils import get_current_user
+from ..pagination import PageParams, fetch_rows, keyset, page_response, parse_fields, select_columns
 
 router = APIRouter(prefix="/projects", tags=["Projects"])
 
 @router.post("/", response_model=ProjectSchema, status_code=status.HTTP_201_CREATED)
 async def create_project(
     project_data: ProjectCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     # Verify area belongs to user
-    area = db.query(Area).filter(
+    area = await db.scalar(select(Area).where(
         Area.id == project_data.area_id,
         Area.user_id == current_user.id
-    ).first()
+    ))
     if not area:
         raise HTTPException(status_code=404, detail="Area not found")
     
     db_project = Project(**project_data.dict())
     db.add(db_project)
-    db.commit()
-    db.refresh(db_project)
+    await db.commit()
+    await db.refresh(db_project)
     return db_project
 
 @router.get("/", response_model=List[ProjectSchema])
 async def get_projects(
-    db: Session = Depends(get_db),
+    response: Response,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    return db.query(Project).join(Area).filter(Area.user_id == current_user.id).all()
+    fields = parse_fields(page.fields, ProjectSchema)
+    query = select_columns(Project, fields, 'created_at').join(Area).where(Area.user_id == current_user.id)
+    rows = await fetch_rows(db, keyset(query, Project.created_at, Project.id, page), fields)
+    return page_response(rows, page, response, 'created_at', fields)
 
 @router.get("/{project_id}", response_model=ProjectSchema)
 async def get_project(
     project_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    project = db.query(Project).join(Area).filter(
+    project = await db.scalar(select(Project).join(Area).where(
         Project.id == project_id,
         Area.user_id == current_user.id
-    ).first()
+    ))
     
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
@@ -56,21 +63,21 @@ async def get_project(
 async def update_project(
     project_id: UUID,
     project_data: ProjectCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     # Verify area belongs to user
-    area = db.query(Area).filter(
+    area = await db.scalar(select(Area).where(
         Area.id == project_data.area_id,
         Area.user_id == current_user.id
-    ).first()
+    ))
     if not area:
         raise HTTPException(status_code=404, detail="Area not found")
 
-    project = db.query(Project).join(Area).filter(
+    project = await db.scalar(select(Project).join(Area).where(
         Project.id == project_id,
         Area.user_id == current_user.id
-    ).first()
+    ))
     
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
@@ -78,24 +85,24 @@ async def update_project(
     for key, value in project_data.dict().items():
         setattr(project, key, value)
     
-    db.commit()
-    db.refresh(project)
+    await db.commit()
+    await db.refresh(project)
     return project
 
 @router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_project(
     project_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    project = db.query(Project).join(Area).filter(
+    project = await db.scalar(select(Project).join(Area).where(
         Project.id == project_id,
         Area.user_id == current_user.id
-    ).first()
+    ))
     
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    db.delete(project)
-    db.commit()
+    await db.delete(project)
+    await db.commit()
     return {"ok": True} 
\ No newline at end of file
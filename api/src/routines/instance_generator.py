@@ -1,9 +1,13 @@
+import uuid
 from datetime import datetime, timedelta, date
-from typing import List, Optional
+from typing import Dict, Iterable, List
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, exists
+from sqlalchemy import func, select
 
+from ..database import insert_missing
 from ..models import Routine, RoutineInstance, TaskInstance, EvaluationMethod
+from .recurrence import compile_rule
+from .summary import refresh_daily_summaries
 
 class RoutineInstanceGenerator:
     def __init__(self, db: Session):
@@ -11,131 +15,183 @@ class RoutineInstanceGenerator:
 
     def generate_instances_for_user(self, user_id: str, target_date: date) -> dict:
         """Generate instances for a specific user and date"""
-        stats = {'created': 0, 'skipped': 0}
-        
-        # Get all recurring routines for user
+        return self.generate_instances_for_users([user_id], target_date)
+
+    def generate_instances_for_users(self, user_ids: Iterable, target_date: date) -> dict:
+        """Generate instances for several users and a single date"""
+        return self.generate_instances_for_range(user_ids, target_date, target_date)[target_date]
+
+    def generate_instances_for_range(self, user_ids: Iterable, start_date: date, end_date: date) -> Dict[date, dict]:
+        """Generate instances for several users over a date range in one pass.
+
+        Routines, existing instances and each routine's position before the
+        range are loaded with one query each. Iteration positions are then
+        carried forward in memory from day to day, and every new row is written
+        with bulk INSERT ... ON CONFLICT DO NOTHING in a single transaction, so
+        a rerun, or a concurrent one, creates nothing twice.
+        """
+        days = [start_date + timedelta(days=offset)
+                for offset in range((end_date - start_date).days + 1)]
+        stats = {day: {'created': 0, 'skipped': 0} for day in days}
+        user_ids = list(user_ids)
+        if not user_ids or not days:
+            return stats
+
+        # Get all recurring routines for the users
         routines = self.db.query(Routine).filter(
             Routine.is_recurring == True,
-            Routine.user_id == user_id
+            Routine.user_id.in_(user_ids)
         ).all()
 
-        # Generate instances for each routine
+        schedule = {}
         for routine in routines:
-            result = self._generate_routine_instance(routine, target_date)
-            if result is None:  # Routine shouldn't be generated for this date
+            rule = compile_rule(routine)
+            if rule is None or not routine.queue.get('iterations'):
                 continue
-            if isinstance(result, bool):  # Instance already existed
-                stats['skipped'] += 1
-            else:  # New instance was created
-                stats['created'] += 1
-
-        return stats
-
-    def _generate_routine_instance(self, routine: Routine, target_date: date) -> Optional[RoutineInstance]:
-        """Generate instance for a routine if it matches frequency"""
-        if not self._should_generate_for_date(routine, target_date):
-            return None
-
-        # Convert target_date to datetime for database
-        target_datetime = datetime.combine(target_date, datetime.min.time())
-
-        # Check for any existing instance for this date
-        existing_instance = self.db.query(RoutineInstance).filter(
-            RoutineInstance.routine_id == routine.id,
-            RoutineInstance.due_date == target_datetime
-        ).first()
-
-        if existing_instance:
-            # Check if instance has any tasks
-            has_tasks = self.db.query(TaskInstance).filter(
-                TaskInstance.routine_instance_id == existing_instance.id
-            ).first() is not None
-
-            if has_tasks:
-                # If instance has tasks, skip it
-                return True
-            else:
-                # If instance exists but has no tasks, reuse it
-                routine_instance = existing_instance
-        else:
-            # Create new instance if none exists
-            # Get the most recent instance to determine next position
-            previous_instance = self.db.query(RoutineInstance).filter(
-                RoutineInstance.routine_id == routine.id,
-                RoutineInstance.due_date < target_datetime
-            ).order_by(RoutineInstance.due_date.desc()).first()
-
-            # Calculate next position
-            iterations = routine.queue.get('iterations', [])
-            if not iterations:
-                return None
-
-            next_position = ((previous_instance.iteration_position + 1) if previous_instance 
-                            else 0) % len(iterations)
-
-            routine_instance = RoutineInstance(
-                routine_id=routine.id,
-                iteration_position=next_position,
-                due_date=target_datetime
-            )
-            self.db.add(routine_instance)
-            self.db.flush()
-
-        # Get the current iteration
-        iterations = routine.queue.get('iterations', [])
-        if not iterations:
-            return None
-
-        current_iteration = iterations[routine_instance.iteration_position]
-
-        # Create task instances for current iteration
-        for item in current_iteration.get('items', []):
-            if item.get('type') == 'TASK':  # Skip cooldown periods
-                task_instance = TaskInstance(
-                    routine_instance_id=routine_instance.id,
-                    task_id=item['id'],
-                    name=item['name'],
-                    evaluation_method=item['evaluation_method'],
-                    target_value=item.get('target_value'),
-                    execution_time=item.get('execution_time'),
-                    duration=item.get('duration'),
-                    status='pending',
-                    progress=0
-                )
-                self.db.add(task_instance)
-
+            scheduled_days = rule.dates(start_date, end_date)
+            if scheduled_days:
+                schedule[routine] = scheduled_days
+        if not schedule:
+            return stats
+
+        # Convert range bounds to datetimes for database
+        start_datetime = datetime.combine(start_date, datetime.min.time())
+        end_datetime = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+        routine_ids = [routine.id for routine in schedule]
+
+        existing = self._load_existing_instances(routine_ids, start_datetime, end_datetime)
+        previous_positions = self._load_previous_positions(routine_ids, start_datetime)
+
+        instance_rows = []
+        planned = []
+        for routine, scheduled_days in schedule.items():
+            iterations = routine.queue['iterations']
+            routine_existing = existing.get(routine.id, {})
+            last_position = previous_positions.get(routine.id)
+            scheduled = set(scheduled_days)
+
+            # Instances already stored on unscheduled days still advance the rotation
+            for day in sorted(scheduled | set(routine_existing)):
+                if day in routine_existing:
+                    instance_id, due_date, position, has_tasks = routine_existing[day]
+                    last_position = position
+                    if day not in scheduled:
+                        continue
+                    if has_tasks:
+                        # If instance has tasks, skip it
+                        stats[day]['skipped'] += 1
+                        continue
+                    # If instance exists but has no tasks, reuse it
+                    is_new = False
+                else:
+                    position = ((last_position + 1) if last_position is not None
+                                else 0) % len(iterations)
+                    last_position = position
+                    instance_id = uuid.uuid4()
+                    due_date = datetime.combine(day, datetime.min.time())
+                    instance_rows.append({
+                        'id': instance_id,
+                        'routine_id': routine.id,
+                        'iteration_position': position,
+                        'due_date': due_date
+                    })
+                    is_new = True
+                planned.append((routine.user_id, day, instance_id, due_date, iterations[position], is_new))
+
+        # Concurrent runs (the API and the nightly job, or overlapping shards) may
+        # write the same instances: the unique indexes let the first one win, and
+        # RETURNING tells which rows this run wrote
         try:
+            inserted = {row.id for row in insert_missing(
+                self.db, RoutineInstance, instance_rows, ('routine_id', 'due_date'), (RoutineInstance.id,)
+            )}
+            task_rows = []
+            for _, _, instance_id, due_date, iteration, is_new in planned:
+                if not is_new or instance_id in inserted:
+                    task_rows.extend(self._build_task_rows(instance_id, due_date, iteration))
+            filled = {row.routine_instance_id for row in insert_missing(
+                self.db, TaskInstance, task_rows, ('routine_instance_id', 'due_date', 'task_id'),
+                (TaskInstance.routine_instance_id,)
+            )}
+
+            changed_days = set()
+            for user_id, day, instance_id, _, _, is_new in planned:
+                if instance_id in (inserted if is_new else filled):
+                    stats[day]['created'] += 1
+                    changed_days.add((user_id, day))
+                else:
+                    stats[day]['skipped'] += 1
+            refresh_daily_summaries(self.db, changed_days)
             self.db.commit()
-            return routine_instance
         except Exception as e:
             self.db.rollback()
             raise e
 
-    def _should_generate_for_date(self, routine: Routine, target_date: date) -> bool:
-        """Determine if an instance should be generated for the given date"""
-        if not routine.is_recurring or not routine.frequency:
-            return False
-
-        # Convert datetime fields to date for comparison
-        start_date = routine.start_date.date() if routine.start_date else None
-        end_date = routine.end_date.date() if routine.end_date else None
-
-        if start_date and target_date < start_date:
-            return False
-
-        if end_date and target_date > end_date:
-            return False
-
-        # Check frequency
-        if routine.frequency == 'daily':
-            return True
-        elif routine.frequency == 'weekly':
-            # Maintain the same day of week as the start_date
-            reference_date = (start_date or routine.created_at.date())
-            return target_date.weekday() == reference_date.weekday()
-        elif routine.frequency == 'monthly':
-            # Maintain the same day of month
-            reference_date = (start_date or routine.created_at.date())
-            return target_date.day == reference_date.day
-
-        return False 
\ No newline at end of file
+        return stats
+
+    def _load_existing_instances(self, routine_ids: List, start_datetime: datetime, end_datetime: datetime) -> Dict:
+        """Map routine id to {date: (instance id, due date, position, has tasks)} for instances in the range"""
+        has_tasks = select(TaskInstance.id).where(
+            TaskInstance.routine_instance_id == RoutineInstance.id,
+            TaskInstance.due_date == RoutineInstance.due_date
+        ).exists()
+
+        rows = self.db.execute(
+            select(
+                RoutineInstance.routine_id,
+                RoutineInstance.due_date,
+                RoutineInstance.id,
+                RoutineInstance.iteration_position,
+                has_tasks
+            ).where(
+                RoutineInstance.routine_id.in_(routine_ids),
+                RoutineInstance.due_date >= start_datetime,
+                RoutineInstance.due_date < end_datetime
+            )
+        ).all()
+
+        existing = {}
+        for routine_id, due_date, instance_id, position, has_task in rows:
+            existing.setdefault(routine_id, {})[due_date.date()] = (instance_id, due_date, position, has_task)
+        return existing
+
+    def _load_previous_positions(self, routine_ids: List, before_datetime: datetime) -> Dict:
+        """Map routine id to the iteration position of its latest instance before a datetime"""
+        ranked = select(
+            RoutineInstance.routine_id,
+            RoutineInstance.iteration_position,
+            func.row_number().over(
+                partition_by=RoutineInstance.routine_id,
+                order_by=RoutineInstance.due_date.desc()
+            ).label('rank')
+        ).where(
+            RoutineInstance.routine_id.in_(routine_ids),
+            RoutineInstance.due_date < before_datetime
+        ).subquery()
+
+        rows = self.db.execute(
+            select(ranked.c.routine_id, ranked.c.iteration_position).where(ranked.c.rank == 1)
+        ).all()
+
+        return {routine_id: position for routine_id, position in rows}
+
+    def _build_task_rows(self, routine_instance_id, due_date: datetime, iteration: dict) -> List[dict]:
+        """Build task instance rows for the items of an iteration"""
+        return [
+            {
+                'id': uuid.uuid4(),
+                'routine_instance_id': routine_instance_id,
+                'due_date': due_date,
+                'task_id': item['id'],
+                'name': item['name'],
+                'evaluation_method': item['evaluation_method'],
+                'target_value': item.get('target_value'),
+                'execution_time': item.get('execution_time'),
+                'duration': item.get('duration'),
+                'difficulty': item.get('difficulty', 'MEDIUM'),
+                'status': 'pending',
+                'progress': 0
+            }
+            for item in iteration.get('items', [])
+            if item.get('type') == 'TASK'  # Skip cooldown periods
+        ]
@@ -1,34 +1,179 @@
-from fastapi import BackgroundTasks
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, date, time
+from time import monotonic, sleep
+from typing import Iterator, List, Optional
+
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from ..config import settings
 from ..database import SessionLocal
+from ..db_metrics import db_caller
+from ..scheduler import JobScheduler
 from .instance_generator import RoutineInstanceGenerator
+from .partitions import drop_expired_partitions, ensure_partitions, is_partitioned, month_start
+from .purge import archive_instances, retention_horizon
 from ..models import User
 
-async def generate_daily_instances(_: int = None):
-    """Generate routine instances for all users at 6 PM"""
+logger = logging.getLogger(__name__)
+
+def iter_user_id_shards(db: Session, shard_size: int) -> Iterator[List]:
+    """Stream user ids in shards using keyset pagination on the primary key"""
+    last_id = None
+    while True:
+        query = db.query(User.id).order_by(User.id)
+        if last_id is not None:
+            query = query.filter(User.id > last_id)
+
+        shard = [user_id for (user_id,) in query.limit(shard_size).all()]
+        if not shard:
+            return
+        yield shard
+        last_id = shard[-1]
+
+def _generate_shard(shard_index: int, user_ids: List, target_date: date) -> dict:
+    """Generate instances for one shard on its own session, retrying on failure"""
+    db_caller.set("job:generate-daily-instances")
+    attempts = settings.GENERATION_SHARD_RETRIES + 1
+    for attempt in range(1, attempts + 1):
+        db = SessionLocal()
+        try:
+            stats = RoutineInstanceGenerator(db).generate_instances_for_users(user_ids, target_date)
+            logger.info(
+                "Shard %d: %d users, %d created, %d skipped (attempt %d)",
+                shard_index, len(user_ids), stats['created'], stats['skipped'], attempt
+            )
+            return {'shard': shard_index, 'users': len(user_ids), 'failed': False, **stats}
+        except Exception:
+            logger.exception("Shard %d failed (attempt %d/%d)", shard_index, attempt, attempts)
+            if attempt < attempts:
+                sleep(settings.GENERATION_RETRY_BACKOFF_SECONDS * attempt)
+        finally:
+            db.close()
+
+    return {'shard': shard_index, 'users': len(user_ids), 'failed': True, 'created': 0, 'skipped': 0}
+
+def _record_shard(summary: dict, result: dict) -> None:
+    summary['shards'] += 1
+    summary['users'] += result['users']
+    summary['created'] += result['created']
+    summary['skipped'] += result['skipped']
+    if result['failed']:
+        summary['failed_shards'].append(result['shard'])
+
+def generate_daily_instances(target_date: Optional[date] = None) -> dict:
+    """Generate routine instances for all users at 6 PM
+
+    Users are streamed in shards with keyset pagination, and the shards run
+    on a bounded thread pool where every worker uses its own session.
+    """
+    # Generate tomorrow's instances by default
+    target_date = target_date or datetime.now().date() + timedelta(days=1)
+    workers = settings.GENERATION_WORKERS
+    summary = {
+        'target_date': target_date.isoformat(),
+        'users': 0,
+        'shards': 0,
+        'failed_shards': [],
+        'created': 0,
+        'skipped': 0
+    }
+
+    started = monotonic()
+    db = SessionLocal()
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="generation") as executor:
+            pending = set()
+            shards = iter_user_id_shards(db, settings.GENERATION_SHARD_SIZE)
+            for shard_index, user_ids in enumerate(shards):
+                pending.add(executor.submit(_generate_shard, shard_index, user_ids, target_date))
+
+                # Keep only a bounded number of shards queued ahead of the workers
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        _record_shard(summary, future.result())
+
+            for future in wait(pending).done:
+                _record_shard(summary, future.result())
+    finally:
+        db.close()
+
+    elapsed = monotonic() - started
+    summary['elapsed_seconds'] = round(elapsed, 3)
+    summary['users_per_second'] = round(summary['users'] / elapsed, 1) if elapsed > 0 else 0.0
+    logger.info(
+        "Generated instances for %s: %d users in %d shards, %d created, %d skipped, "
+        "%d failed shards, %.1f users/s",
+        summary['target_date'], summary['users'], summary['shards'], summary['created'],
+        summary['skipped'], len(summary['failed_shards']), summary['users_per_second']
+    )
+    return summary
+
+def run_nightly_generation(scheduled_for: datetime) -> dict:
+    """Scheduler entry point: generate the day after the scheduled run"""
+    return generate_daily_instances(scheduled_for.date() + timedelta(days=1))
+
+def maintain_partitions(scheduled_for: datetime) -> dict:
+    """Create the monthly partitions needed for the next PARTITION_MONTHS_AHEAD months"""
+    db_caller.set("job:maintain-partitions")
+    db = SessionLocal()
+    try:
+        if not is_partitioned(db):
+            return {'created': []}
+        first = scheduled_for.date()
+        created = ensure_partitions(db, first, first + timedelta(days=31 * settings.PARTITION_MONTHS_AHEAD))
+    finally:
+        db.close()
+    if created:
+        logger.info("Created partitions %s", ", ".join(created))
+    return {'created': created}
+
+def archive_old_instances(scheduled_for: datetime, retention_days: Optional[int] = None) -> dict:
+    """Move instances past the retention window into task_history.
+
+    With partitioned tables the horizon is rounded down to a month and whole
+    monthly partitions are archived and dropped; whatever is left before it
+    (a month kept back, rows in a default partition, an unpartitioned
+    schema) is archived chunk by chunk.
+    """
+    db_caller.set("job:archive-instances")
+    before = retention_horizon(scheduled_for.date(), retention_days)
+    summary = {'before': None, 'partitions_dropped': [], 'instances': 0, 'batches': 0}
+    if before is None:
+        return summary
+
+    batch_size = settings.PURGE_BATCH_SIZE
     db = SessionLocal()
     try:
-        # Get all users
-        users = db.query(User).all()
-        
-        # Generate tomorrow's instances
-        target_date = datetime.now().date() + timedelta(days=1)
-        
-        for user in users:
-            generator = RoutineInstanceGenerator(db)
-            generator.generate_instances_for_user(user.id, target_date)
-            
+        if is_partitioned(db):
+            before = datetime.combine(month_start(before.date()), time.min)
+            summary['partitions_dropped'] = drop_expired_partitions(db, before.date(), batch_size)
+        summary['before'] = before.isoformat()
+        while True:
+            archived = archive_instances(db, before, batch_size)
+            summary['instances'] += archived
+            summary['batches'] += 1
+            if archived:
+                logger.info("Archived %d instances due before %s so far", summary['instances'], summary['before'])
+            if archived < batch_size:
+                break
     finally:
         db.close()
+    return summary
 
-def schedule_instance_generation(background_tasks: BackgroundTasks):
-    """Schedule instance generation for the next 6 PM"""
-    now = datetime.now()
-    target_time = now.replace(hour=18, minute=0, second=0, microsecond=0)
-    
-    if now >= target_time:
-        target_time += timedelta(days=1)
-    
-    delay = (target_time - now).total_seconds()
-    background_tasks.add_task(generate_daily_instances, delay) 
\ No newline at end of file
+def register_jobs(scheduler: JobScheduler) -> None:
+    scheduler.register(
+        "generate-daily-instances",
+        run_nightly_generation,
+        daily_at=time.fromisoformat(settings.GENERATION_RUN_AT)
+    )
+    scheduler.register(
+        "maintain-partitions",
+        maintain_partitions,
+        daily_at=time.fromisoformat(settings.PARTITION_RUN_AT)
+    )
+    scheduler.register(
+        "archive-instances",
+        archive_old_instances,
+        daily_at=time.fromisoformat(settings.RETENTION_RUN_AT)
+    )
@@ -0,0 +1,191 @@
+"""Monthly range partitions of routine_instances and task_instances on PostgreSQL.
+
+Partitions are named <table>_YYYY_MM and cover one UTC calendar month of
+due_date, as the ones postgres/init.sql creates. Elsewhere, or on a schema
+without partitioning, maintenance does nothing and queries run unchanged.
+"""
+import logging
+import re
+from datetime import date, datetime, time, timedelta, timezone
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, delete, exists, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session, with_loader_criteria
+
+from ..models import RoutineInstance, TaskHistory, TaskInstance, XpEvent
+from .purge import HISTORY_COLUMNS, history_select
+
+logger = logging.getLogger(__name__)
+
+# Referenced table first; dropped in reverse
+PARTITIONED_TABLES = ('routine_instances', 'task_instances')
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+def next_month(month: date) -> date:
+    return (month + timedelta(days=32)).replace(day=1)
+
+def month_bounds(month: date) -> Tuple[datetime, datetime]:
+    """The due_date range of a monthly partition"""
+    return (
+        datetime.combine(month, time.min, tzinfo=timezone.utc),
+        datetime.combine(next_month(month), time.min, tzinfo=timezone.utc)
+    )
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+def instances_due_between(start: datetime, end: datetime) -> Tuple:
+    """Loader options restricting routine and task instances to a due-date range.
+
+    Tasks share their instance's due_date, so this changes no result, but
+    the selectinload query for tasks, which joins back to the instances by
+    id, can then skip the partitions of both tables outside the range
+    instead of probing every one of them.
+    """
+    return (
+        with_loader_criteria(
+            RoutineInstance, and_(RoutineInstance.due_date >= start, RoutineInstance.due_date < end),
+            include_aliases=True
+        ),
+        with_loader_criteria(TaskInstance, and_(TaskInstance.due_date >= start, TaskInstance.due_date < end))
+    )
+
+def is_partitioned(db: Session) -> bool:
+    if db.get_bind().dialect.name != 'postgresql':
+        return False
+    return db.scalar(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('routine_instances'))"
+    ))
+
+def partition_months(db: Session) -> List[date]:
+    """Months that have a routine_instances partition"""
+    names = db.scalars(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = to_regclass('routine_instances')"
+    ))
+    months = []
+    for name in names:
+        match = re.fullmatch(r'routine_instances_(\d{4})_(\d{2})', name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+def _take_from_default(db: Session, start: datetime, end: datetime) -> List[str]:
+    """Move a month's rows out of the default partitions into temporary tables.
+
+    A month cannot be given a partition while the default one holds rows of
+    it. Returns the temporary tables, in PARTITIONED_TABLES order, for
+    _return_from_default to put back once the month has its partitions.
+    """
+    in_month = "due_date >= :start AND due_date < :end"
+    moved = []
+    for table in PARTITIONED_TABLES:
+        default = f"{table}_default"
+        if db.scalar(text("SELECT to_regclass(:name)"), {'name': default}) is None:
+            continue
+        # Held until commit, so no row of the month lands there before its partition exists
+        db.execute(text(f"LOCK TABLE {default} IN EXCLUSIVE MODE"))
+        db.execute(text(
+            f'CREATE TEMPORARY TABLE "{default}_moved" ON COMMIT DROP AS SELECT * FROM {default} WHERE {in_month}'
+        ), {'start': start, 'end': end})
+        moved.append(table)
+    # Tasks first, they reference their instances
+    for table in reversed(moved):
+        db.execute(text(f"DELETE FROM {table}_default WHERE {in_month}"), {'start': start, 'end': end})
+    return moved
+
+def _return_from_default(db: Session, moved: List[str]) -> None:
+    for table in moved:
+        db.execute(text(f'INSERT INTO {table} SELECT * FROM "{table}_default_moved"'))
+        db.execute(text(f'DROP TABLE "{table}_default_moved"'))
+
+def ensure_partitions(db: Session, first: date, last: date) -> List[str]:
+    """Create the missing monthly partitions from first's month through last's, and commit.
+
+    Rows of a month that reached the default partitions before it had its
+    own are moved into the new ones, in the same transaction. Returns the
+    names of the partitions created. Creating a partition briefly locks its
+    parent, so this runs from maintenance jobs, not request paths.
+    """
+    created = []
+    month = month_start(first)
+    while month <= last:
+        start, end = month_bounds(month)
+        missing = [
+            table for table in PARTITIONED_TABLES
+            if db.scalar(text("SELECT to_regclass(:name)"), {'name': partition_name(table, month)}) is None
+        ]
+        if missing:
+            moved = _take_from_default(db, start, end)
+            for table in missing:
+                name = partition_name(table, month)
+                db.execute(text(
+                    f'CREATE TABLE "{name}" PARTITION OF {table} '
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                ))
+                created.append(name)
+            _return_from_default(db, moved)
+        month = next_month(month)
+    db.commit()
+    return created
+
+def _copy_history(db: Session, start: datetime, end: datetime, batch_size: int) -> int:
+    """Copy a month's task instances into task_history in keyset batches, committing each.
+
+    Rows already copied by an interrupted earlier run are skipped.
+    """
+    in_month = and_(TaskInstance.due_date >= start, TaskInstance.due_date < end)
+    copied = 0
+    last: Optional[UUID] = None
+    while True:
+        after = [TaskInstance.id > last] if last is not None else []
+        upper = db.scalar(
+            select(TaskInstance.id).where(in_month, *after)
+            .order_by(TaskInstance.id).offset(batch_size - 1).limit(1)
+        )
+        rows = history_select().where(in_month, *after)
+        if upper is not None:
+            rows = rows.where(TaskInstance.id <= upper)
+        copied += db.execute(
+            postgresql.insert(TaskHistory).from_select(HISTORY_COLUMNS, rows).on_conflict_do_nothing()
+        ).rowcount
+        db.commit()
+        if upper is None:
+            return copied
+        last = upper
+
+def drop_expired_partitions(db: Session, before: date, batch_size: int) -> List[str]:
+    """Archive the monthly partitions that end on or before a date into task_history, then drop them.
+
+    A month whose tasks still have XP waiting for the aggregator is left for
+    a later run. The tasks' XP events are deleted with the month. Returns the
+    names of the dropped partitions.
+    """
+    dropped = []
+    for month in partition_months(db):
+        if next_month(month) > before:
+            break
+        start, end = month_bounds(month)
+        in_month = and_(TaskInstance.due_date >= start, TaskInstance.due_date < end)
+        if db.scalar(select(exists().where(
+            XpEvent.task_instance_id == TaskInstance.id, XpEvent.applied_at.is_(None), in_month
+        ))):
+            logger.info("Keeping partitions of %s until its pending XP is aggregated", f"{month:%Y-%m}")
+            continue
+
+        copied = _copy_history(db, start, end, batch_size)
+        db.execute(delete(XpEvent).where(XpEvent.task_instance_id == TaskInstance.id, in_month))
+        for table in reversed(PARTITIONED_TABLES):
+            name = partition_name(table, month)
+            if db.scalar(text("SELECT to_regclass(:name)"), {'name': name}) is not None:
+                db.execute(text(f'ALTER TABLE {table} DETACH PARTITION "{name}"'))
+                db.execute(text(f'DROP TABLE "{name}"'))
+                dropped.append(name)
+        db.commit()
+        logger.info("Archived %d tasks of %s and dropped its partitions", copied, f"{month:%Y-%m}")
+    return dropped
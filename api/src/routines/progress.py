@@ -0,0 +1,70 @@
+from datetime import datetime, timezone
+from typing import Dict, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import case, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from ..areas.xp import record_xp
+from ..models import Routine, RoutineInstance, TaskInstance
+from ..scoring.stale import mark_score_stale
+from ..scoring.streaks import record_activity, task_area_id
+from .summary import refresh_daily_summaries
+
+def apply_task_progress(db: Session, user_id: UUID, updates: Dict[Tuple[UUID, str], int]) -> Set[Tuple[UUID, str]]:
+    """Set the progress of a user's task instances, keyed by (routine instance id, task id).
+
+    One query checks ownership of every key and one UPDATE applies all
+    changes; progress of 100 or more completes the task. Newly completed
+    tasks advance streaks and award XP, and any completion queues the
+    user for the incremental rescore. Returns the keys that were found,
+    the others do not exist or belong to another user. Does not commit.
+    """
+    rows = db.execute(
+        select(
+            TaskInstance.id,
+            TaskInstance.routine_instance_id,
+            TaskInstance.task_id,
+            TaskInstance.status,
+            TaskInstance.difficulty,
+            RoutineInstance.due_date,
+            Routine.queue
+        ).select_from(TaskInstance).join(RoutineInstance).join(Routine).where(
+            tuple_(TaskInstance.routine_instance_id, TaskInstance.task_id).in_(list(updates)),
+            Routine.user_id == user_id
+        )
+    ).all()
+    if not rows:
+        return set()
+
+    progress = {row.id: updates[(row.routine_instance_id, row.task_id)] for row in rows}
+    completed = [row for row in rows if progress[row.id] >= 100]
+    is_completed = TaskInstance.id.in_([row.id for row in completed])
+    completed_at = datetime.now(timezone.utc)
+    db.execute(
+        update(TaskInstance)
+        .where(
+            TaskInstance.id.in_(list(progress)),
+            TaskInstance.due_date.in_({row.due_date for row in rows})  # Only their partitions
+        )
+        .values(
+            progress=case(progress, value=TaskInstance.id),
+            status=case((is_completed, 'completed'), else_=TaskInstance.status),
+            completion_date=case((is_completed, completed_at), else_=TaskInstance.completion_date)
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    if completed:
+        mark_score_stale(db, user_id, completed_at)
+
+    newly_completed = [row for row in completed if row.status != 'completed']
+    if newly_completed:
+        today = datetime.now().date()
+        areas = {row.id: task_area_id(row.queue, row.task_id) for row in newly_completed}
+        for area_id in dict.fromkeys(areas.values()):
+            record_activity(db, user_id, area_id, today)
+        record_xp(db, user_id, [(areas[row.id], row.id, row.difficulty) for row in newly_completed])
+
+    refresh_daily_summaries(db, {(user_id, row.due_date.date()) for row in rows})
+    return {(row.routine_instance_id, row.task_id) for row in rows}
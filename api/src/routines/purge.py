@@ -0,0 +1,180 @@
+from datetime import date, datetime, time, timedelta
+from typing import Callable, List, Optional
+from uuid import UUID
+
+from sqlalchemy import Date, Select, and_, delete, exists, func, insert, select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import Routine, RoutineInstance, TaskHistory, TaskInstance, XpEvent
+from .summary import refresh_daily_summaries
+
+HISTORY_COLUMNS = (
+    'task_instance_id', 'user_id', 'routine_id', 'due_date', 'task_id',
+    'name', 'status', 'progress', 'difficulty', 'completion_date'
+)
+
+def _cascades(db: Session) -> bool:
+    """Whether the database removes an instance's tasks with it (ON DELETE CASCADE)"""
+    return db.get_bind().dialect.name == 'postgresql'
+
+def _delete_keyed(db: Session, model, key, keys: Select):
+    """DELETE the rows of model whose key is among keys.
+
+    PostgreSQL gets DELETE ... USING (keys) AS chunk, elsewhere key IN (keys).
+    Either way the key set never leaves the database.
+    """
+    if _cascades(db):
+        chunk = keys.subquery('chunk')
+        return delete(model).where(key == chunk.c[0])
+    return delete(model).where(key.in_(keys))
+
+def _delete_instances(db: Session, keys: Select) -> List[datetime]:
+    """Delete the routine instances keys selects (id, due_date), with their tasks and XP events; returns their due dates"""
+    if _cascades(db):
+        # One statement, so the keys are selected once and the XP events cleared belong
+        # to exactly the instances deleted: WITH chunk AS (...), cleared AS
+        # (DELETE xp_events ...) DELETE ... USING chunk. Tasks go by cascade
+        chunk = keys.cte('chunk')
+        cleared = delete(XpEvent).where(
+            XpEvent.task_instance_id == TaskInstance.id,
+            TaskInstance.routine_instance_id == chunk.c.id,
+            TaskInstance.due_date == chunk.c.due_date
+        ).cte('cleared')
+        return db.scalars(
+            delete(RoutineInstance).where(RoutineInstance.id == chunk.c.id, RoutineInstance.due_date == chunk.c.due_date)
+            .add_cte(cleared)
+            .returning(RoutineInstance.due_date)
+            .execution_options(synchronize_session=False)
+        ).all()
+
+    # XP events have no foreign key to cascade from, and tasks do not cascade
+    # here either, so both go first. Each statement runs keys again; on SQLite
+    # they select the same rows, as the write transaction holds the database lock
+    ids = keys.with_only_columns(RoutineInstance.id)
+    tasks = select(TaskInstance.id).where(TaskInstance.routine_instance_id.in_(ids))
+    db.execute(delete(XpEvent).where(XpEvent.task_instance_id.in_(tasks)))
+    db.execute(delete(TaskInstance).where(TaskInstance.routine_instance_id.in_(ids)))
+    return db.scalars(
+        delete(RoutineInstance).where(RoutineInstance.id.in_(ids)).returning(RoutineInstance.due_date)
+    ).all()
+
+def purge_future_instances(
+    db: Session,
+    user_id: UUID,
+    today: date,
+    batch_size: int,
+    on_batch: Optional[Callable[[dict], None]] = None
+) -> dict:
+    """Delete a user's instances due after today, and today's pending tasks, in chunks.
+
+    Each chunk of up to batch_size instances is one transaction: a set-based
+    DELETE over a bounded key subquery, the refresh of the daily summaries it
+    touched, then a commit. on_batch gets the running totals after every
+    chunk; the final totals are returned.
+    """
+    today_start = datetime.combine(today, time.min)
+    tomorrow = today_start + timedelta(days=1)
+    totals = {'future_instances': 0, 'pending_tasks': 0, 'batches': 0}
+
+    pending = select(TaskInstance.id).join(RoutineInstance).join(Routine).where(
+        Routine.user_id == user_id,
+        TaskInstance.due_date >= today_start,
+        TaskInstance.due_date < tomorrow,
+        TaskInstance.status == 'pending'
+    )
+    totals['pending_tasks'] = db.execute(
+        _delete_keyed(db, TaskInstance, TaskInstance.id, pending).execution_options(synchronize_session=False)
+    ).rowcount
+    changed_days = {today}
+
+    chunk = select(RoutineInstance.id, RoutineInstance.due_date).join(Routine).where(
+        Routine.user_id == user_id,
+        RoutineInstance.due_date >= tomorrow
+    ).order_by(RoutineInstance.due_date, RoutineInstance.id).limit(batch_size)
+    while True:
+        due_dates = _delete_instances(db, chunk)
+        changed_days.update(due_date.date() for due_date in due_dates)
+        refresh_daily_summaries(db, [(user_id, day) for day in changed_days])
+        db.commit()
+
+        totals['future_instances'] += len(due_dates)
+        totals['batches'] += 1
+        if on_batch:
+            on_batch(dict(totals))
+        if len(due_dates) < batch_size:
+            return totals
+        changed_days = set()
+
+def retention_horizon(today: date, days: Optional[int] = None) -> Optional[datetime]:
+    """Instances due before this are archived, or None when retention is off.
+
+    days defaults to INSTANCE_RETENTION_DAYS. The horizon never falls inside
+    the scoring window, which reads task instances.
+    """
+    days = settings.INSTANCE_RETENTION_DAYS if days is None else days
+    if days <= 0:
+        return None
+    return datetime.combine(today - timedelta(days=max(days, settings.SCORING_WINDOW_DAYS)), time.min)
+
+def history_select() -> Select:
+    """Task instances as task_history rows, in HISTORY_COLUMNS order"""
+    return select(
+        TaskInstance.id,
+        Routine.user_id,
+        RoutineInstance.routine_id,
+        func.date(RoutineInstance.due_date, type_=Date),
+        TaskInstance.task_id,
+        TaskInstance.name,
+        func.coalesce(TaskInstance.status, 'pending'),
+        func.coalesce(TaskInstance.progress, 0),
+        TaskInstance.difficulty,
+        TaskInstance.completion_date
+    ).select_from(TaskInstance).join(RoutineInstance).join(Routine)
+
+def archive_instances(db: Session, before: datetime, batch_size: int) -> int:
+    """Move one chunk of instances due before a cutoff into task_history and delete them, then commit.
+
+    Instances whose tasks still have XP waiting for the aggregator are left
+    for a later run. Daily summaries are kept. Returns the number of
+    instances archived; fewer than batch_size means nothing is left.
+    """
+    unsettled = exists().where(
+        TaskInstance.routine_instance_id == RoutineInstance.id,
+        TaskInstance.due_date == RoutineInstance.due_date,
+        XpEvent.task_instance_id == TaskInstance.id,
+        XpEvent.applied_at.is_(None)
+    )
+    chunk = select(RoutineInstance.id, RoutineInstance.due_date).where(
+        RoutineInstance.due_date < before,
+        ~unsettled
+    ).order_by(RoutineInstance.due_date, RoutineInstance.id).limit(batch_size)
+    history = history_select()
+
+    if _cascades(db):
+        # One statement, so the rows copied are exactly the rows deleted: WITH chunk AS
+        # (... SKIP LOCKED), archived AS (INSERT ...), cleared AS (DELETE xp_events ...)
+        # DELETE ... USING chunk
+        keys = chunk.with_for_update(skip_locked=True).cte('chunk')
+        archived = insert(TaskHistory).from_select(
+            HISTORY_COLUMNS,
+            history.join(keys, and_(keys.c.id == RoutineInstance.id, keys.c.due_date == RoutineInstance.due_date))
+        ).cte('archived')
+        cleared = delete(XpEvent).where(
+            XpEvent.task_instance_id == TaskInstance.id,
+            TaskInstance.routine_instance_id == keys.c.id,
+            TaskInstance.due_date == keys.c.due_date
+        ).cte('cleared')
+        count = len(db.scalars(
+            delete(RoutineInstance).where(RoutineInstance.id == keys.c.id, RoutineInstance.due_date == keys.c.due_date)
+            .add_cte(archived)
+            .add_cte(cleared)
+            .returning(RoutineInstance.id)
+            .execution_options(synchronize_session=False)
+        ).all())
+    else:
+        ids = chunk.with_only_columns(RoutineInstance.id)
+        db.execute(insert(TaskHistory).from_select(HISTORY_COLUMNS, history.where(RoutineInstance.id.in_(ids))))
+        count = len(_delete_instances(db, chunk))
+    db.commit()
+    return count
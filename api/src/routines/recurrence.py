@@ -0,0 +1,182 @@
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, NamedTuple, Optional
+
+import numpy as np
+
+from ..models import Routine
+
+WEEKDAY_CODES = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY')
+LEGACY_FREQUENCIES = {'daily': 'DAILY', 'weekly': 'WEEKLY', 'monthly': 'MONTHLY'}
+
+# 1970-01-01 was a Thursday
+_EPOCH_WEEKDAY = 3
+
+class _Calendar(NamedTuple):
+    days: np.ndarray
+    ordinals: np.ndarray
+    weekday: np.ndarray
+    week_start: np.ndarray
+    month: np.ndarray
+    day_of_month: np.ndarray
+    month_length: np.ndarray
+
+@lru_cache(maxsize=64)
+def _calendar(start: date, end: date) -> _Calendar:
+    """Per-day calendar fields for a range, shared by every rule expanded over it"""
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+    ordinals = days.astype(np.int64)
+    weekday = (ordinals + _EPOCH_WEEKDAY) % 7
+    months = days.astype('datetime64[M]')
+    month_start = months.astype('datetime64[D]')
+    calendar = _Calendar(
+        days=days,
+        ordinals=ordinals,
+        weekday=weekday,
+        week_start=ordinals - weekday,
+        month=months.astype(np.int64),
+        day_of_month=(days - month_start).astype(np.int64) + 1,
+        month_length=((months + 1).astype('datetime64[D]') - month_start).astype(np.int64)
+    )
+    for array in calendar:
+        array.flags.writeable = False
+    return calendar
+
+@dataclass(frozen=True)
+class RecurrenceRule:
+    """A routine's recurrence compiled once and expanded over date ranges.
+
+    `anchor` is the reference date for the interval phase, and for the
+    default weekday (weekly) or day of month (monthly). Negative month days
+    count back from the end of the month, so -1 is always the last day.
+    """
+    freq: str
+    anchor: date
+    interval: int = 1
+    weekdays: FrozenSet[int] = frozenset()  # 0 = Monday
+    month_days: FrozenSet[int] = frozenset()
+    exclusions: FrozenSet[date] = frozenset()
+    start: Optional[date] = None
+    end: Optional[date] = None
+
+    def expand(self, start: date, end: date) -> np.ndarray:
+        """All matching dates in [start, end] as a datetime64[D] array"""
+        calendar = _calendar(start, end)
+        ordinals = calendar.ordinals
+        weekday = calendar.weekday
+        anchor = np.datetime64(self.anchor, 'D').astype(np.int64)
+        mask = np.ones(len(ordinals), dtype=bool)
+
+        if self.start:
+            mask &= ordinals >= np.datetime64(self.start, 'D').astype(np.int64)
+        if self.end:
+            mask &= ordinals <= np.datetime64(self.end, 'D').astype(np.int64)
+
+        if self.freq == 'DAILY':
+            if self.interval > 1:
+                mask &= (ordinals - anchor) % self.interval == 0
+            if self.weekdays:
+                mask &= np.isin(weekday, list(self.weekdays))
+        elif self.freq == 'WEEKLY':
+            mask &= np.isin(weekday, list(self.weekdays or {self.anchor.weekday()}))
+            if self.interval > 1:
+                anchor_week_start = anchor - self.anchor.weekday()
+                mask &= ((calendar.week_start - anchor_week_start) // 7) % self.interval == 0
+        elif self.freq == 'MONTHLY':
+            day_mask = np.zeros(len(ordinals), dtype=bool)
+            for month_day in (self.month_days or {self.anchor.day}):
+                if month_day > 0:
+                    day_mask |= calendar.day_of_month == month_day
+                else:
+                    day_mask |= calendar.day_of_month == calendar.month_length + month_day + 1
+            mask &= day_mask
+
+            if self.interval > 1:
+                anchor_month = np.datetime64(self.anchor, 'M').astype(np.int64)
+                mask &= (calendar.month - anchor_month) % self.interval == 0
+            if self.weekdays:
+                mask &= np.isin(weekday, list(self.weekdays))
+
+        if self.exclusions:
+            mask &= ~np.isin(calendar.days, np.array(sorted(self.exclusions), dtype='datetime64[D]'))
+
+        return calendar.days[mask]
+
+    def dates(self, start: date, end: date) -> List[date]:
+        """All matching dates in [start, end] as date objects"""
+        return self.expand(start, end).astype(object).tolist()
+
+    def matches(self, day: date) -> bool:
+        return len(self.expand(day, day)) > 0
+
+def parse_frequency(frequency: str) -> Dict:
+    """Parse a legacy frequency keyword or an RRULE-style string.
+
+    Supported RRULE parts are FREQ, INTERVAL, BYDAY, BYMONTHDAY and EXDATE,
+    e.g. "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH" or "FREQ=MONTHLY;BYMONTHDAY=-1".
+    """
+    if frequency in LEGACY_FREQUENCIES:
+        return {'freq': LEGACY_FREQUENCIES[frequency]}
+
+    rule = frequency[len('RRULE:'):] if frequency.upper().startswith('RRULE:') else frequency
+    parts = {}
+    for part in filter(None, rule.split(';')):
+        key, separator, value = part.partition('=')
+        if not separator or not value:
+            raise ValueError(f"Invalid recurrence part: {part}")
+        parts[key.strip().upper()] = value.strip()
+
+    freq = parts.pop('FREQ', '').upper()
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Unsupported recurrence frequency: {freq or 'missing'}")
+    parsed = {'freq': freq}
+
+    if 'INTERVAL' in parts:
+        interval = int(parts.pop('INTERVAL'))
+        if interval < 1:
+            raise ValueError("Recurrence interval must be positive")
+        parsed['interval'] = interval
+
+    if 'BYDAY' in parts:
+        codes = [code.strip().upper() for code in parts.pop('BYDAY').split(',')]
+        unknown = [code for code in codes if code not in WEEKDAY_CODES]
+        if unknown:
+            raise ValueError(f"Invalid weekday codes: {', '.join(unknown)}")
+        parsed['weekdays'] = frozenset(WEEKDAY_CODES.index(code) for code in codes)
+
+    if 'BYMONTHDAY' in parts:
+        month_days = frozenset(int(day) for day in parts.pop('BYMONTHDAY').split(','))
+        if any(day == 0 or not -31 <= day <= 31 for day in month_days):
+            raise ValueError("Month days must be between 1 and 31 or -31 and -1")
+        parsed['month_days'] = month_days
+
+    if 'EXDATE' in parts:
+        parsed['exclusions'] = frozenset(
+            datetime.strptime(value.strip(), '%Y%m%d').date()
+            for value in parts.pop('EXDATE').split(',')
+        )
+
+    if parts:
+        raise ValueError(f"Unsupported recurrence parts: {', '.join(parts)}")
+    return parsed
+
+@lru_cache(maxsize=4096)
+def _compile(frequency: str, anchor: date, start: Optional[date], end: Optional[date]) -> RecurrenceRule:
+    return RecurrenceRule(anchor=anchor, start=start, end=end, **parse_frequency(frequency))
+
+def compile_rule(routine: Routine) -> Optional[RecurrenceRule]:
+    """Compile a routine's recurrence, or None if it does not recur"""
+    if not routine.is_recurring or not routine.frequency:
+        return None
+
+    # Convert datetime fields to date for comparison
+    start_date = routine.start_date.date() if routine.start_date else None
+    end_date = routine.end_date.date() if routine.end_date else None
+    anchor = start_date or routine.created_at.date()
+
+    try:
+        return _compile(routine.frequency, anchor, start_date, end_date)
+    except ValueError:
+        return None
@@ -1,56 +1,88 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session, selectinload
+from fastapi import APIRouter, Body, Depends, HTTPException, Path, Request, Response, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import noload, selectinload
 from typing import List, Optional
 from uuid import UUID
-from datetime import datetime, timezone, timedelta, date
-import json
+from datetime import datetime, timedelta, date
 
-from ..database import get_db
-from ..models import Routine, RoutineInstance, TaskInstance, User
+from ..conditional import not_modified
+from ..config import settings
+from ..database import AsyncSessionLocal, get_db
+from ..db_metrics import db_caller
+from ..models import DailySummary, Routine, RoutineInstance, TaskInstance, XpEvent
+from ..serialization import jsonb_ready
 from ..schemas import (
     RoutineCreate, Routine as RoutineSchema,
     RoutineWithInstances, RoutineInstanceWithTasks,
-    RoutineInstanceRead
+    RoutineInstanceRead, DailySummaryRead,
+    TaskProgressUpdate, TaskProgressResult
 )
+from ..auth.cache import Principal
 from ..auth.utils import get_current_user
+from ..pagination import PageParams, fetch_rows, keyset, page_response, parse_fields, select_columns
 from .instance_generator import RoutineInstanceGenerator
-from . import jobs
-from ..utils.json_encoder import CustomJSONEncoder
+from .partitions import instances_due_between
+from .progress import apply_task_progress
+from .purge import purge_future_instances
+from .recurrence import compile_rule
+from .summary import month_days, summaries_for_days
+from .validators import instances_etag, routines_etag
 
 router = APIRouter(prefix="/routines", tags=["Routines"])
 
+def _routine_values(routine_data: RoutineCreate) -> dict:
+    """Column values of a routine, with the queue converted to JSONB-ready data"""
+    return {**routine_data.model_dump(exclude={'queue'}), 'queue': jsonb_ready(routine_data.queue)}
+
 @router.post("/", response_model=RoutineSchema, status_code=status.HTTP_201_CREATED)
 async def create_routine(
     routine_data: RoutineCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    routine_dict = json.loads(json.dumps(routine_data.dict(), cls=CustomJSONEncoder))
+    routine_dict = _routine_values(routine_data)
     routine_dict['user_id'] = current_user.id
     
     db_routine = Routine(**routine_dict)
     db.add(db_routine)
-    db.commit()
-    db.refresh(db_routine)
+    await db.commit()
+    await db.refresh(db_routine)
     return db_routine
 
 @router.get("/", response_model=List[RoutineSchema])
 async def get_routines(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    return db.query(Routine).filter(Routine.user_id == current_user.id).all()
+    """List routines; pass e.g. fields=id,name,frequency to skip the queue.
+
+    Honours If-None-Match with a 304 when none of the user's routines changed.
+    """
+    unchanged = not_modified(request, response, await routines_etag(db, current_user.id, request))
+    if unchanged:
+        return unchanged
+    fields = parse_fields(page.fields, RoutineSchema)
+    query = select_columns(Routine, fields, 'created_at').where(Routine.user_id == current_user.id)
+    rows = await fetch_rows(db, keyset(query, Routine.created_at, Routine.id, page), fields)
+    return page_response(rows, page, response, 'created_at', fields)
 
 @router.get("/{routine_id}", response_model=RoutineWithInstances)
 async def get_routine(
     routine_id: UUID,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    routine = db.query(Routine).filter(
+    routine = await db.scalar(select(Routine).options(
+        selectinload(Routine.instances)
+    ).where(
         Routine.id == routine_id,
         Routine.user_id == current_user.id
-    ).first()
+    ))
     
     if not routine:
         raise HTTPException(
@@ -59,17 +91,52 @@ async def get_routine(
         )
     return routine
 
+@router.get("/{routine_id}/occurrences/{start_date}/{end_date}", response_model=List[date])
+async def get_routine_occurrences(
+    routine_id: UUID,
+    start_date: date,
+    end_date: date,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Forecast the dates a routine recurs on within a date range"""
+    if end_date < start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="End date must be after start date"
+        )
+    # Expansion allocates, and caches, arrays the length of the range
+    if (end_date - start_date).days + 1 > settings.OCCURRENCE_MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Date range must not exceed {settings.OCCURRENCE_MAX_RANGE_DAYS} days"
+        )
+
+    routine = await db.scalar(select(Routine).where(
+        Routine.id == routine_id,
+        Routine.user_id == current_user.id
+    ))
+    
+    if not routine:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Routine not found"
+        )
+
+    rule = compile_rule(routine)
+    return rule.dates(start_date, end_date) if rule else []
+
 @router.put("/{routine_id}", response_model=RoutineSchema)
 async def update_routine(
     routine_id: UUID,
     routine_data: RoutineCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    db_routine = db.query(Routine).filter(
+    db_routine = await db.scalar(select(Routine).where(
         Routine.id == routine_id,
         Routine.user_id == current_user.id
-    ).first()
+    ))
     
     if not db_routine:
         raise HTTPException(
@@ -77,24 +144,23 @@ async def update_routine(
             detail="Routine not found"
         )
     
-    update_data = json.loads(json.dumps(routine_data.dict(), cls=CustomJSONEncoder))
-    for key, value in update_data.items():
+    for key, value in _routine_values(routine_data).items():
         setattr(db_routine, key, value)
     
-    db.commit()
-    db.refresh(db_routine)
+    await db.commit()
+    await db.refresh(db_routine)
     return db_routine
 
 @router.delete("/{routine_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_routine(
     routine_id: UUID,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    routine = db.query(Routine).filter(
+    routine = await db.scalar(select(Routine).where(
         Routine.id == routine_id,
         Routine.user_id == current_user.id
-    ).first()
+    ))
     
     if not routine:
         raise HTTPException(
@@ -102,38 +168,44 @@ async def delete_routine(
             detail="Routine not found"
         )
     
-    db.delete(routine)
-    db.commit()
+    # XP events have no foreign key to cascade from, as task_instances is partitioned
+    await db.execute(delete(XpEvent).where(XpEvent.task_instance_id.in_(
+        select(TaskInstance.id).join(RoutineInstance).where(RoutineInstance.routine_id == routine.id)
+    )))
+    await db.delete(routine)
+    await db.commit()
     return None
 
 @router.post("/generate-instances")
 async def generate_instances(
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+    days: int = Query(
+        settings.GENERATION_DEFAULT_HORIZON_DAYS,
+        ge=1,
+        le=settings.GENERATION_MAX_HORIZON_DAYS
+    ),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Generate instances for a week"""
-    generator = RoutineInstanceGenerator(db)
+    """Generate instances for today and the following days of the horizon"""
+    # Expand every routine over the whole horizon in one pass
+    today = datetime.now().date()
+    horizon_end = today + timedelta(days=days - 1)
+    daily_stats = await db.run_sync(
+        lambda session: RoutineInstanceGenerator(session).generate_instances_for_range(
+            [current_user.id], today, horizon_end
+        )
+    )
+    
     stats = {
-        'today': {'created': 0, 'skipped': 0},
+        'today': daily_stats[today],
         'week': {'created': 0, 'skipped': 0}
     }
-    
-    # Generate for today
-    today = datetime.now().date()
-    today_stats = generator.generate_instances_for_user(current_user.id, today)
-    stats['today'] = today_stats
-    
-    # Generate for next 6 days
-    for i in range(1, 7):
-        next_day = today + timedelta(days=i)
-        day_stats = generator.generate_instances_for_user(current_user.id, next_day)
+    for day, day_stats in daily_stats.items():
+        if day == today:
+            continue
         stats['week']['created'] += day_stats['created']
         stats['week']['skipped'] += day_stats['skipped']
     
-    # Schedule next automatic generation
-    jobs.schedule_instance_generation(background_tasks)
-    
     return {
         "message": "Instances generated successfully",
         "statistics": {
@@ -144,34 +216,59 @@ async def generate_instances(
             },
             "week": {
                 "start_date": (today + timedelta(days=1)).isoformat(),
-                "end_date": (today + timedelta(days=6)).isoformat(),
+                "end_date": horizon_end.isoformat(),
+                "days": days - 1,
                 "instances_created": stats['week']['created'],
                 "instances_skipped": stats['week']['skipped']
             }
         }
     }
 
+@router.get("/calendar/{year}/{month}", response_model=List[DailySummaryRead])
+async def get_calendar_month(
+    year: int = Path(..., ge=1, le=9999),
+    month: int = Path(..., ge=1, le=12),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Task counts, progress and XP for every day of a month, read from the daily summaries"""
+    days = month_days(year, month)
+    summaries = (await db.scalars(select(DailySummary).where(
+        DailySummary.user_id == current_user.id,
+        DailySummary.day.between(days[0], days[-1])
+    ))).all()
+    return summaries_for_days(summaries, days)
+
 @router.get("/instances/{date}", response_model=List[RoutineInstanceRead])
 async def get_instances_for_date(
     date: date,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
+    """Routine instances due on a date; honours If-None-Match with a 304 when none changed"""
     target_datetime = datetime.combine(date, datetime.min.time())
     next_datetime = datetime.combine(date + timedelta(days=1), datetime.min.time())
+    unchanged = not_modified(
+        request, response, await instances_etag(db, current_user.id, target_datetime, next_datetime, request)
+    )
+    if unchanged:
+        return unchanged
 
-    instances = db.query(RoutineInstance).join(
+    instances = (await db.scalars(select(RoutineInstance).join(
         Routine
     ).options(
         selectinload(RoutineInstance.task_instances),
-        selectinload(RoutineInstance.routine)
-    ).filter(
+        selectinload(RoutineInstance.routine),
+        *instances_due_between(target_datetime, next_datetime)
+    ).where(
         Routine.user_id == current_user.id,
         RoutineInstance.due_date >= target_datetime,
         RoutineInstance.due_date < next_datetime
     ).order_by(
         RoutineInstance.due_date
-    ).all()
+    ))).all()
     
     return instances
 
@@ -179,110 +276,144 @@ async def get_instances_for_date(
 async def get_instances_for_date_range(
     start_date: date,
     end_date: date,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Get all routine instances within a date range"""
+    """Get all routine instances within a date range, optionally paginated; honours If-None-Match"""
     start_datetime = datetime.combine(start_date, datetime.min.time())
     end_datetime = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+    unchanged = not_modified(
+        request, response, await instances_etag(db, current_user.id, start_datetime, end_datetime, request)
+    )
+    if unchanged:
+        return unchanged
+    fields = parse_fields(page.fields, RoutineInstanceRead)
+
+    # Only the routine name is needed, and tasks only when they are returned
+    options = [
+        selectinload(RoutineInstance.task_instances)
+        if fields is None or 'tasks' in fields else noload(RoutineInstance.task_instances),
+        selectinload(RoutineInstance.routine).load_only(Routine.name)
+        if fields is None or 'routine_name' in fields else noload(RoutineInstance.routine),
+        *instances_due_between(start_datetime, end_datetime)
+    ]
+    query = select(RoutineInstance).join(
+        Routine
+    ).options(*options).where(
+        Routine.user_id == current_user.id,
+        RoutineInstance.due_date >= start_datetime,
+        RoutineInstance.due_date < end_datetime
+    )
+
+    instances = (await db.scalars(
+        keyset(query, RoutineInstance.due_date, RoutineInstance.id, page)
+    )).all()
+    return page_response(instances, page, response, 'due_date', fields, RoutineInstanceRead)
+
+@router.get("/instances/export/{start_date}/{end_date}", response_class=StreamingResponse)
+async def export_instances(
+    start_date: date,
+    end_date: date,
+    current_user: Principal = Depends(get_current_user)
+):
+    """Stream instances with their tasks as NDJSON, one instance per line.
 
-    instances = db.query(RoutineInstance).join(
+    Rows are read through a server-side cursor in batches of
+    EXPORT_BATCH_SIZE on a session owned by the stream. Serialized batches
+    are released from the session's weak identity map, so memory stays flat
+    however long the range is.
+    """
+    start_datetime = datetime.combine(start_date, datetime.min.time())
+    end_datetime = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+    query = select(RoutineInstance).join(
         Routine
     ).options(
         selectinload(RoutineInstance.task_instances),
-        selectinload(RoutineInstance.routine)
-    ).filter(
+        selectinload(RoutineInstance.routine).load_only(Routine.name),
+        *instances_due_between(start_datetime, end_datetime)
+    ).where(
         Routine.user_id == current_user.id,
         RoutineInstance.due_date >= start_datetime,
         RoutineInstance.due_date < end_datetime
     ).order_by(
-        RoutineInstance.due_date
-    ).all()
-    
-    return instances
+        RoutineInstance.due_date, RoutineInstance.id
+    ).execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+
+    async def lines():
+        db_caller.set("GET /routines/instances/export")
+        async with AsyncSessionLocal() as db:
+            async for partition in (await db.stream_scalars(query)).partitions():
+                yield "".join(
+                    RoutineInstanceRead.model_validate(instance).model_dump_json(by_alias=True) + "\n"
+                    for instance in partition
+                )
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.put("/instances/tasks", response_model=List[TaskProgressResult])
+async def update_task_instances(
+    updates: List[TaskProgressUpdate] = Body(..., min_length=1, max_length=settings.TASK_PROGRESS_BATCH_MAX),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Update the progress of many task instances in one transaction.
+
+    Items that do not exist or belong to another user are reported as not
+    updated; the others are applied. A task listed twice gets its last value.
+    """
+    found = await db.run_sync(
+        apply_task_progress, current_user.id, {(item.instance_id, item.task_id): item.progress for item in updates}
+    )
+    await db.commit()
+    return [
+        TaskProgressResult(
+            instance_id=item.instance_id,
+            task_id=item.task_id,
+            updated=(item.instance_id, item.task_id) in found
+        )
+        for item in updates
+    ]
 
 @router.put("/instances/{instance_id}/tasks/{task_id}")
 async def update_task_instance(
     instance_id: UUID,
     task_id: str,
     progress: int,
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """Update a task instance's progress"""
-    task_instance = db.query(TaskInstance).join(
-        RoutineInstance
-    ).filter(
-        TaskInstance.routine_instance_id == instance_id,
-        TaskInstance.task_id == task_id
-    ).first()
-    
-    if not task_instance:
+    found = await db.run_sync(apply_task_progress, current_user.id, {(instance_id, task_id): progress})
+    if not found:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Task instance not found"
         )
     
-    task_instance.progress = progress
-    if progress >= 100:
-        task_instance.status = 'completed'
-        task_instance.completion_date = datetime.now(timezone.utc)
-    
-    db.commit()
+    await db.commit()
     return {"message": "Task instance updated successfully"}
 
 @router.delete("/instances/future")
 async def delete_future_instances(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Delete future instances and pending tasks for today"""
-    today = datetime.now().date()
-    today_start = datetime.combine(today, datetime.min.time())
-    today_end = datetime.combine(today, datetime.max.time())
+    """Delete future instances and pending tasks for today.
 
-    # Get IDs of routine instances for today
-    today_instance_ids = [
-        id[0] for id in db.query(RoutineInstance.id).filter(
-            RoutineInstance.due_date.between(today_start, today_end)
-        ).all()
-    ]
-
-    # Delete pending tasks for today
-    if today_instance_ids:
-        today_pending = db.query(TaskInstance).filter(
-            TaskInstance.routine_instance_id.in_(today_instance_ids),
-            TaskInstance.status == 'pending'
-        )
-        pending_count = today_pending.count()
-        today_pending.delete(synchronize_session=False)
-    else:
-        pending_count = 0
-
-    # Delete future instances
-    future_instances = db.query(RoutineInstance).filter(
-        RoutineInstance.due_date > today_end
+    Instances are deleted in chunks of PURGE_BATCH_SIZE, each in its own
+    transaction, so a long purge never holds locks on all of them at once.
+    """
+    totals = await db.run_sync(
+        purge_future_instances, current_user.id, datetime.now().date(), settings.PURGE_BATCH_SIZE
     )
-    future_count = future_instances.count()
-    
-    # Delete associated task instances first
-    if future_count > 0:
-        future_instance_ids = [
-            id[0] for id in future_instances.with_entities(RoutineInstance.id).all()
-        ]
-        db.query(TaskInstance).filter(
-            TaskInstance.routine_instance_id.in_(future_instance_ids)
-        ).delete(synchronize_session=False)
-        
-        # Then delete the instances
-        future_instances.delete(synchronize_session=False)
-
-    db.commit()
-
     return {
         "message": "Instances deleted successfully",
         "deleted": {
-            "future_instances": future_count,
-            "pending_tasks": pending_count
-        }
-    } 
\ No newline at end of file
+            "future_instances": totals['future_instances'],
+            "pending_tasks": totals['pending_tasks']
+        },
+        "batches": totals['batches']
+    }
@@ -0,0 +1,127 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import Date, case, delete, distinct, func, select, tuple_
+from sqlalchemy.orm import Session
+
+from ..areas.xp import DIFFICULTY_XP
+from ..database import dialect_insert, insert_missing, upsert
+from ..models import DailySummary, Routine, RoutineInstance, TaskInstance
+
+SUMMARY_COLUMNS = ('instances', 'tasks_total', 'tasks_completed', 'tasks_pending', 'progress_total', 'xp_earned')
+
+def _summary_query():
+    """Per (user, day) aggregates over routine instances and their tasks"""
+    day = func.date(RoutineInstance.due_date, type_=Date)
+    completed = TaskInstance.status == 'completed'
+    xp = case(DIFFICULTY_XP, value=TaskInstance.difficulty, else_=DIFFICULTY_XP['MEDIUM'])
+    return select(
+        Routine.user_id,
+        day.label('day'),
+        func.count(distinct(RoutineInstance.id)).label('instances'),
+        func.count(TaskInstance.id).label('tasks_total'),
+        func.coalesce(func.sum(case((completed, 1), else_=0)), 0).label('tasks_completed'),
+        func.coalesce(func.sum(case((TaskInstance.status == 'pending', 1), else_=0)), 0).label('tasks_pending'),
+        func.coalesce(func.sum(TaskInstance.progress), 0).label('progress_total'),
+        func.coalesce(func.sum(case((completed, xp), else_=0)), 0).label('xp_earned')
+    ).select_from(RoutineInstance).join(
+        Routine
+    ).outerjoin(
+        TaskInstance
+    ).group_by(Routine.user_id, day)
+
+def _lock_summaries(db: Session, keys: List[Tuple[UUID, date]]) -> None:
+    """Row-lock the summaries of sorted (user, day) keys, creating the missing ones first.
+
+    A concurrent refresh of the same day then waits for this transaction to
+    commit, and its recompute, a later statement under READ COMMITTED, sees
+    this transaction's changes instead of overwriting them with stale counts.
+    """
+    insert_missing(db, DailySummary, [{'user_id': user_id, 'day': day} for user_id, day in keys], ('user_id', 'day'))
+    db.execute(
+        select(DailySummary.user_id)
+        .where(tuple_(DailySummary.user_id, DailySummary.day).in_(keys))
+        .order_by(DailySummary.user_id, DailySummary.day)
+        .with_for_update()
+    )
+
+def refresh_daily_summaries(db: Session, user_days: Iterable[Tuple[UUID, date]]) -> None:
+    """Recompute the summaries of the given (user, day) pairs from their task instances.
+
+    Called in the same transaction as the change, after it is flushed. The
+    summary rows are locked before the recompute, so concurrent refreshes of
+    a day apply one after the other. Days left with no instances lose their
+    summary row.
+    """
+    days_by_user: Dict[UUID, Set[date]] = defaultdict(set)
+    for user_id, day in user_days:
+        days_by_user[user_id].add(day)
+    if not days_by_user:
+        return
+    db.flush()
+    _lock_summaries(db, sorted((user_id, day) for user_id, days in days_by_user.items() for day in days))
+
+    rows = []
+    stale = []
+    for user_id, days in days_by_user.items():
+        start = datetime.combine(min(days), datetime.min.time())
+        end = datetime.combine(max(days) + timedelta(days=1), datetime.min.time())
+        computed = {
+            row.day: row._asdict()
+            for row in db.execute(_summary_query().where(
+                Routine.user_id == user_id,
+                RoutineInstance.due_date >= start,
+                RoutineInstance.due_date < end
+            ))
+        }
+        rows.extend(computed[day] for day in days if day in computed)
+        stale.extend((user_id, day) for day in days if day not in computed)
+
+    upsert(db, DailySummary, rows, ('user_id', 'day'), SUMMARY_COLUMNS)
+    if stale:
+        db.execute(delete(DailySummary).where(tuple_(DailySummary.user_id, DailySummary.day).in_(stale)))
+
+def rebuild_daily_summaries(
+    db: Session,
+    user_ids: Optional[List[UUID]] = None,
+    since: Optional[datetime] = None
+) -> int:
+    """Recompute summaries from scratch, for some users or everyone, and commit.
+
+    A single INSERT ... SELECT, so the aggregates never leave the database.
+    With since, days before it are left as they are, as their instances may
+    have been archived. Returns the number of summary rows written.
+    """
+    query = _summary_query()
+    clear = delete(DailySummary)
+    if user_ids is not None:
+        query = query.where(Routine.user_id.in_(user_ids))
+        clear = clear.where(DailySummary.user_id.in_(user_ids))
+    if since is not None:
+        query = query.where(RoutineInstance.due_date >= since)
+        clear = clear.where(DailySummary.day >= since.date())
+
+    db.execute(clear)
+    # A refresh may recreate a row between the DELETE and the INSERT
+    statement = dialect_insert(db, DailySummary)
+    written = db.execute(statement.from_select(['user_id', 'day', *SUMMARY_COLUMNS], query).on_conflict_do_update(
+        index_elements=['user_id', 'day'],
+        set_={**{column: statement.excluded[column] for column in SUMMARY_COLUMNS}, 'updated_at': func.now()}
+    )).rowcount
+    db.commit()
+    return written
+
+def month_days(year: int, month: int) -> List[date]:
+    first = date(year, month, 1)
+    following = date(year + month // 12, month % 12 + 1, 1)
+    return [first + timedelta(days=offset) for offset in range((following - first).days)]
+
+def summaries_for_days(summaries: Iterable[DailySummary], days: List[date]) -> List[dict]:
+    """One entry per day, with zero counts for days without a summary row"""
+    by_day = {summary.day: summary for summary in summaries}
+    return [
+        {'day': day, **{column: getattr(by_day[day], column) if day in by_day else 0 for column in SUMMARY_COLUMNS}}
+        for day in days
+    ]
@@ -0,0 +1,40 @@
+from datetime import datetime
+from uuid import UUID
+
+from fastapi import Request
+from sqlalchemy import distinct, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..conditional import entity_tag
+from ..models import Routine, RoutineInstance, TaskInstance
+from .partitions import instances_due_between
+
+async def routines_etag(db: AsyncSession, user_id: UUID, request: Request) -> str:
+    """ETag of a user's routine list: their routine count and latest updated_at"""
+    count, updated_at = (await db.execute(
+        select(func.count(Routine.id), func.max(Routine.updated_at)).where(Routine.user_id == user_id)
+    )).one()
+    return entity_tag(user_id, request.url.query, count, updated_at)
+
+async def instances_etag(db: AsyncSession, user_id: UUID, start: datetime, end: datetime, request: Request) -> str:
+    """ETag of a user's routine instances due in [start, end), with their tasks and routine names.
+
+    One aggregate over the same index range the read uses. The progress
+    total catches task updates that land within one timestamp tick. The
+    task join carries the range too, so only its partitions are planned.
+    """
+    row = (await db.execute(
+        select(
+            func.count(distinct(RoutineInstance.id)),
+            func.max(RoutineInstance.updated_at),
+            func.count(TaskInstance.id),
+            func.max(TaskInstance.updated_at),
+            func.sum(TaskInstance.progress),
+            func.max(Routine.updated_at)
+        ).select_from(RoutineInstance).join(Routine).outerjoin(TaskInstance).where(
+            Routine.user_id == user_id,
+            RoutineInstance.due_date >= start,
+            RoutineInstance.due_date < end
+        ).options(*instances_due_between(start, end))
+    )).one()
+    return entity_tag(user_id, request.url.query, *row)
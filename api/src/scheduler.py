@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .database import SessionLocal
+from .db_metrics import db_caller
+from .models import ScheduledJob
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class JobDefinition:
+    """A job that runs either daily at a fixed local time or at a fixed interval"""
+    name: str
+    func: Callable[[datetime], Any]
+    daily_at: Optional[time] = None
+    every: Optional[timedelta] = None
+
+    @property
+    def schedule(self) -> str:
+        if self.daily_at is not None:
+            return f"daily@{self.daily_at.strftime('%H:%M')}"
+        return f"every:{int(self.every.total_seconds())}s"
+
+    def due_runs(self, last_run_at: Optional[datetime], now: datetime) -> List[datetime]:
+        """Scheduled times that have passed since the last completed run"""
+        if self.every is not None:
+            # Interval jobs coalesce missed runs into a single one
+            if last_run_at is None or now - last_run_at >= self.every:
+                return [now]
+            return []
+
+        latest = datetime.combine(now.date(), self.daily_at, tzinfo=now.tzinfo)
+        if latest > now:
+            latest -= timedelta(days=1)
+        if last_run_at is None:
+            return [latest]
+
+        runs = []
+        scheduled_for = latest
+        while scheduled_for > last_run_at and len(runs) < settings.SCHEDULER_MAX_CATCH_UP_RUNS:
+            runs.append(scheduled_for)
+            scheduled_for -= timedelta(days=1)
+        return list(reversed(runs))
+
+class JobScheduler:
+    """In-process asyncio scheduler backed by the scheduled_jobs table.
+
+    Last-run watermarks live in the database so missed runs are caught up
+    after a restart, and a lease on the job row makes sure only one worker
+    process runs a given job at a time. The lease is short and renewed by a
+    heartbeat while the job runs, so a crashed worker's jobs are picked up
+    soon after. A failed run is retried with exponential backoff.
+
+    Each job runs in its own task on a thread of the scheduler's own pool,
+    so a long job does not hold up the others, and a job is not started
+    again while its previous run is still in flight.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self.session_factory = session_factory
+        self.jobs: Dict[str, JobDefinition] = {}
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._task: Optional[asyncio.Task] = None
+        self._running: Dict[str, asyncio.Task] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def register(
+        self,
+        name: str,
+        func: Callable[[datetime], Any],
+        daily_at: Optional[time] = None,
+        every: Optional[timedelta] = None
+    ) -> None:
+        if (daily_at is None) == (every is None):
+            raise ValueError("A job needs exactly one of daily_at or every")
+        self.jobs[name] = JobDefinition(name=name, func=func, daily_at=daily_at, every=every)
+
+    async def start(self) -> None:
+        await asyncio.to_thread(self._sync_definitions)
+        # One thread per job, so long jobs never wait on a worker thread
+        self._executor = ThreadPoolExecutor(max_workers=max(len(self.jobs), 1), thread_name_prefix="scheduler")
+        self._task = asyncio.create_task(self._run())
+        logger.info("Scheduler started as %s with jobs: %s", self.worker_id, ", ".join(self.jobs))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        # Runs already on a thread finish there; their leases are released when they do
+        running = list(self._running.values())
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        self._running.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def _run(self) -> None:
+        while True:
+            for job in list(self.jobs.values()):
+                running = self._running.get(job.name)
+                if running is not None and not running.done():
+                    continue
+                self._running[job.name] = asyncio.create_task(self._run_job(job), name=f"job:{job.name}")
+            await asyncio.sleep(settings.SCHEDULER_POLL_SECONDS)
+
+    async def _run_job(self, job: JobDefinition) -> None:
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._run_if_due, job)
+        except Exception:
+            logger.exception("Scheduled job %s failed", job.name)
+
+    def _sync_definitions(self) -> None:
+        """Store job definitions, keeping existing watermarks"""
+        db = self.session_factory()
+        try:
+            for job in self.jobs.values():
+                row = db.get(ScheduledJob, job.name)
+                if row is None:
+                    db.add(ScheduledJob(name=job.name, schedule=job.schedule))
+                elif row.schedule != job.schedule:
+                    row.schedule = job.schedule
+            db.commit()
+        finally:
+            db.close()
+
+    def _run_if_due(self, job: JobDefinition) -> None:
+        db_caller.set(f"job:{job.name}")
+        db = self.session_factory()
+        try:
+            now = datetime.now().astimezone()
+            row = db.get(ScheduledJob, job.name)
+            if row.retry_at is not None and row.retry_at > now:
+                return
+            if not job.due_runs(row.last_run_at, now) or not self._acquire(db, job, now):
+                return
+
+            stop_heartbeat = threading.Event()
+            heartbeat = threading.Thread(
+                target=self._heartbeat, args=(job, stop_heartbeat), name=f"heartbeat:{job.name}", daemon=True
+            )
+            heartbeat.start()
+            try:
+                # Re-read the watermark now that we hold the lease
+                db.refresh(row)
+                for scheduled_for in job.due_runs(row.last_run_at, now):
+                    logger.info("Running job %s scheduled for %s", job.name, scheduled_for.isoformat())
+                    try:
+                        result = job.func(scheduled_for)
+                    except Exception as exc:
+                        self._record_failure(db, job, exc)
+                        raise
+                    logger.info("Job %s finished: %s", job.name, result)
+
+                    # Advance the watermark after every run
+                    row.last_run_at = scheduled_for
+                    row.failures = 0
+                    row.last_error = None
+                    row.retry_at = None
+                    db.commit()
+            finally:
+                stop_heartbeat.set()
+                heartbeat.join()
+                self._release(db, job)
+        finally:
+            db.close()
+
+    def _heartbeat(self, job: JobDefinition, stop: threading.Event) -> None:
+        """Renew the lease on a job row until the run ends"""
+        while not stop.wait(settings.SCHEDULER_HEARTBEAT_SECONDS):
+            db = self.session_factory()
+            try:
+                db.execute(
+                    update(ScheduledJob).where(
+                        ScheduledJob.name == job.name,
+                        ScheduledJob.locked_by == self.worker_id
+                    ).values(
+                        locked_until=datetime.now().astimezone() + timedelta(seconds=settings.SCHEDULER_LOCK_SECONDS)
+                    )
+                )
+                db.commit()
+            except Exception:
+                logger.exception("Could not renew the lease on job %s", job.name)
+            finally:
+                db.close()
+
+    def _record_failure(self, db: Session, job: JobDefinition, exc: Exception) -> None:
+        """Count a failed run and hold off the next attempt, doubling the delay per failure"""
+        db.rollback()
+        row = db.get(ScheduledJob, job.name)
+        delay = min(
+            settings.SCHEDULER_RETRY_SECONDS * 2 ** min(row.failures, 16),
+            settings.SCHEDULER_MAX_RETRY_SECONDS
+        )
+        row.failures += 1
+        row.last_error = f"{type(exc).__name__}: {exc}"
+        row.retry_at = datetime.now().astimezone() + timedelta(seconds=delay)
+        db.commit()
+        logger.warning("Job %s failed %d time(s) in a row; retrying in %ds", job.name, row.failures, delay)
+
+    def _acquire(self, db: Session, job: JobDefinition, now: datetime) -> bool:
+        """Take the lease on a job row unless another live worker holds it"""
+        result = db.execute(
+            update(ScheduledJob).where(
+                ScheduledJob.name == job.name,
+                or_(
+                    ScheduledJob.locked_until.is_(None),
+                    ScheduledJob.locked_until < now,
+                    ScheduledJob.locked_by == self.worker_id
+                )
+            ).values(
+                locked_by=self.worker_id,
+                locked_until=now + timedelta(seconds=settings.SCHEDULER_LOCK_SECONDS)
+            )
+        )
+        db.commit()
+        return result.rowcount == 1
+
+    def _release(self, db: Session, job: JobDefinition) -> None:
+        db.rollback()
+        db.execute(
+            update(ScheduledJob).where(
+                ScheduledJob.name == job.name,
+                ScheduledJob.locked_by == self.worker_id
+            ).values(locked_by=None, locked_until=None)
+        )
+        db.commit()
+
+scheduler = JobScheduler()
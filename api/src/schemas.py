@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional, List, Dict, Union, Literal
 from uuid import UUID
 from pydantic import BaseModel, EmailStr, UUID4, validator, Field
@@ -138,8 +138,13 @@ class RoutineCreate(RoutineBase):
     def validate_frequency(cls, v, values):
         if values.get('is_recurring') and not v:
             raise ValueError('Frequency is required for recurring routines')
-        if v and v not in ['daily', 'weekly', 'monthly']:
-            raise ValueError('Invalid frequency value')
+        if v:
+            # Imported here because the routines package imports these schemas
+            from .routines.recurrence import parse_frequency
+            try:
+                parse_frequency(v)
+            except ValueError as e:
+                raise ValueError(f'Invalid frequency value: {e}')
         return v
 
 class Routine(RoutineBase):
@@ -182,6 +187,16 @@ class TaskInstance(BaseModel):
     class Config:
         from_attributes = True
 
+class TaskProgressUpdate(BaseModel):
+    instance_id: UUID
+    task_id: str
+    progress: int
+
+class TaskProgressResult(BaseModel):
+    instance_id: UUID
+    task_id: str
+    updated: bool  # False when the task instance does not exist or is not the user's
+
 # Response Models
 class RoutineWithInstances(Routine):
     instances: List[RoutineInstance] = []
@@ -220,4 +235,57 @@ class RoutineInstanceRead(BaseModel):
 
     class Config:
         from_attributes = True
-        populate_by_name = True 
\ No newline at end of file
+        populate_by_name = True 
+
+class DailySummaryRead(BaseModel):
+    day: date
+    instances: int
+    tasks_total: int
+    tasks_completed: int
+    tasks_pending: int
+    progress_total: int
+    xp_earned: int
+
+    class Config:
+        from_attributes = True
+
+class UserScoreRead(BaseModel):
+    upr: float
+    area_mastery: float
+    task_complexity: float
+    consistency: float
+    diversity: float
+    consistency_modifier: float
+    tier: str
+    area_scores: Dict[str, float]
+    computed_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class LeaderboardEntryRead(BaseModel):
+    rank: int
+    user_id: UUID
+    username: str
+    score: float
+
+class LeaderboardPage(BaseModel):
+    board: str
+    size: int
+    entries: List[LeaderboardEntryRead]
+
+class LeaderboardRank(BaseModel):
+    board: str
+    size: int
+    rank: int
+    score: float
+
+class StreakRead(BaseModel):
+    area_id: Optional[UUID] = None  # None for the overall streak
+    current_streak: int
+    longest_streak: int
+    last_active_date: Optional[date] = None
+    grace_tokens: int
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,343 @@
+import io
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import Routine, RoutineInstance, TaskInstance, User
+from ..areas.xp import DIFFICULTY_XP
+
+DIFFICULTIES = tuple(DIFFICULTY_XP)
+DIFFICULTY_POINTS = np.array([DIFFICULTY_XP[difficulty] for difficulty in DIFFICULTIES], dtype=np.float64)
+
+# Global Consistency Modifier: tenure thresholds in days and the multiplier reached at each
+TENURE_DAYS = np.array([90, 180, 365, 730])
+TENURE_MODIFIERS = np.array([1.0, 1.2, 1.5, 2.0, 2.5])
+
+# Achievement tiers: upper UPR bound of each tier but the last
+TIER_BOUNDS = np.array([1000, 2500, 5000, 10000])
+TIERS = np.array(['BRONZE', 'SILVER', 'GOLD', 'PLATINUM', 'DIAMOND'])
+
+MAX_STREAK_DAYS = 90
+CONSISTENCY_HALF_LIFE_DAYS = 14
+
+_EPOCH = date(1970, 1, 1)
+
+def day_number(day: date) -> int:
+    return (day - _EPOCH).days
+
+@dataclass
+class TaskColumns:
+    """Task instance history of a set of users as parallel arrays, one entry per task instance"""
+    user_ids: List
+    user: np.ndarray        # index into user_ids
+    day: np.ndarray         # due date as days since 1970-01-01
+    completed: np.ndarray
+    difficulty: np.ndarray  # index into DIFFICULTIES
+    progress: np.ndarray
+    area: np.ndarray        # area code, -1 when the task has no area
+    task: np.ndarray        # code of the (routine, task id) pair
+    first_day: np.ndarray   # per user: the day their account was created
+    area_ids: List          # area code -> area id
+
+@dataclass
+class Scores:
+    """Metrics per user, aligned with TaskColumns.user_ids"""
+    upr: np.ndarray
+    area_mastery: np.ndarray
+    task_complexity: np.ndarray
+    consistency: np.ndarray
+    diversity: np.ndarray
+    consistency_modifier: np.ndarray
+    tier: np.ndarray
+    area_scores: List[Dict[str, float]]
+
+def _group_keys(high: np.ndarray, low: np.ndarray) -> np.ndarray:
+    """Pack two non-negative int arrays into sortable int64 keys"""
+    return (high.astype(np.int64) << 32) | low.astype(np.int64)
+
+def _distinct(keys: np.ndarray) -> np.ndarray:
+    """Sorted distinct keys; sorting beats np.unique's hash table on large int64 arrays"""
+    keys = np.sort(keys)
+    keep = np.ones(len(keys), dtype=bool)
+    keep[1:] = keys[1:] != keys[:-1]
+    return keys[keep]
+
+def _distinct_inverse(keys: np.ndarray):
+    """Sorted distinct keys and the index of each key among them, as np.unique(return_inverse=True)"""
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    starts = np.ones(len(keys), dtype=bool)
+    starts[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    inverse = np.empty(len(keys), dtype=np.int64)
+    inverse[order] = np.cumsum(starts) - 1
+    return sorted_keys[starts], inverse
+
+def _per_group(group: np.ndarray, values: np.ndarray, groups: int) -> np.ndarray:
+    return np.bincount(group, weights=values, minlength=groups)
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    return np.divide(numerator, denominator, out=np.zeros(len(numerator)), where=denominator > 0)
+
+def _unique_count(group: np.ndarray, values: np.ndarray, groups: int) -> np.ndarray:
+    """Number of distinct values per group"""
+    keys = _distinct(_group_keys(group, values))
+    return np.bincount(keys >> 32, minlength=groups).astype(np.float64)
+
+def current_streaks(group: np.ndarray, day: np.ndarray, groups: int, as_of: int) -> np.ndarray:
+    """Length of the run of consecutive active days ending today or yesterday, per group"""
+    streaks = np.zeros(groups)
+    if len(group) == 0:
+        return streaks
+
+    keys = _distinct(_group_keys(group, day))
+    key_group = keys >> 32
+    key_day = keys & 0xFFFFFFFF
+    new_run = np.ones(len(keys), dtype=bool)
+    new_run[1:] = (key_group[1:] != key_group[:-1]) | (key_day[1:] - key_day[:-1] != 1)
+    run = np.cumsum(new_run) - 1
+    run_length = np.bincount(run)
+
+    last = np.ones(len(keys), dtype=bool)
+    last[:-1] = key_group[1:] != key_group[:-1]
+    # Yesterday still counts so a streak is not lost before the day is over
+    alive = key_day[last] >= as_of - 1
+    streaks[key_group[last]] = np.where(alive, run_length[run[last]], 0)
+    return streaks
+
+def _streak_score(streaks: np.ndarray) -> np.ndarray:
+    """Logarithmic 0-100 scale reaching 100 at MAX_STREAK_DAYS"""
+    return 100 * np.log1p(np.minimum(streaks, MAX_STREAK_DAYS)) / np.log1p(MAX_STREAK_DAYS)
+
+def compute_scores(columns: TaskColumns, as_of: date) -> Scores:
+    """UPR and its components for every user, per scoring-system-specification.md.
+
+    - Area Mastery (per area, averaged): streak 40%, difficulty-weighted
+      completion rate 30%, share of the area's distinct tasks completed 20%
+      and mean progress as the quality signal 10%.
+    - Task Complexity: difficulty points of completed tasks, with the k-th
+      completion of the same task worth 1/sqrt(k) to damp repetition.
+    - Consistency: active days over the last week, weeks over the last 12
+      weeks and 30-day periods over the last 6, plus an exponentially
+      decayed activity ratio, equally weighted.
+    - Diversity: distinct tasks, areas and difficulty levels completed.
+    """
+    users = len(columns.user_ids)
+    today = day_number(as_of)
+    points = DIFFICULTY_POINTS[columns.difficulty]
+    completed = columns.completed
+
+    # Area Mastery Score, computed per (user, area) group
+    area_keys, area_group = _distinct_inverse(_group_keys(columns.user, columns.area + 1))
+    area_groups = len(area_keys)
+    area_user = (area_keys >> 32).astype(np.int64)
+    area_code = (area_keys & 0xFFFFFFFF).astype(np.int64) - 1
+
+    area_streak = _streak_score(current_streaks(area_group[completed], columns.day[completed], area_groups, today))
+    area_completion = 100 * _ratio(
+        _per_group(area_group, points * completed, area_groups),
+        _per_group(area_group, points, area_groups)
+    )
+    area_diversity = 100 * _ratio(
+        _unique_count(area_group[completed], columns.task[completed], area_groups),
+        _unique_count(area_group, columns.task, area_groups)
+    )
+    area_quality = _ratio(
+        _per_group(area_group, np.minimum(columns.progress, 100), area_groups),
+        np.bincount(area_group, minlength=area_groups).astype(np.float64)
+    )
+    area_mastery = 0.4 * area_streak + 0.3 * area_completion + 0.2 * area_diversity + 0.1 * area_quality
+    user_mastery = _ratio(
+        _per_group(area_user, area_mastery, users),
+        np.bincount(area_user, minlength=users).astype(np.float64)
+    )
+
+    # Task Complexity Matrix with diminishing returns for repeated tasks
+    done_user = columns.user[completed]
+    done_keys = _group_keys(done_user, columns.task[completed])
+    order = np.argsort(done_keys, kind='stable')
+    sorted_keys = done_keys[order]
+    starts = np.ones(len(sorted_keys), dtype=bool)
+    starts[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    start_index = np.maximum.accumulate(np.where(starts, np.arange(len(sorted_keys)), 0))
+    repetition = np.empty(len(sorted_keys))
+    repetition[order] = np.arange(len(sorted_keys)) - start_index
+    task_complexity = _per_group(done_user, points[completed] / np.sqrt(repetition + 1), users)
+
+    # Consistency Coefficient over rolling windows with decay
+    active_keys = _distinct(_group_keys(done_user, columns.day[completed]))
+    active_user = active_keys >> 32
+    age = today - (active_keys & 0xFFFFFFFF)
+    daily = np.bincount(active_user[age < 7], minlength=users) / 7
+    weekly = _unique_count(active_user[age < 84], age[age < 84] // 7, users) / 12
+    monthly = _unique_count(active_user[age < 180], age[age < 180] // 30, users) / 6
+    window = settings.SCORING_WINDOW_DAYS
+    decay = 0.5 ** (np.arange(window) / CONSISTENCY_HALF_LIFE_DAYS)
+    decayed = _per_group(active_user[age < window], decay[age[age < window]], users) / decay.sum()
+    consistency = 100 * (daily + weekly + monthly + decayed) / 4
+
+    # Diversity Multiplier
+    with_area = completed & (columns.area >= 0)
+    diversity = 100 * (
+        0.5 * np.minimum(_unique_count(done_user, columns.task[completed], users), 20) / 20
+        + 0.3 * np.minimum(_unique_count(columns.user[with_area], columns.area[with_area], users), 5) / 5
+        + 0.2 * _unique_count(done_user, columns.difficulty[completed], users) / len(DIFFICULTIES)
+    )
+
+    tenure = today - columns.first_day
+    modifier = TENURE_MODIFIERS[np.searchsorted(TENURE_DAYS, tenure, side='right')]
+    upr = (user_mastery * 0.4 + task_complexity * 0.25 + consistency * 0.2 + diversity * 0.15) * modifier
+
+    area_scores = [{} for _ in range(users)]
+    for user, code, score in zip(area_user.tolist(), area_code.tolist(), np.round(area_mastery, 2).tolist()):
+        if code >= 0:
+            area_scores[user][columns.area_ids[code]] = score
+
+    return Scores(
+        upr=upr,
+        area_mastery=user_mastery,
+        task_complexity=task_complexity,
+        consistency=consistency,
+        diversity=diversity,
+        consistency_modifier=modifier,
+        tier=TIERS[np.searchsorted(TIER_BOUNDS, upr, side='left')],
+        area_scores=area_scores
+    )
+
+# Fields of a task row as loaded for scoring, all 4-byte integers
+ROW_FIELDS = ('user', 'day', 'completed', 'difficulty', 'progress', 'task', 'area')
+
+_COPY_TASK_ROWS = """
+COPY (
+    SELECT
+        CAST(users.position - 1 AS integer),
+        CAST(task_instances.due_date AS date) - DATE '1970-01-01',
+        CAST(coalesce(task_instances.status = 'completed', false) AS integer),
+        CASE task_instances.difficulty {difficulty_codes} ELSE {default_difficulty} END,
+        coalesce(task_instances.progress, 0),
+        CAST(dense_rank() OVER (ORDER BY routine_instances.routine_id, task_instances.task_id) - 1 AS integer),
+        coalesce(areas.code, -1)
+    FROM unnest(CAST(%(user_ids)s AS uuid[])) WITH ORDINALITY AS users (user_id, position)
+    JOIN routines ON routines.user_id = users.user_id
+    JOIN routine_instances ON routine_instances.routine_id = routines.id
+    JOIN task_instances ON task_instances.routine_instance_id = routine_instances.id
+        AND task_instances.due_date = routine_instances.due_date
+    LEFT JOIN unnest(
+        CAST(%(area_routines)s AS uuid[]), CAST(%(area_tasks)s AS text[]), CAST(%(area_codes)s AS integer[])
+    ) AS areas (routine_id, task_id, code)
+        ON areas.routine_id = routine_instances.routine_id AND areas.task_id = task_instances.task_id
+    WHERE routine_instances.due_date >= %(start)s AND routine_instances.due_date < %(end)s
+        AND task_instances.due_date >= %(start)s AND task_instances.due_date < %(end)s
+) TO STDOUT (FORMAT binary)
+""".format(
+    difficulty_codes=" ".join(f"WHEN '{difficulty}' THEN {index}" for index, difficulty in enumerate(DIFFICULTIES)),
+    default_difficulty=DIFFICULTIES.index('MEDIUM')
+)
+
+def _binary_copy_rows(data: memoryview, fields) -> np.ndarray:
+    """The rows of a binary COPY whose fields are all non-null 4-byte integers, as a structured array.
+
+    Such rows have a fixed width: a field count, then a length and a value
+    per field, all big-endian.
+    """
+    header = 19 + int.from_bytes(data[15:19], 'big')
+    dtype = np.dtype([('fields', '>i2')] + [(name, '>i4') for field in fields for name in (f'{field}_size', field)])
+    rows = np.frombuffer(data[header:len(data) - 2], dtype=dtype)
+    if len(rows) and not (rows['fields'] == len(fields)).all():
+        raise ValueError("Unexpected row layout in COPY output")
+    return rows
+
+def _copy_task_rows(db: Session, user_ids: List, task_areas: Dict[tuple, int], start: datetime, end: datetime):
+    """Pull the integer-coded task rows with one binary COPY (psycopg2)"""
+    params = {
+        'user_ids': [str(user_id) for user_id in user_ids],
+        'area_routines': [str(routine_id) for routine_id, _ in task_areas],
+        'area_tasks': [task_id for _, task_id in task_areas],
+        'area_codes': list(task_areas.values()),
+        'start': start,
+        'end': end
+    }
+    buffer = io.BytesIO()
+    # COPY is not available through SQLAlchemy; use the session's own connection
+    with db.connection().connection.cursor() as cursor:
+        cursor.copy_expert(cursor.mogrify(_COPY_TASK_ROWS, params), buffer)
+    rows = _binary_copy_rows(buffer.getbuffer(), ROW_FIELDS)
+    return {field: rows[field] for field in ROW_FIELDS}
+
+def _fetch_task_rows(db: Session, user_ids: List, task_areas: Dict[tuple, int], start: datetime, end: datetime):
+    """Fetch and code the task rows one by one, for drivers without COPY"""
+    user_index = {user_id: index for index, user_id in enumerate(user_ids)}
+    difficulty_codes = {difficulty: index for index, difficulty in enumerate(DIFFICULTIES)}
+    task_codes: Dict[tuple, int] = {}
+    rows = db.execute(
+        select(
+            Routine.user_id,
+            RoutineInstance.routine_id,
+            RoutineInstance.due_date,
+            TaskInstance.task_id,
+            TaskInstance.status,
+            TaskInstance.difficulty,
+            TaskInstance.progress
+        ).select_from(TaskInstance).join(RoutineInstance).join(Routine).where(
+            Routine.user_id.in_(user_ids),
+            TaskInstance.due_date >= start,
+            TaskInstance.due_date < end
+        )
+    ).all()
+    return {
+        'user': [user_index[row[0]] for row in rows],
+        'day': [day_number(row[2].date()) for row in rows],
+        'completed': [row[4] == 'completed' for row in rows],
+        'difficulty': [difficulty_codes.get(row[5], difficulty_codes['MEDIUM']) for row in rows],
+        'progress': [row[6] or 0 for row in rows],
+        'task': [task_codes.setdefault((row[1], row[3]), len(task_codes)) for row in rows],
+        'area': [task_areas.get((row[1], row[3]), -1) for row in rows]
+    }
+
+def load_columns(db: Session, user_ids: List, as_of: date) -> TaskColumns:
+    """Load the scoring window of task history for some users as arrays.
+
+    On psycopg2 the rows come integer-coded from the database in one binary
+    COPY and are read straight into arrays, with no Python work per row.
+    """
+    window_start = as_of - timedelta(days=settings.SCORING_WINDOW_DAYS - 1)
+    start = datetime.combine(window_start, datetime.min.time())
+    end = datetime.combine(as_of + timedelta(days=1), datetime.min.time())
+
+    # Areas are set on queue items, so map (routine, task id) to an area code
+    area_codes: Dict[str, int] = {}
+    task_areas: Dict[tuple, int] = {}
+    for routine_id, queue in db.execute(select(Routine.id, Routine.queue).where(Routine.user_id.in_(user_ids))):
+        for iteration in queue.get('iterations', []):
+            for item in iteration.get('items', []):
+                if item.get('type') == 'TASK' and item.get('area_id'):
+                    task_areas[(routine_id, item['id'])] = area_codes.setdefault(item['area_id'], len(area_codes))
+
+    if db.get_bind().dialect.driver == 'psycopg2':
+        rows = _copy_task_rows(db, user_ids, task_areas, start, end)
+    else:
+        rows = _fetch_task_rows(db, user_ids, task_areas, start, end)
+    columns = TaskColumns(
+        user_ids=user_ids,
+        user=np.asarray(rows['user'], dtype=np.int64),
+        day=np.asarray(rows['day'], dtype=np.int64),
+        completed=np.asarray(rows['completed'], dtype=bool),
+        difficulty=np.asarray(rows['difficulty'], dtype=np.int64),
+        progress=np.asarray(rows['progress'], dtype=np.float64),
+        area=np.asarray(rows['area'], dtype=np.int64),
+        task=np.asarray(rows['task'], dtype=np.int64),
+        first_day=np.full(len(user_ids), day_number(as_of), dtype=np.int64),
+        area_ids=list(area_codes)
+    )
+
+    # Tenure runs from sign-up: instances older than the retention window are
+    # archived, so the first one left says nothing about how long a user has been active
+    user_index = {user_id: index for index, user_id in enumerate(user_ids)}
+    for user_id, created_at in db.execute(select(User.id, User.created_at).where(User.id.in_(user_ids))):
+        if created_at is not None:
+            columns.first_day[user_index[user_id]] = day_number(created_at.date())
+    return columns
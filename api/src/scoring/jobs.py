@@ -0,0 +1,115 @@
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from time import monotonic
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal, upsert
+from ..db_metrics import db_caller
+from ..leaderboards.entries import entries_for_scores, replace_entries
+from ..models import UserScore
+from ..routines.jobs import iter_user_id_shards
+from ..scheduler import JobScheduler
+from .engine import Scores, compute_scores, load_columns
+from .stale import clear_stale, iter_stale_shards
+from .streaks import roll_forward_streaks
+
+logger = logging.getLogger(__name__)
+
+SCORE_COLUMNS = (
+    'upr', 'area_mastery', 'task_complexity', 'consistency', 'diversity',
+    'consistency_modifier', 'tier', 'area_scores', 'computed_at'
+)
+
+def score_rows(user_ids: List, scores: Scores, computed_at: datetime) -> List[dict]:
+    """user_scores rows from computed scores"""
+    return [
+        {
+            'user_id': user_id,
+            'upr': round(float(scores.upr[index]), 2),
+            'area_mastery': round(float(scores.area_mastery[index]), 2),
+            'task_complexity': round(float(scores.task_complexity[index]), 2),
+            'consistency': round(float(scores.consistency[index]), 2),
+            'diversity': round(float(scores.diversity[index]), 2),
+            'consistency_modifier': float(scores.consistency_modifier[index]),
+            'tier': str(scores.tier[index]),
+            'area_scores': scores.area_scores[index],
+            'computed_at': computed_at
+        }
+        for index, user_id in enumerate(user_ids)
+    ]
+
+def store_scores(db: Session, rows: List[dict]) -> None:
+    """Upsert scores and swap the users' leaderboard entries, then commit"""
+    upsert(db, UserScore, rows, ('user_id',), SCORE_COLUMNS)
+    replace_entries(db, [row['user_id'] for row in rows], entries_for_scores(db, rows))
+    db.commit()
+
+def score_users(db: Session, user_ids: List, as_of: date) -> int:
+    """Compute and store the scores of some users, and their leaderboard entries"""
+    computed_at = datetime.now(timezone.utc)
+    rows = score_rows(user_ids, compute_scores(load_columns(db, user_ids, as_of), as_of), computed_at)
+    store_scores(db, rows)
+    return len(rows)
+
+def rescore(full: bool = False, as_of: Optional[date] = None) -> dict:
+    """Rescore everyone, or only users marked stale by new completions, shard by shard"""
+    db_caller.set("job:score-users")
+    as_of = as_of or datetime.now().date()
+    summary = {'full': full, 'as_of': as_of.isoformat(), 'users': 0, 'shards': 0}
+    started = monotonic()
+    db = SessionLocal()
+    try:
+        if full:
+            for user_ids in iter_user_id_shards(db, settings.SCORING_SHARD_SIZE):
+                summary['users'] += score_users(db, user_ids, as_of)
+                summary['shards'] += 1
+        else:
+            # Marks are read before scoring and cleared after storing, see clear_stale
+            for marks in iter_stale_shards(db, settings.SCORING_SHARD_SIZE):
+                summary['users'] += score_users(db, [mark.user_id for mark in marks], as_of)
+                summary['shards'] += 1
+                clear_stale(db, marks)
+    finally:
+        db.close()
+
+    summary['elapsed_seconds'] = round(monotonic() - started, 3)
+    logger.info("Scored %d users in %d shards (full=%s)", summary['users'], summary['shards'], full)
+    return summary
+
+def run_incremental_scoring(scheduled_for: datetime) -> dict:
+    return rescore(full=False, as_of=scheduled_for.date())
+
+def run_full_scoring(scheduled_for: datetime) -> dict:
+    return rescore(full=True, as_of=scheduled_for.date())
+
+def roll_streaks(scheduled_for: datetime) -> dict:
+    """Close yesterday for streaks that had no activity on it"""
+    db_caller.set("job:roll-streaks")
+    db = SessionLocal()
+    try:
+        summary = roll_forward_streaks(db, scheduled_for.date() - timedelta(days=1))
+    finally:
+        db.close()
+    logger.info("Rolled streaks forward: %s", summary)
+    return summary
+
+def register_jobs(scheduler: JobScheduler) -> None:
+    scheduler.register(
+        "score-users",
+        run_incremental_scoring,
+        every=timedelta(minutes=settings.SCORING_INTERVAL_MINUTES)
+    )
+    # Streaks and consistency decay without new completions, so rescore everyone daily
+    scheduler.register(
+        "score-users-full",
+        run_full_scoring,
+        daily_at=time.fromisoformat(settings.SCORING_RUN_AT)
+    )
+    scheduler.register(
+        "roll-streaks",
+        roll_streaks,
+        daily_at=time.fromisoformat(settings.STREAK_RUN_AT)
+    )
@@ -0,0 +1,40 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import get_db
+from ..models import Streak, UserScore
+from ..schemas import StreakRead, UserScoreRead
+from ..auth.cache import Principal
+from ..auth.utils import get_current_user
+
+router = APIRouter(prefix="/scores", tags=["Scores"])
+
+@router.get("/me", response_model=UserScoreRead)
+async def get_my_score(
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """The current user's latest UPR, as computed by the periodic scoring jobs"""
+    score = await db.get(UserScore, current_user.id)
+    if not score:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Score not computed yet"
+        )
+    return score
+
+@router.get("/me/streaks", response_model=List[StreakRead])
+async def get_my_streaks(
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """The current user's overall streak first, then one per area with activity"""
+    streaks = await db.scalars(
+        select(Streak).where(Streak.user_id == current_user.id).order_by(
+            Streak.area_id.is_not(None), Streak.created_at
+        )
+    )
+    return streaks.all()
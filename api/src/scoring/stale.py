@@ -0,0 +1,43 @@
+from datetime import datetime
+from typing import Iterator, List
+from uuid import UUID
+
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.orm import Session
+
+from ..database import dialect_insert
+from ..models import StaleScore
+
+def mark_score_stale(db: Session, user_id: UUID, completed_at: datetime) -> None:
+    """Queue a user for the incremental rescore after they complete tasks. Does not commit"""
+    statement = dialect_insert(db, StaleScore).values(user_id=user_id, marked_at=completed_at)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=['user_id'],
+        set_={'marked_at': statement.excluded.marked_at}
+    ))
+
+def iter_stale_shards(db: Session, shard_size: int) -> Iterator[List]:
+    """Marked users as (user_id, marked_at) rows, with keyset pagination on user_id"""
+    last_id = None
+    while True:
+        query = select(StaleScore.user_id, StaleScore.marked_at)
+        if last_id is not None:
+            query = query.where(StaleScore.user_id > last_id)
+        shard = db.execute(query.order_by(StaleScore.user_id).limit(shard_size)).all()
+        if not shard:
+            return
+        yield shard
+        last_id = shard[-1].user_id
+
+def clear_stale(db: Session, marks: List) -> None:
+    """Drop the marks that were read before scoring, then commit.
+
+    A mark moved on by a completion since then stays for the next run, so
+    the completion is not lost if scoring read the tasks before it.
+    """
+    db.execute(
+        delete(StaleScore)
+        .where(tuple_(StaleScore.user_id, StaleScore.marked_at).in_([tuple(mark) for mark in marks]))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
@@ -0,0 +1,97 @@
+from datetime import date
+from typing import Dict, Optional
+from uuid import UUID
+
+from sqlalchemy import func, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import insert_missing
+from ..models import Area, Streak
+
+def task_area_id(queue: dict, task_id: str) -> Optional[UUID]:
+    """Area of a task, as set on its routine's queue item"""
+    for iteration in queue.get('iterations', []):
+        for item in iteration.get('items', []):
+            if item.get('id') == task_id and item.get('area_id'):
+                try:
+                    return UUID(str(item['area_id']))
+                except ValueError:
+                    return None
+    return None
+
+def advance_streak(streak: Streak, day: date) -> None:
+    """Count activity on day, spending grace tokens on the days missed since the last counted one"""
+    if streak.last_counted_date is not None and day <= streak.last_counted_date:
+        return
+
+    missed = (day - streak.last_counted_date).days - 1 if streak.last_counted_date else 0
+    if streak.current_streak and missed <= streak.grace_tokens:
+        streak.grace_tokens -= missed
+        streak.current_streak += 1
+    else:
+        streak.current_streak = 1
+
+    if streak.current_streak % settings.STREAK_GRACE_EARN_DAYS == 0:
+        streak.grace_tokens = min(streak.grace_tokens + 1, settings.STREAK_MAX_GRACE_TOKENS)
+    streak.longest_streak = max(streak.longest_streak or 0, streak.current_streak)
+    streak.last_active_date = day
+    streak.last_counted_date = day
+
+def _locked_streaks(db: Session, user_id: UUID, area_id: Optional[UUID]) -> Dict[Optional[UUID], Streak]:
+    area_filter = Streak.area_id.is_(None)
+    if area_id is not None:
+        area_filter = or_(area_filter, Streak.area_id == area_id)
+    streaks = db.scalars(
+        select(Streak).where(Streak.user_id == user_id, area_filter).with_for_update()
+    ).all()
+    return {streak.area_id: streak for streak in streaks}
+
+def record_activity(db: Session, user_id: UUID, area_id: Optional[UUID], day: date) -> None:
+    """Advance the user's overall streak, and the area's if any, for a task completed on day.
+
+    Touches at most two rows through the (user_id, area_id) unique index, so
+    the cost does not depend on the user's history.
+    """
+    streaks = _locked_streaks(db, user_id, area_id)
+    if area_id is not None and area_id not in streaks:
+        # Queue items can reference areas that were deleted since
+        if db.scalar(select(Area.id).where(Area.id == area_id, Area.user_id == user_id)) is None:
+            area_id = None
+
+    missing = [scope for scope in {None, area_id} if scope not in streaks]
+    if missing:
+        insert_missing(db, Streak, [{'user_id': user_id, 'area_id': scope} for scope in missing])
+        streaks = _locked_streaks(db, user_id, area_id)
+
+    for streak in streaks.values():
+        advance_streak(streak, day)
+
+def _days_since(db: Session, column, day: date):
+    if db.get_bind().dialect.name == 'postgresql':
+        return literal(day) - column
+    return func.julianday(literal(day)) - func.julianday(column)
+
+def roll_forward_streaks(db: Session, day: date) -> dict:
+    """Close day for streaks without activity on it: bridge the gap with grace tokens or reset.
+
+    Set-based, so it only touches streaks that were not counted on day, and
+    running it again for the same day changes nothing.
+    """
+    missed = _days_since(db, Streak.last_counted_date, day)
+    not_counted = (Streak.current_streak > 0, Streak.last_counted_date < day)
+
+    bridged = db.execute(
+        update(Streak)
+        .where(*not_counted, missed <= Streak.grace_tokens)
+        .values(grace_tokens=Streak.grace_tokens - missed, last_counted_date=day)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    reset = db.execute(
+        update(Streak)
+        .where(*not_counted)
+        .values(current_streak=0)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return {'day': day.isoformat(), 'bridged': bridged, 'reset': reset}
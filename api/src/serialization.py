@@ -0,0 +1,19 @@
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json, to_jsonable_python
+
+def jsonb_ready(value: Any) -> Any:
+    """Plain JSON data for a JSONB column, converting models, UUIDs, datetimes and enums in one pass"""
+    return to_jsonable_python(value)
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by pydantic-core, which handles UUIDs and datetimes natively.
+
+    The app's default response class, so every route renders its body in
+    one pydantic-core pass; hand-built responses, such as field
+    projections, use it directly.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
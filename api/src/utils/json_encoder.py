@@ -1,14 +0,0 @@
-from json import JSONEncoder
-from uuid import UUID
-from datetime import datetime, date
-from typing import Any
-
-class CustomJSONEncoder(JSONEncoder):
-    def default(self, obj: Any) -> Any:
-        if isinstance(obj, UUID):
-            return str(obj)
-        if isinstance(obj, (datetime, date)):
-            return obj.isoformat()
-        if hasattr(obj, '__dict__'):
-            return obj.__dict__
-        return super().default(obj) 
\ No newline at end of file
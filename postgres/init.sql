@@ -43,7 +43,7 @@ CREATE TABLE routines (
     
     -- Scheduling
     is_recurring BOOLEAN DEFAULT false,
-    frequency VARCHAR(50),
+    frequency VARCHAR(255), -- 'daily', 'weekly', 'monthly' or an RRULE-style string
     start_date TIMESTAMP WITH TIME ZONE,
     end_date TIMESTAMP WITH TIME ZONE,
     
@@ -101,20 +101,22 @@ CREATE TABLE routines (
     )
 );
 
--- Routine instances table
+-- Routine instances table (partitioned by month of due_date)
 CREATE TABLE routine_instances (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
     routine_id UUID NOT NULL REFERENCES routines(id) ON DELETE CASCADE,
     iteration_position INTEGER DEFAULT 0,
     due_date TIMESTAMP WITH TIME ZONE NOT NULL,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-);
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, due_date)
+) PARTITION BY RANGE (due_date);
 
--- Task instances table (for tasks within routine instances)
+-- Task instances table (for tasks within routine instances, partitioned like them)
 CREATE TABLE task_instances (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
-    routine_instance_id UUID NOT NULL REFERENCES routine_instances(id) ON DELETE CASCADE,
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    routine_instance_id UUID NOT NULL,
+    due_date TIMESTAMP WITH TIME ZONE NOT NULL, -- Copied from the routine instance
     task_id VARCHAR(100) NOT NULL, -- References the task ID in the routine's queue
     name VARCHAR(100) NOT NULL,
     status VARCHAR(20) DEFAULT 'pending',
@@ -123,11 +125,158 @@ CREATE TABLE task_instances (
     target_value FLOAT,
     execution_time VARCHAR(5), -- HH:MM format
     duration INTEGER, -- in minutes
+    difficulty VARCHAR(20) NOT NULL DEFAULT 'MEDIUM', -- From the queue item
     completion_date TIMESTAMP WITH TIME ZONE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, due_date),
+    FOREIGN KEY (routine_instance_id, due_date) REFERENCES routine_instances (id, due_date) ON DELETE CASCADE
+) PARTITION BY RANGE (due_date);
+
+-- Monthly partitions named <table>_YYYY_MM with UTC bounds, from this month on; the
+-- maintain-partitions job (src/routines/partitions.py) keeps creating the next ones.
+-- The default partitions catch rows outside every month; the job moves them into a
+-- month's partitions when it creates them.
+CREATE TABLE routine_instances_default PARTITION OF routine_instances DEFAULT;
+CREATE TABLE task_instances_default PARTITION OF task_instances DEFAULT;
+
+DO $$
+DECLARE
+    month DATE := date_trunc('month', CURRENT_DATE);
+    tbl TEXT;
+BEGIN
+    FOR i IN 0..4 LOOP
+        FOREACH tbl IN ARRAY ARRAY['routine_instances', 'task_instances'] LOOP
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                tbl || '_' || to_char(month, 'YYYY_MM'), tbl,
+                month::text || ' 00:00:00+00', (month + INTERVAL '1 month')::date::text || ' 00:00:00+00'
+            );
+        END LOOP;
+        month := month + INTERVAL '1 month';
+    END LOOP;
+END $$;
+
+-- Task history table (compact archive of task instances past the retention window)
+CREATE TABLE task_history (
+    task_instance_id UUID PRIMARY KEY, -- The archived task instance's id
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    routine_id UUID NOT NULL REFERENCES routines(id) ON DELETE CASCADE,
+    due_date DATE NOT NULL,
+    task_id VARCHAR(100) NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    progress INTEGER NOT NULL DEFAULT 0,
+    difficulty VARCHAR(20) NOT NULL,
+    completion_date TIMESTAMP WITH TIME ZONE,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Daily summaries table (per-user rollup of task instances for calendar views)
+CREATE TABLE daily_summaries (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    instances INTEGER NOT NULL DEFAULT 0,
+    tasks_total INTEGER NOT NULL DEFAULT 0,
+    tasks_completed INTEGER NOT NULL DEFAULT 0,
+    tasks_pending INTEGER NOT NULL DEFAULT 0,
+    progress_total INTEGER NOT NULL DEFAULT 0,
+    xp_earned INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, day)
+);
+
+-- User scores table (latest User Performance Rating per user)
+CREATE TABLE user_scores (
+    user_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    upr FLOAT NOT NULL DEFAULT 0,
+    area_mastery FLOAT NOT NULL DEFAULT 0,
+    task_complexity FLOAT NOT NULL DEFAULT 0,
+    consistency FLOAT NOT NULL DEFAULT 0,
+    diversity FLOAT NOT NULL DEFAULT 0,
+    consistency_modifier FLOAT NOT NULL DEFAULT 1,
+    tier VARCHAR(20) NOT NULL DEFAULT 'BRONZE',
+    area_scores JSONB NOT NULL DEFAULT '{}', -- Area id -> Area Mastery Score
+    computed_at TIMESTAMP WITH TIME ZONE NOT NULL, -- Completions up to here are included
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- XP events table (ledger folded into areas.xp by the aggregator job)
+CREATE TABLE xp_events (
+    id BIGSERIAL PRIMARY KEY,
+    area_id UUID NOT NULL REFERENCES areas(id) ON DELETE CASCADE,
+    task_instance_id UUID NOT NULL UNIQUE, -- No foreign key, task_instances is partitioned
+    xp INTEGER NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    applied_at TIMESTAMP WITH TIME ZONE -- NULL until folded into areas.xp
+);
+
+-- Stale scores table (users the incremental rescore picks up)
+CREATE TABLE stale_scores (
+    user_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    marked_at TIMESTAMP WITH TIME ZONE NOT NULL -- Latest completion; compared on clearing
+);
+
+-- Leaderboard entries table (scores per board, ranked in process by the API)
+CREATE TABLE leaderboard_entries (
+    board VARCHAR(120) NOT NULL, -- "global", "tier:GOLD", "area:fitness"
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    score FLOAT NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (board, user_id)
+);
+
+-- Leaderboard removals table (users the in-process index drops from its boards)
+CREATE TABLE leaderboard_removals (
+    user_id UUID PRIMARY KEY, -- No foreign key: outlives a deleted user
+    removed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Streaks table (overall when area_id is NULL, else per area)
+CREATE TABLE streaks (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    area_id UUID REFERENCES areas(id) ON DELETE CASCADE,
+    current_streak INTEGER NOT NULL DEFAULT 0,
+    longest_streak INTEGER NOT NULL DEFAULT 0,
+    last_active_date DATE, -- Last day with a completed task
+    last_counted_date DATE, -- Last day kept by activity or a grace token
+    grace_tokens INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE NULLS NOT DISTINCT (user_id, area_id)
+);
+
+-- Scheduled jobs table (definitions, last-run watermarks and worker leases)
+CREATE TABLE scheduled_jobs (
+    name VARCHAR(100) PRIMARY KEY,
+    schedule VARCHAR(50) NOT NULL,
+    last_run_at TIMESTAMP WITH TIME ZONE, -- Scheduled time of the last completed run
+    locked_by VARCHAR(255),
+    locked_until TIMESTAMP WITH TIME ZONE,
+    failures INTEGER NOT NULL DEFAULT 0, -- Consecutive failed runs
+    last_error TEXT,
+    retry_at TIMESTAMP WITH TIME ZONE, -- No new attempt before this after a failure
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Indexes for keyset pagination and date range reads
+CREATE INDEX ix_areas_user_created ON areas (user_id, created_at, id);
+CREATE INDEX ix_projects_area_created ON projects (area_id, created_at, id);
+CREATE INDEX ix_routines_user_created ON routines (user_id, created_at, id);
+-- One instance per routine and day, and one task per queue item and instance: the
+-- ON CONFLICT targets of instance generation (api/migrations/versions/0013)
+CREATE UNIQUE INDEX uq_routine_instances_routine_due ON routine_instances (routine_id, due_date) INCLUDE (id);
+CREATE INDEX ix_routine_instances_due ON routine_instances (due_date, id);
+CREATE UNIQUE INDEX uq_task_instances_instance_task ON task_instances (routine_instance_id, due_date, task_id);
+CREATE INDEX ix_task_history_user_due ON task_history (user_id, due_date);
+CREATE INDEX ix_streaks_last_counted ON streaks (last_counted_date);
+CREATE INDEX ix_xp_events_pending ON xp_events (area_id) WHERE applied_at IS NULL;
+CREATE INDEX ix_leaderboard_entries_updated ON leaderboard_entries (updated_at);
+CREATE INDEX ix_leaderboard_removals_removed ON leaderboard_removals (removed_at);
+
 -- Trigger to update updated_at column
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -166,4 +315,36 @@ CREATE TRIGGER update_routine_instances_updated_at
 CREATE TRIGGER update_task_instances_updated_at
     BEFORE UPDATE ON task_instances
     FOR EACH ROW
-    EXECUTE FUNCTION update_updated_at_column(); 
\ No newline at end of file
+    EXECUTE FUNCTION update_updated_at_column(); 
+
+CREATE TRIGGER update_daily_summaries_updated_at
+    BEFORE UPDATE ON daily_summaries
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+CREATE TRIGGER update_user_scores_updated_at
+    BEFORE UPDATE ON user_scores
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+CREATE TRIGGER update_leaderboard_entries_updated_at
+    BEFORE UPDATE ON leaderboard_entries
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+CREATE TRIGGER update_streaks_updated_at
+    BEFORE UPDATE ON streaks
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+CREATE TRIGGER update_scheduled_jobs_updated_at
+    BEFORE UPDATE ON scheduled_jobs
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+-- Schema revision for Alembic (api/migrations): the head revision this file matches.
+-- Bump it whenever a revision is added.
+CREATE TABLE alembic_version (
+    version_num VARCHAR(32) NOT NULL PRIMARY KEY
+);
+INSERT INTO alembic_version (version_num) VALUES ('0016');